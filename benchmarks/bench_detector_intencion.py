@@ -0,0 +1,67 @@
+# benchmarks/bench_detector_intencion.py
+"""
+Microbenchmark de detección de intención sobre respuestas grandes sintéticas:
+búsqueda frase a frase por herramienta (antes) frente al patrón compilado (después).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_detector_intencion.py --herramientas 50 --kb 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from detector_intencion import claves_intencion_por_defecto, obtener_comparador
+
+CONTEXTO_HERRAMIENTAS = ["usar herramienta", "ejecutar herramienta", "llamar a la herramienta", "activar herramienta"]
+
+
+def detectar_frase_a_frase(texto: str, nombres: list[str]) -> list[str]:
+    """Réplica del algoritmo original de `debe_usar_tool`, aplicado a cada herramienta."""
+    texto = texto.lower().strip()
+    detectadas = []
+    for nombre in nombres:
+        nombre = nombre.lower().strip()
+        if any(clave in texto for clave in claves_intencion_por_defecto(nombre)):
+            detectadas.append(nombre)
+        elif nombre in texto and any(c in texto for c in CONTEXTO_HERRAMIENTAS):
+            detectadas.append(nombre)
+    return detectadas
+
+
+def generar_respuesta(kb: int, nombres: list[str]) -> str:
+    """Texto de relleno de ~kb KiB con dos menciones de herramientas al final."""
+    palabras = ["el", "modelo", "responde", "con", "texto", "largo", "sobre", "varios", "temas", "y", "datos"]
+    rng = random.Random(42)
+    relleno = " ".join(rng.choice(palabras) for _ in range(kb * 1024 // 6))
+    return f"{relleno} Voy a usar la herramienta {nombres[-1]} y luego usaré {nombres[len(nombres) // 2]}."
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--herramientas", type=int, default=50)
+    parser.add_argument("--kb", type=int, default=200)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    nombres = [f"herramienta_{i:03d}" for i in range(args.herramientas)]
+    texto = generar_respuesta(args.kb, nombres)
+    comparador = obtener_comparador(nombres)
+
+    assert sorted(detectar_frase_a_frase(texto, nombres)) == sorted(comparador.buscar(texto))
+
+    antes = medir(lambda: detectar_frase_a_frase(texto, nombres), args.repeticiones)
+    despues = medir(lambda: comparador.buscar(texto), args.repeticiones)
+    print(f"{args.herramientas} herramientas, respuesta de {len(texto) / 1024:.0f} KiB")
+    print(f"Frase a frase (antes):    {antes:8.2f} ms por respuesta")
+    print(f"Patrón compilado (después): {despues:8.2f} ms por respuesta  (x{antes / despues:.1f})")
@@ -0,0 +1,65 @@
+# benchmarks/bench_ejecutor_tools.py
+"""
+Escalado de una herramienta de CPU con llamadas concurrentes: cuerpo ejecutado
+en el bucle de eventos (antes) frente al pool de hilos y al pool de procesos de
+`ejecutor_tools` (después), con la misma función que `contar_primos` de server.py.
+
+En el bucle (o en hilos, por el GIL) las llamadas se serializan; con procesos,
+el tiempo total debería bajar casi en proporción a los núcleos disponibles.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_ejecutor_tools.py --llamadas 8 --limite 200000 --procesos 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import ejecutor_tools
+from ejecutor_tools import en_ejecutor
+
+
+def contar_primos(limite: int) -> int:
+    return sum(1 for n in range(2, limite) if all(n % d for d in range(2, int(n ** 0.5) + 1)))
+
+
+async def contar_primos_en_bucle(limite: int) -> int:
+    """Réplica de una herramienta síncrona ejecutada en el bucle de eventos."""
+    return contar_primos(limite)
+
+
+contar_primos_en_hilo = en_ejecutor("hilo")(contar_primos)
+contar_primos_en_proceso = en_ejecutor("proceso")(contar_primos)
+
+
+async def medir(herramienta, llamadas: int, limite: int) -> float:
+    inicio = time.perf_counter()
+    await asyncio.gather(*(herramienta(limite) for _ in range(llamadas)))
+    return time.perf_counter() - inicio
+
+
+async def principal(llamadas: int, limite: int, procesos: list[int]) -> None:
+    print(f"{llamadas} llamadas concurrentes a contar_primos({limite}), {os.cpu_count()} núcleo(s)")
+    base = await medir(contar_primos_en_bucle, llamadas, limite)
+    print(f"{'En el bucle (antes)':<22} {base:7.2f} s")
+    hilos = await medir(contar_primos_en_hilo, llamadas, limite)
+    print(f"{'Pool de hilos':<22} {hilos:7.2f} s  (x{base / hilos:.2f})")
+    for cantidad in procesos:
+        os.environ["MCP_EJECUTOR_PROCESOS"] = str(cantidad)
+        ejecutor_tools.cerrar_ejecutores()
+        await medir(contar_primos_en_proceso, cantidad, 1000)  # arranque de los workers fuera de la medida
+        tiempo = await medir(contar_primos_en_proceso, llamadas, limite)
+        print(f"{f'Pool de {cantidad} proceso(s)':<22} {tiempo:7.2f} s  (x{base / tiempo:.2f})")
+    ejecutor_tools.cerrar_ejecutores()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llamadas", type=int, default=8)
+    parser.add_argument("--limite", type=int, default=200_000)
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    asyncio.run(principal(args.llamadas, args.limite, args.procesos))
@@ -0,0 +1,72 @@
+# benchmarks/bench_historial.py
+"""
+Latencia por turno del historial a medida que crece la conversación:
+reescritura completa del JSON (antes) frente al almacén de solo anexado (después).
+
+Un turno = leer el contexto (últimos N intercambios) + guardar user/assistant.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_historial.py --tamanos 100 1000 10000 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from almacen_historial import AlmacenHistorial
+
+
+def intercambio(i: int) -> list[dict]:
+    return [{"role": "user", "content": f"Pregunta número {i} sobre la herramienta suma"},
+            {"role": "assistant", "content": f"Respuesta número {i}: la suma de 5 y 3 es 8."}]
+
+
+def turno_json(ruta: str, i: int) -> None:
+    """Réplica del flujo original: cargar el archivo entero, añadir y reescribirlo."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        mensajes = json.load(f)
+    mensajes.extend(intercambio(i))
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(mensajes, f, indent=2, ensure_ascii=False)
+
+
+def turno_almacen(almacen: AlmacenHistorial, i: int) -> None:
+    almacen.ultimos_intercambios("bench", 5)
+    almacen.agregar_varios("bench", intercambio(i))
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        funcion(i)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[100, 1000, 10000, 50000],
+                        help="Número de intercambios ya existentes en el historial.")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    system = {"role": "system", "content": "Eres un asistente útil."}
+    print(f"{'intercambios':>12} | {'JSON completo (antes)':>22} | {'almacén (después)':>18}")
+    for tamano in args.tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta_json = os.path.join(directorio, "historial.json")
+            historial = [system] + [m for i in range(tamano) for m in intercambio(i)]
+            with open(ruta_json, "w", encoding="utf-8") as f:
+                json.dump(historial, f, indent=2, ensure_ascii=False)
+
+            # Sin compactación, para medir el peor caso: toda la conversación activa
+            almacen = AlmacenHistorial(os.path.join(directorio, "historial.sqlite3"), compactar_cada=0)
+            almacen.agregar_varios("bench", historial)
+
+            antes = medir(lambda i: turno_json(ruta_json, i), args.repeticiones)
+            despues = medir(lambda i: turno_almacen(almacen, i), args.repeticiones)
+            almacen.cerrar()
+        print(f"{tamano:>12} | {antes:>19.2f} ms | {despues:>15.2f} ms")
@@ -0,0 +1,53 @@
+# benchmarks/bench_lote_tools.py
+"""
+Muchas sumas contra server.py: una llamada MCP por suma (antes) frente a
+`AgrupadorLlamadas` sobre `suma_lote` (después), que junta las llamadas
+concurrentes en lotes de hasta `--max-lote`.
+
+Los argumentos no se repiten, así que la caché de resultados del cliente no
+interviene.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_lote_tools.py --sumas 10000 --max-lote 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mcp_manual import AgrupadorLlamadas, ejecutar_tool_manual
+from pool_mcp import cerrar_pools, obtener_pool
+
+
+async def principal(sumas: int, max_lote: int, tamano_pool: int) -> None:
+    await obtener_pool("server.py", tamano=tamano_pool).iniciar()  # el arranque no cuenta
+
+    inicio = time.perf_counter()
+    individuales = await asyncio.gather(*(ejecutar_tool_manual("suma", {"numero1": i, "numero2": 1})
+                                          for i in range(sumas)))
+    antes = time.perf_counter() - inicio
+
+    agrupador = AgrupadorLlamadas("suma_lote", max_lote=max_lote)
+    inicio = time.perf_counter()
+    agrupados = await asyncio.gather(*(agrupador.llamar({"numero1": i, "numero2": 2}) for i in range(sumas)))
+    despues = time.perf_counter() - inicio
+    await cerrar_pools()
+
+    assert [r["result"]["entero"] for r in individuales] == [str(i + 1) for i in range(sumas)]
+    assert [r["entero"] for r in agrupados] == [str(i + 2) for i in range(sumas)]
+    print(f"{sumas} sumas, pool de {tamano_pool} cliente(s)")
+    print(f"Una llamada por suma (antes): {antes:8.2f} s  ({sumas / antes:9.0f} sumas/s)")
+    print(f"Lotes de {max_lote:<5} (después):   {despues:8.2f} s  ({sumas / despues:9.0f} sumas/s, "
+          f"{agrupador.lotes_enviados} lotes, x{antes / despues:.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sumas", type=int, default=10_000)
+    parser.add_argument("--max-lote", type=int, default=500)
+    parser.add_argument("--tamano-pool", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(principal(args.sumas, args.max_lote, args.tamano_pool))
@@ -0,0 +1,51 @@
+# benchmarks/bench_pool_mcp.py
+"""
+Benchmark de latencia por llamada de `ejecutar_tool_manual`:
+servidor lanzado en cada llamada (antes) frente al pool persistente (después).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_pool_mcp.py --llamadas 20 --tamano 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mcp_manual import ejecutar_tool_manual
+from pool_mcp import cerrar_pools, obtener_pool
+
+
+async def medir(llamadas: int, usar_pool: bool) -> list[float]:
+    """Ejecuta `suma` varias veces y devuelve la latencia de cada llamada en ms."""
+    tiempos = []
+    for i in range(llamadas):
+        inicio = time.perf_counter()
+        await ejecutar_tool_manual("suma", {"numero1": i, "numero2": 1}, usar_pool=usar_pool)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def resumir(nombre: str, tiempos: list[float]) -> None:
+    print(f"{nombre:<18} media={statistics.mean(tiempos):8.2f} ms  "
+          f"mediana={statistics.median(tiempos):8.2f} ms  max={max(tiempos):8.2f} ms")
+
+
+async def principal(llamadas: int, tamano: int) -> None:
+    sin_pool = await medir(llamadas, usar_pool=False)
+    await obtener_pool("server.py", tamano=tamano).iniciar()  # el arranque no cuenta
+    con_pool = await medir(llamadas, usar_pool=True)
+    await cerrar_pools()
+    resumir("Sin pool (antes)", sin_pool)
+    resumir("Con pool (después)", con_pool)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llamadas", type=int, default=20)
+    parser.add_argument("--tamano", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(principal(args.llamadas, args.tamano))
@@ -0,0 +1,72 @@
+# benchmarks/bench_recorte_historial.py
+"""
+Recorte del historial a los últimos N intercambios sobre historiales grandes:
+tres pasadas completas con pares intermedios (antes) frente al recorrido
+inverso que se detiene en la ventana (después).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_recorte_historial.py --mensajes 100000 --intercambios 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from chat_modelo_local import (agrupar_en_pares, extraer_system_y_conversacion, limitar_historial_inteligente,
+                               mantener_ultimos_pares, reconstruir_historial)
+
+
+def limitar_tres_pasadas(mensajes: list, max_intercambios: int) -> list:
+    """Réplica del algoritmo original de `limitar_historial_inteligente`."""
+    system_msg, conversacion = extraer_system_y_conversacion(mensajes)
+    pares = agrupar_en_pares(conversacion)
+    return reconstruir_historial(system_msg, mantener_ultimos_pares(pares, max_intercambios))
+
+
+def generar_historial(total: int, con_tools: bool) -> list[dict]:
+    """System + intercambios user/assistant (y, opcionalmente, una llamada a herramienta cada 3)."""
+    mensajes = [{"role": "system", "content": "Eres un asistente útil."}]
+    i = 0
+    while len(mensajes) < total:
+        mensajes.append({"role": "user", "content": f"Pregunta {i}"})
+        if con_tools and i % 3 == 0:
+            mensajes.append({"role": "assistant", "content": None,
+                             "tool_calls": [{"id": f"call-{i}", "type": "function",
+                                             "function": {"name": "suma", "arguments": "{}"}}]})
+            mensajes.append({"role": "tool", "tool_call_id": f"call-{i}", "content": "8"})
+        mensajes.append({"role": "assistant", "content": f"Respuesta {i}"})
+        i += 1
+    return mensajes
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mensajes", type=int, default=100_000)
+    parser.add_argument("--intercambios", type=int, default=5)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    # Sin herramientas ambos algoritmos deben dar exactamente el mismo resultado
+    simple = generar_historial(args.mensajes, con_tools=False)
+    assert limitar_tres_pasadas(simple, args.intercambios) == limitar_historial_inteligente(simple, args.intercambios)
+
+    con_tools = generar_historial(args.mensajes, con_tools=True)
+    recortado = limitar_historial_inteligente(con_tools, args.intercambios)
+    perdidos = sum(m["role"] == "tool" for m in recortado) - sum(
+        m["role"] == "tool" for m in limitar_tres_pasadas(con_tools, args.intercambios))
+
+    antes = medir(lambda: limitar_tres_pasadas(con_tools, args.intercambios), args.repeticiones)
+    despues = medir(lambda: limitar_historial_inteligente(con_tools, args.intercambios), args.repeticiones)
+    print(f"{len(con_tools)} mensajes, últimos {args.intercambios} intercambios")
+    print(f"Tres pasadas (antes):       {antes:10.3f} ms")
+    print(f"Recorrido inverso (después): {despues:10.3f} ms  (x{antes / despues:.0f})")
+    print(f"Mensajes 'tool' conservados que antes se descartaban: {perdidos}")
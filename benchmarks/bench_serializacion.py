@@ -0,0 +1,89 @@
+# benchmarks/bench_serializacion.py
+"""
+Coste de serializar un resultado grande y anidado de una herramienta, por llamada:
+- Antes: dict plano con `isinstance(v, datetime)` por campo, copia profunda al
+  guardarlo en la caché, `json.dumps` para el historial y otro formateo para el log.
+- Después: `serializacion.codificar` una sola vez (con orjson si está instalado
+  y con `json` estándar si no) y el mismo texto para caché, historial y log.
+
+El resultado imita a `resultado.data` de FastMCP: dataclasses anidadas con datetimes.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_serializacion.py --elementos 2000 --repeticiones 50
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from dataclasses import make_dataclass
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import serializacion
+from serializacion import codificar, decodificar
+
+Punto = make_dataclass("Punto", [("x", float), ("y", float)], kw_only=True)
+Elemento = make_dataclass("Elemento", [("id", int), ("nombre", str), ("creado", datetime),
+                                        ("etiquetas", list), ("posicion", Punto), ("extra", dict)], kw_only=True)
+Root = make_dataclass("Root", [("mensaje", str), ("timestamp", datetime), ("elementos", list)], kw_only=True)
+
+
+def crear_resultado(elementos: int) -> object:
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    return Root(mensaje="Resultado con ñ y acentos: áéíóú", timestamp=base, elementos=[
+        Elemento(id=i, nombre=f"elemento-{i}", creado=base + timedelta(seconds=i), etiquetas=["a", "b", str(i)],
+                 posicion=Punto(x=i * 0.5, y=-i * 0.25), extra={"orden": i, "activo": i % 2 == 0})
+        for i in range(elementos)])
+
+
+def antes(data: object) -> tuple:
+    # Lo que hacían ejecutar_tool_manual, la caché, el historial y resumen_ejecucion
+    # (el `default` solo hace falta para que json.dumps acepte los modelos anidados)
+    plano = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in data.__dict__.items()}
+    copia_cache = copy.deepcopy(plano)
+    contenido = json.dumps(plano, ensure_ascii=False, default=lambda v: getattr(v, "__dict__", str(v)))
+    log = f"   Resultado: {plano}"
+    return plano, copia_cache, contenido, log
+
+
+def despues(data: object) -> tuple:
+    texto = codificar(data)              # caché e historial guardan este texto
+    plano = decodificar(texto)           # dict devuelto en "result"
+    log = f"   Resultado: {texto}"
+    return plano, texto, log
+
+
+def medir(funcion, data: object, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(data)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def principal(elementos: int, repeticiones: int) -> None:
+    data = crear_resultado(elementos)
+    print(f"Resultado con {elementos} elementos anidados ({len(codificar(data)) / 1024:.0f} KiB en JSON), "
+          f"media de {repeticiones} repeticiones")
+    base = medir(antes, data, repeticiones)
+    print(f"{'Antes':<30} {base:8.2f} ms")
+    tenia_orjson = serializacion.HAS_ORJSON
+    serializacion.HAS_ORJSON = False
+    estandar = medir(despues, data, repeticiones)
+    print(f"{'Después (json estándar)':<30} {estandar:8.2f} ms  (x{base / estandar:.1f})")
+    serializacion.HAS_ORJSON = tenia_orjson
+    if tenia_orjson:
+        rapido = medir(despues, data, repeticiones)
+        print(f"{'Después (orjson)':<30} {rapido:8.2f} ms  (x{base / rapido:.1f})")
+    else:
+        print("orjson no está instalado: solo se mide la ruta estándar.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elementos", type=int, default=2000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+    principal(args.elementos, args.repeticiones)
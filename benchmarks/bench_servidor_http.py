@@ -0,0 +1,107 @@
+# benchmarks/bench_servidor_http.py
+"""
+Prueba de carga del servidor MCP: llamadas por segundo con N clientes concurrentes
+contra el servidor HTTP (`server.py --transporte http`, con W workers) y, como
+referencia, contra N procesos stdio (un `server.py` por cliente).
+
+Las llamadas van directas a `call_tool` (sin la caché de resultados del cliente),
+así que se mide el servidor. Si no se pasa `--url`, el script arranca el servidor
+HTTP en `--port` y lo detiene al terminar.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_servidor_http.py --clientes 16 --workers 1 4 --duracion 5
+    python benchmarks/bench_servidor_http.py --url http://127.0.0.1:8000/mcp --clientes 32
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(RAIZ, "src"))
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport, StreamableHttpTransport
+
+
+async def cliente_en_bucle(client: Client, hasta: float, latencias: list[float]) -> int:
+    """Llama a `suma` sin parar hasta `hasta` con un cliente ya conectado. Devuelve cuántas llamadas hizo."""
+    llamadas = 0
+    while time.perf_counter() < hasta:
+        inicio = time.perf_counter()
+        await client.call_tool("suma", {"numero1": llamadas, "numero2": 1})
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        llamadas += 1
+    return llamadas
+
+
+async def medir(nombre: str, crear_transporte, clientes: int, duracion: float) -> None:
+    latencias: list[float] = []
+    # Las conexiones (y, con stdio, los procesos) se abren antes de empezar a contar
+    conectados = [Client(crear_transporte()) for _ in range(clientes)]
+    for client in conectados:
+        await client.__aenter__()
+    try:
+        inicio = time.perf_counter()
+        totales = await asyncio.gather(*(cliente_en_bucle(client, inicio + duracion, latencias) for client in conectados))
+        transcurrido = time.perf_counter() - inicio
+    finally:
+        for client in conectados:
+            await client.__aexit__(None, None, None)
+    cuantiles = statistics.quantiles(latencias, n=100)
+    print(f"{nombre:<24} {sum(totales) / transcurrido:9.1f} llamadas/s  "
+          f"p50={cuantiles[49]:7.2f} ms  p95={cuantiles[94]:7.2f} ms  ({sum(totales)} llamadas)")
+
+
+def esperar_puerto(host: str, port: int, timeout: float = 20.0) -> None:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        with socket.socket() as s:
+            if s.connect_ex((host, port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"El servidor no abrió {host}:{port}")
+
+
+def arrancar_servidor(port: int, workers: int) -> subprocess.Popen:
+    proceso = subprocess.Popen([sys.executable, "server.py", "--transporte", "http", "--port", str(port),
+                                "--workers", str(workers)], cwd=RAIZ,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    esperar_puerto("127.0.0.1", port)
+    return proceso
+
+
+async def principal(args: argparse.Namespace) -> None:
+    print(f"{args.clientes} clientes concurrentes, {args.duracion:.0f} s por medición")
+    if args.stdio:
+        script = os.path.join(RAIZ, "server.py")
+        await medir("stdio (1 proceso/cliente)",
+                    lambda: PythonStdioTransport(script_path=script, python_cmd=sys.executable),
+                    args.clientes, args.duracion)
+    if args.url:
+        await medir("HTTP (--url)", lambda: StreamableHttpTransport(args.url), args.clientes, args.duracion)
+        return
+    for workers in args.workers:
+        proceso = arrancar_servidor(args.port, workers)
+        try:
+            url = f"http://127.0.0.1:{args.port}/mcp"
+            await medir(f"HTTP, {workers} worker(s)", lambda: StreamableHttpTransport(url), args.clientes, args.duracion)
+        finally:
+            proceso.terminate()
+            proceso.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Servidor HTTP ya en marcha (no se arranca ninguno).")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--duracion", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stdio", action="store_true", help="Mide también con un proceso stdio por cliente.")
+    args = parser.parse_args()
+    asyncio.run(principal(args))
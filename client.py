@@ -4,60 +4,96 @@ Cliente MCP simple para modelo IA
 Usa tu script de conexión para hablar con el modelo.
 Usa FastMCP para llamar a la herramienta en server.py.
 """
+import argparse
+import asyncio
 import sys
 import os
+from functools import partial
 
 # Añadir el directorio 'src' al path para permitir imports relativos
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 # 🔧 Importamos funciones de los otros módulos
-from src.chat_modelo_local import (cargar_mensajes, crear_payload, hacer_solicitud_http_al_modelo, limitar_historial_inteligente, openrouter_connect)
-from src.mcp_manual import (debe_usar_tool, extraer_argumentos_necesarios_herramienta, ejecutar_tool_manual, agregar_al_historial_simulando_call_tool, resumen_ejecucion)
+from src.chat_modelo_local import (crear_payload, openrouter_connect)
+from src.mcp_manual import (DetectorIntencionIncremental, extraer_argumentos_necesarios_herramienta, ejecutar_tools_en_paralelo, agregar_al_historial_simulando_call_tool, agregar_al_historial_llamadas_tool, resumen_ejecucion)
 from src.contrato_y_payload import (lectura_contrato_tools, payload_para_modelo_con_herramientas)
-from src.procesamiento_respuesta import (extraer_mensaje_modelo, extraer_contenido, imprimir_estructura_mensaje_enviado)
-from src.historial_y_contexto import (guardar_historial, crear_contexto_temporal)
+from src.procesamiento_respuesta import (extraer_mensaje_modelo, extraer_llamadas_herramienta, extraer_contenido, imprimir_estructura_mensaje_enviado, detectar_intencion_en_streaming_async)
 from src.menu_interactivo import menu_interactivo
+from src.modo_lote import ejecutar_lote
+from src.contrato_servidor import sincronizar_contrato_con_servidor
+from src.plantillas_respuesta import MODO_MODELO, MODO_PLANTILLA, MODOS_RESPUESTA, obtener_plantillas_respuesta
+# Estado compartido (pool MCP, sesión HTTP, plantillas, historial, enrutador, limitador, comparadores, resúmenes): se importa sin el prefijo 'src.'
+# para usar el mismo módulo que importan internamente los módulos de src/.
+from pool_mcp import cerrar_pools, destino_servidor_mcp
+from sesion_http import obtener_sesion_async, cerrar_sesion_async
+from historial_y_contexto import obtener_plantillas
+from enrutador_modelos import obtener_enrutador
+from almacen_historial import SESION_POR_DEFECTO, obtener_almacen_historial, cerrar_almacen_historial
+from limitador_tasa import PRIORIDAD_LOTE, con_prioridad, obtener_planificador
+from respuesta_modelo import UsoTokens
+from detector_intencion import comparador_para_contrato
+from resumen_historial import esperar_resumenes, obtener_resumidor
 from src.logging_mcp import info, success, error, warning, separator
 
 
-async def main(herramienta_server_mcp: str) -> None:
+async def main(herramienta_server_mcp: str, interactivo: bool = True, streaming: bool = False,
+               id_sesion: str = SESION_POR_DEFECTO, modo_respuesta: str = MODO_MODELO) -> dict:
     """
     Función principal que orquesta la ejecución del cliente MCP.
 
     Flujo de ejecución:
-    1.  Carga el contrato de herramientas desde un archivo JSON.
-    2.  Carga el historial previo de mensajes desde 'contexto/mensaje_modelo.json'.
+    1.  Carga el contrato de herramientas (registro en memoria, generado desde server.py).
+    2.  Toma los mensajes iniciales de la plantilla 'contexto/mensaje_modelo.json' (parseada una vez, en memoria).
     3.  Inyecta dinámicamente el mensaje del usuario con la herramienta solicitada.
     4.  Establece conexión con OpenRouter usando tu API key.
     5.  Prepara el payload con las herramientas disponibles.
-    6.  Envía la solicitud al modelo.
-    7.  Extrae el mensaje del modelo de la respuesta.
+    6.  Envía la solicitud al modelo que elige el enrutador (el más rápido y sano, con failover).
+    7.  Extrae el mensaje del modelo de la respuesta (el cuerpo se decodifica una sola vez).
     8.  Muestra la estructura del mensaje para depuración.
-    9.  Detecta si el modelo quiere usar la herramienta.
-    10. Si se detecta intención, llama a la herramienta manualmente vía MCP.
-    11. Obtiene los argumentos necesarios para la herramienta.
-    12. Ejecuta la herramienta y obtiene el resultado.
-    13. Simula un tool_call en el historial con el resultado de la herramienta.
-    14. Prepara una segunda llamada al modelo con el resultado de la tool.
+    9.  Detecta si el modelo quiere usar la herramienta: con sus `tool_calls` nativos (herramienta y
+        argumentos validados contra el contrato) o, si no los usa, por palabras clave.
+    10. Si se detecta intención, llama a las herramientas manualmente vía MCP.
+    11. Obtiene los argumentos necesarios para cada herramienta (del tool_call o conocidos).
+    12. Ejecuta todas las llamadas del turno a la vez (concurrencia limitada, timeout por llamada).
+    13. Agrega todos los resultados al historial, cada uno enlazado a su tool_call (o simulando uno).
+    14. En modo "plantilla", si la herramienta tiene plantilla, formatea la respuesta en local
+        y salta al paso 17; si no, prepara una segunda llamada al modelo con el resultado de la tool.
     15. Envía la segunda solicitud al modelo.
     16. Extrae la respuesta final del modelo.
     17. Muestra la respuesta final en consola.
     18. Agrega la respuesta final al historial.
-    19. Limita el historial para evitar crecimiento infinito.
-    20. Guarda el historial actualizado en disco.
-    21. Elimina el archivo temporal para mantener el estado limpio.
+    19. Añade los mensajes nuevos del turno al almacén de historial (solo anexado).
+
+    Args:
+        herramienta_server_mcp (str): Nombre de la herramienta a ejecutar (o varias separadas por comas).
+        interactivo (bool): Si es True, pausa para que el usuario lea la respuesta.
+            El modo por lotes (`modo_lote`) lo ejecuta con False.
+        streaming (bool): Si es True, la primera llamada al modelo se hace en streaming
+            (SSE) y la herramienta se lanza en cuanto se detecta la intención.
+        id_sesion (str): Conversación del almacén de historial donde se anexa el turno.
+        modo_respuesta (str): "modelo" (el modelo redacta la respuesta final) o "plantilla"
+            (se formatea en local con `contexto/plantillas_respuesta.json` si hay plantilla).
+
+    Returns:
+        dict: Resumen del flujo con 'herramienta', 'estado' ('ok', 'sin_intencion'
+        o 'error') y, según el caso, 'resultado', 'respuesta_final' (y su 'origen_respuesta')
+        o 'detalle'. Los casos 'ok' y 'sin_intencion' incluyen 'uso_tokens': tokens que
+        gastaron las llamadas al modelo del turno, según su campo `usage`.
     """
-    # === Crear contexto temporal y cargar mensajes iniciales ===
-    # Se copia la plantilla de contexto a un archivo temporal.
-    # Esto asegura que el archivo original no se modifique.
-    ruta_temporal = crear_contexto_temporal()
-    mensajes = cargar_mensajes(str(ruta_temporal))
+    # === Cargar mensajes iniciales desde la plantilla en memoria ===
+    # La plantilla se parsea una sola vez; cada ejecución recibe su propia lista
+    # (los mensajes de la plantilla son de solo lectura y se sustituyen, no se modifican).
+    mensajes = obtener_plantillas().nueva_conversacion()
+    inicio_turno = len(mensajes)
+    # Se pueden pedir varias herramientas a la vez separadas por comas ("suma,hola_mundo_mcp")
+    herramientas_pedidas = [nombre.strip() for nombre in herramienta_server_mcp.split(",") if nombre.strip()]
 
     # === Inyectar el mensaje del usuario con la herramienta solicitada ===
     # El nombre de la herramienta se inyecta dinámicamente para guiar al modelo.
     mensajes.append({
         "role": "user",
-        "content": f"Herramienta '{herramienta_server_mcp}'"
+        "content": f"Herramienta '{herramienta_server_mcp}'" if len(herramientas_pedidas) == 1
+                   else "Herramientas " + ", ".join(f"'{nombre}'" for nombre in herramientas_pedidas)
     })
 
     # === 1. Cargar contrato de herramientas desde archivo JSON ===
@@ -66,110 +102,176 @@ async def main(herramienta_server_mcp: str) -> None:
     contrato_tools = lectura_contrato_tools()
     if not contrato_tools:
         error("Error: No se pudo cargar el contrato de las tools.")
-        return
+        return {"herramienta": herramienta_server_mcp, "estado": "error", "detalle": "Contrato de tools no disponible"}
 
     # === 3. Establecer conexión con OpenRouter ===
     # Se obtienen la URL y las cabeceras necesarias para autenticarse con la API.
     # Usa la API key definida en .env.
     url, headers = openrouter_connect()
+    # Sesión HTTP asíncrona compartida: ambas llamadas al modelo reutilizan la misma
+    # conexión y se esperan sin bloquear el bucle de eventos.
+    sesion = obtener_sesion_async()
+    # El enrutador elige el modelo más rápido y sano, y pasa a otro si falla
+    enrutador = obtener_enrutador()
+    # Lo que no cabe en el contexto del modelo se resume en segundo plano, y el último
+    # resumen de la sesión viaja tras el system en los payloads siguientes
+    ajustar_mensajes = obtener_resumidor(url, headers).ajustador(id_sesion)
 
     # === 4. Preparar payload con herramientas ===
     # Se construye el payload incluyendo el historial y el contrato de herramientas.
     # Aunque el modelo no use tool_calls, se incluye para mantener compatibilidad MCP.
-    payload_con_herramientas = payload_para_modelo_con_herramientas(mensajes, contrato_tools)
-
-    # === 5. Enviar solicitud al modelo ===
-    # Se envía la solicitud a través de la API de OpenRouter.
-    # El modelo puede responder con texto o, en teoría, con tool_calls.
-    info("Enviando a al modelo...")
-    response = hacer_solicitud_http_al_modelo(url, headers, payload_con_herramientas)
-
-    if response.status_code != 200:
-        error(f"Error {response.status_code}: {response.text.strip()}")
-        return
-
-    # === 6. Extraer mensaje del modelo ===
-    # Se extrae el mensaje principal de la respuesta del modelo.
-    # Este mensaje contiene 'role', 'content' y posiblemente 'tool_calls'.
-    mensaje = extraer_mensaje_modelo(response)
-    contenido = mensaje.get("content", "").strip()
-
-    # === 7. Mostrar estructura para depuración ===
-    # Se imprime el mensaje completo en formato JSON para verificar si hay tool_calls.
-    # Útil para diagnosticar por qué se activa o no la herramienta.
-    # imprimir_estructura_mensaje_enviado(mensaje)
-
-    # === 8. Detectar intención de usar herramienta ===
-    # Se analiza el contenido del mensaje para detectar si el modelo quiere
-    # usar la herramienta, incluso si no genera tool_calls.
-    # Se usa detección por palabras clave y contexto.
-    if debe_usar_tool(contenido, nombre_tool=herramienta_server_mcp, palabras_clave=[]):
+    def payload_con_herramientas_para(modelo: str) -> dict:
+        return payload_para_modelo_con_herramientas(mensajes, contrato_tools, modelo=modelo,
+                                                    ajustar_mensajes=ajustar_mensajes)
+
+    # tool_calls nativos válidos de la respuesta (vacío si el modelo no los usa)
+    llamadas: list[dict] = []
+    # Tokens del turno (el streaming no trae `usage`: solo cuentan las llamadas completas)
+    uso_turno = UsoTokens()
+    if streaming:
+        # === 5-8 (streaming). Enviar y detectar intención a medida que llega el texto ===
+        # La herramienta se ejecuta en cuanto aparece la intención, sin esperar a que
+        # el modelo termine; el resto del stream se cancela.
+        # Un stream a medio consumir no se puede repetir en otro modelo: solo se elige el mejor.
+        payload_con_herramientas = payload_con_herramientas_para(enrutador.elegir())
+        payload_con_herramientas["stream"] = True
+        info("Enviando a al modelo (streaming)...")
+        detector = DetectorIntencionIncremental(herramientas_pedidas, palabras_clave=[])
+        contenido, intencion_detectada = await detectar_intencion_en_streaming_async(
+            url, headers, payload_con_herramientas, detector, sesion=sesion)
+        contenido = contenido.strip()
+    else:
+        # === 5. Enviar solicitud al modelo ===
+        # Se envía la solicitud a través de la API de OpenRouter.
+        # El modelo puede responder con texto o, en teoría, con tool_calls.
+        info("Enviando a al modelo...")
+        _, respuesta = await enrutador.solicitar(url, headers, payload_con_herramientas_para, sesion=sesion)
+
+        if respuesta.status_code != 200:
+            error(f"Error {respuesta.status_code}: {respuesta.texto.strip()}")
+            return {"herramienta": herramienta_server_mcp, "estado": "error", "detalle": f"HTTP {respuesta.status_code}"}
+
+        # === 6. Extraer mensaje del modelo ===
+        # Se extrae el mensaje principal de la respuesta del modelo (ya decodificada
+        # por `RespuestaModelo`, que también trae el uso de tokens).
+        # Este mensaje contiene 'role', 'content' y posiblemente 'tool_calls'.
+        mensaje = extraer_mensaje_modelo(respuesta)
+        uso_turno += respuesta.uso_gastado
+        contenido = (mensaje.get("content") or "").strip()
+
+        # === 7. Mostrar estructura para depuración ===
+        # Se imprime el mensaje completo en formato JSON para verificar si hay tool_calls.
+        # Útil para diagnosticar por qué se activa o no la herramienta.
+        # imprimir_estructura_mensaje_enviado(mensaje)
+
+        # === 8. Detectar intención de usar herramienta ===
+        # Si el modelo soporta herramientas, sus tool_calls traen a la vez la herramienta y
+        # los argumentos (validados contra el contrato): no hace falta adivinar nada.
+        # Si no los usa, se recurre a la detección por palabras clave sobre el contenido.
+        llamadas = extraer_llamadas_herramienta(mensaje)
+        if llamadas:
+            agregar_al_historial_llamadas_tool(mensajes, llamadas, contenido=mensaje.get("content"))
+            intencion_detectada = True
+        else:
+            # Un solo comparador (cacheado) para todo el contrato y una sola pasada por el texto
+            detectadas = comparador_para_contrato(contrato_tools, adicionales=herramientas_pedidas).buscar(contenido)
+            intencion_detectada = any(nombre in detectadas for nombre in herramientas_pedidas)
+
+    if intencion_detectada:
         # === Cambiar el system prompt para la fase de respuesta final ===
         # Una vez detectada la herramienta, el modelo debe responder útilmente.
         mensajes[0] = {
             "role": "system",
             "content": "Eres un asistente útil. Usa el contexto para responder."
         }
-        info(f"Se detectó intención de usar '{herramienta_server_mcp}'. Llamando a server.py...")
+        if not llamadas:
+            # Sin tool_calls: las herramientas pedidas, con sus argumentos conocidos e ids distintos
+            llamadas = [{"id": f"manual-{posicion + 1}", "nombre": nombre,
+                         "argumentos": extraer_argumentos_necesarios_herramienta(nombre, mensajes)}
+                        for posicion, nombre in enumerate(herramientas_pedidas)]
+        herramienta_ejecutada = ", ".join(llamada["nombre"] for llamada in llamadas)
+        info(f"Se detectó intención de usar '{herramienta_ejecutada}'. Llamando a server.py...")
 
         try:
-            # === 11. Ejecutar herramienta genérica vía FastMCP ===
-            # Se conecta al servidor MCP (server.py) y se llama a la herramienta.
-            # Los argumentos se extraen dinámicamente según la herramienta.
-            resultado_completo = await ejecutar_tool_manual(
-                nombre_tool=herramienta_server_mcp,
-                argumentos=extraer_argumentos_necesarios_herramienta(herramienta_server_mcp, mensajes)
-            )
-
-            # === 12. Simular tool_call en el historial ===
-            # Se agrega el resultado de la herramienta al historial en el formato
-            # esperado por el modelo (role: 'tool'), simulando un tool_call real.
-            agregar_al_historial_simulando_call_tool(mensajes, herramienta_server_mcp, tool_call_id="manual-1", resultado=resultado_completo["result"])
-
-            # === 13. Preguntar por el resultado (¡nueva intención!) ===
-            # Se fuerza una nueva interacción para que el modelo interprete el resultado.
-            mensajes.append({
-                "role": "user",
-                "content": "¿Qué resultado se obtuvo?"
-            })
-
-            # === 14. Preparar segunda llamada con resultado de la tool ===
-            # Se crea un nuevo payload con el historial actualizado,
-            # incluyendo el resultado de la herramienta.
-            payload_final = crear_payload(mensajes, "mistral")
-            response_final = hacer_solicitud_http_al_modelo(url, headers, payload_final)
-
-            # === 15. Extraer respuesta final del modelo ===
-            # El modelo ahora puede usar el resultado de la herramienta
-            # para generar una respuesta coherente.
-            respuesta_final = extraer_contenido(response_final)
+            # === 11. Ejecutar las herramientas vía FastMCP ===
+            # Todas las llamadas del turno van a la vez al servidor MCP (server.py), con un
+            # límite de concurrencia y un timeout por llamada.
+            resultados = await ejecutar_tools_en_paralelo(llamadas)
+            correctos = [resultado for resultado in resultados if resultado["estado"] == "ok"]
+            if not correctos:
+                raise RuntimeError("; ".join(f"{r['nombre']}: {r['detalle']}" for r in resultados))
+
+            # === 12. Resultados de las tools en el historial ===
+            # Se agregan todos juntos, antes de volver a llamar al modelo, en el formato
+            # esperado (role: 'tool'), cada uno enlazado a su tool_call por el id.
+            for resultado in resultados:
+                agregar_al_historial_simulando_call_tool(
+                    mensajes, resultado["nombre"], tool_call_id=resultado["id"],
+                    resultado=resultado["result_json"] if resultado["estado"] == "ok" else {"error": resultado["detalle"]})
+
+            # === 13. Respuesta con plantilla (modo "plantilla") ===
+            # Si todas las herramientas declaran plantilla, la respuesta se formatea en local
+            # con los campos de cada resultado y se ahorra la segunda llamada al modelo.
+            respuesta_final = None
+            if modo_respuesta == MODO_PLANTILLA and len(correctos) == len(resultados):
+                plantillas = obtener_plantillas_respuesta()
+                partes = [plantillas.renderizar(r["nombre"], r["result"]) for r in resultados]
+                if None not in partes:
+                    respuesta_final = "\n".join(partes)
+            origen_respuesta = MODO_PLANTILLA if respuesta_final is not None else MODO_MODELO
+
+            if respuesta_final is None:
+                # === 14. Preguntar por el resultado (¡nueva intención!) ===
+                # Se fuerza una nueva interacción para que el modelo interprete el resultado.
+                mensajes.append({
+                    "role": "user",
+                    "content": "¿Qué resultado se obtuvo?"
+                })
+
+                # === 15. Segunda llamada con resultado de la tool ===
+                # Se crea un nuevo payload con el historial actualizado,
+                # incluyendo el resultado de la herramienta. No se cachea: se pide con
+                # temperatura > 0 y el mismo historial debe poder dar otra respuesta.
+                _, respuesta_modelo_final = await enrutador.solicitar(
+                    url, headers, lambda modelo: crear_payload(mensajes, modelo, ajustar_mensajes=ajustar_mensajes),
+                    sesion=sesion, usar_cache=False)
+
+                # === 16. Extraer respuesta final del modelo ===
+                # El modelo ahora puede usar el resultado de la herramienta
+                # para generar una respuesta coherente.
+                respuesta_final = extraer_contenido(respuesta_modelo_final)
+                uso_turno += respuesta_modelo_final.uso_gastado
             separator()
             success(f"✅ Respuesta final: {respuesta_final}")
 
 
-            argumentos_tool = extraer_argumentos_necesarios_herramienta(herramienta_server_mcp, mensajes)
-            resumen_ejecucion(herramienta_server_mcp,argumentos_tool,resultado_completo)
+            for resultado in correctos:
+                resumen_ejecucion(resultado["nombre"], resultado["argumentos"], resultado)
 
             # === PAUSA PARA QUE EL USUARIO PUEDA LEER LA RESPUESTA ===
-            input("\n👉 Presiona ENTER para volver al menú...")  # ← Aquí está la clave
+            if interactivo:
+                input("\n👉 Presiona ENTER para volver al menú...")  # ← Aquí está la clave
             
 
-            # === 16. Agregar respuesta final al historial ===
+            # === 17. Agregar respuesta final al historial ===
             mensajes.append({"role": "assistant", "content": respuesta_final})
 
-            # === 17. Limitar historial para evitar crecimiento ===
-            mensajes = limitar_historial_inteligente(mensajes, max_intercambios=5)
-
-            # === 18. Guardar historial actualizado ===
-            guardar_historial(mensajes)
+            # === 18. Anexar el turno al almacén de historial ===
+            # Solo se escriben los mensajes nuevos (la plantilla, si la sesión es nueva);
+            # el recorte a los últimos intercambios se hace al leer (`ultimos_intercambios`).
+            almacen = obtener_almacen_historial()
+            almacen.agregar_varios(id_sesion, mensajes if not almacen.existe(id_sesion) else mensajes[inicio_turno:])
 
-            # === Final del script: limpiar archivo temporal ===
-            if ruta_temporal.exists():
-                os.remove(ruta_temporal)
-                success("🗑️ Archivo temporal eliminado. Listo para la próxima ejecución.")
+            # Con una sola llamada se conserva el formato de siempre; con varias, una entrada por llamada
+            resultado_turno = resultados[0]["result"] if len(resultados) == 1 else [
+                {clave: r[clave] for clave in ("id", "nombre", "estado", "result", "detalle") if clave in r} for r in resultados]
+            return {"herramienta": herramienta_ejecutada, "estado": "ok",
+                    "resultado": resultado_turno, "respuesta_final": respuesta_final,
+                    "origen_respuesta": origen_respuesta, "uso_tokens": uso_turno.como_dict()}
 
         except Exception as e:
             error(f"Error al ejecutar la tool: {e}")
+            return {"herramienta": herramienta_server_mcp, "estado": "error", "detalle": str(e)}
 
     else:
         # === 17. Caso: no se detectó intención de usar herramienta ===
@@ -177,7 +279,56 @@ async def main(herramienta_server_mcp: str) -> None:
         # Se finaliza sin invocar MCP.
         separator()
         warning("El modelo no quiso usar ninguna tool.")
+        return {"herramienta": herramienta_server_mcp, "estado": "sin_intencion", "detalle": contenido,
+                "uso_tokens": uso_turno.como_dict()}
+
+
+async def preparar_recursos() -> None:
+    """Prepara el arranque: genera (o reutiliza) el contrato de herramientas desde server.py
+    (o desde el servidor por red de `MCP_SERVIDOR_URL`, si está definida)."""
+    await sincronizar_contrato_con_servidor(destino_servidor_mcp("server.py"))
+
+
+async def cerrar_recursos() -> None:
+    """Libera los recursos compartidos al salir: resúmenes en curso, pool de clientes MCP, sesión HTTP
+    y almacén de historial."""
+    await esperar_resumenes()
+    await cerrar_pools()
+    await cerrar_sesion_async()
+    cerrar_almacen_historial()
+
+
+async def main_lote(ruta_entrada: str, ruta_salida: str | None, concurrencia: int, timeout: float, streaming: bool = False,
+                    id_sesion: str = SESION_POR_DEFECTO, modo_respuesta: str = MODO_MODELO) -> None:
+    """Ejecuta un archivo JSONL de solicitudes en modo por lotes (sin menú ni pausas).
+    Sus llamadas al modelo van con prioridad de lote: ceden el turno a las interactivas."""
+    try:
+        await preparar_recursos()
+        with con_prioridad(PRIORIDAD_LOTE):
+            await ejecutar_lote(partial(main, interactivo=False, streaming=streaming, id_sesion=id_sesion,
+                                        modo_respuesta=modo_respuesta), ruta_entrada, ruta_salida,
+                                concurrencia=concurrencia, timeout=timeout)
+        info(f"🚦 Limitador de tasa: {obtener_planificador().metricas()}")
+        info(f"🔀 Modelos (latencia, salud y tokens): {obtener_enrutador().resumen()}")
+    finally:
+        await cerrar_recursos()
 
 
 if __name__ == "__main__":
-    menu_interactivo(main)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cliente MCP con ejecución manual de herramientas.")
+    parser.add_argument("--lote", metavar="JSONL", help="Ejecuta las solicitudes del archivo sin menú interactivo.")
+    parser.add_argument("--salida", metavar="JSONL", help="Archivo de resultados del lote (por defecto stdout).")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Solicitudes simultáneas en modo lote.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Segundos máximos por solicitud en modo lote.")
+    parser.add_argument("--streaming", action="store_true", help="Detecta la intención sobre la respuesta en streaming (SSE).")
+    parser.add_argument("--sesion", default=SESION_POR_DEFECTO, help="Conversación del historial en la que se anexan los turnos.")
+    parser.add_argument("--respuesta", choices=MODOS_RESPUESTA, default=MODO_MODELO,
+                        help="'plantilla' formatea la respuesta final en local si la herramienta tiene plantilla "
+                             "(ahorra la segunda llamada al modelo).")
+    args = parser.parse_args()
+
+    if args.lote:
+        asyncio.run(main_lote(args.lote, args.salida, args.concurrencia, args.timeout, streaming=args.streaming, id_sesion=args.sesion,
+                               modo_respuesta=args.respuesta))
+    else:
+        menu_interactivo(partial(main, streaming=args.streaming, id_sesion=args.sesion, modo_respuesta=args.respuesta), al_salir=cerrar_recursos, al_iniciar=preparar_recursos)
\ No newline at end of file
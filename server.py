@@ -2,11 +2,35 @@
 # docstring del archivo
 """Servidor FastMCP para demostrar el uso de herramientas
 y la interacción con un cliente CLI.
+
+Transportes:
+    python server.py                                   # stdio (lo lanza cada cliente)
+    python server.py --transporte http --workers 4     # HTTP en http://127.0.0.1:8000/mcp,
+                                                       # compartido por muchos clientes
+El modo HTTP es sin estado (`stateless_http`), así que cualquier worker puede
+atender cualquier petición. Los clientes lo usan con `MCP_SERVIDOR_URL`.
 """
+import argparse
+import os
+import sys
+
 from fastmcp import FastMCP
 from pydantic import BaseModel
 from datetime import datetime
 
+# Añadir el directorio 'src' al path para usar los módulos del proyecto
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from ejecutor_tools import en_ejecutor
+
+# NumPy es opcional: sin él las herramientas por lotes usan Python puro
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 mcp = FastMCP("DemoLocura FastMCP")
 
 class PingResponse(BaseModel):
@@ -17,12 +41,22 @@ class IntResponse(BaseModel):
     entero: str
     detalle: str
 
+class ParSuma(BaseModel):
+    numero1: int
+    numero2: int
+
+class LoteResponse(BaseModel):
+    # Un resultado por elemento del lote, con los mismos campos que la herramienta individual
+    resultados: list[dict[str, str]]
+
 @mcp.tool()
 def hola_mundo_mcp(mensaje:str) -> PingResponse:
     """Devuelve un mensaje de respuesta para verificar la conexión."""
     return PingResponse(mensaje=mensaje, timestamp=datetime.now())
 
-@mcp.tool()
+# Función pura: mismo resultado para los mismos argumentos. Las anotaciones MCP
+# permiten que el cliente cachee su resultado (ver src/cache_tools.py).
+@mcp.tool(annotations={"readOnlyHint": True, "idempotentHint": True})
 def suma(numero1:int, numero2:int) -> IntResponse:
     """
     Suma dos números.
@@ -39,6 +73,76 @@ def suma(numero1:int, numero2:int) -> IntResponse:
                        detalle=f"La suma de {numero1} y {numero2} es {entero}.")
 
 
+@mcp.tool(annotations={"readOnlyHint": True, "idempotentHint": True})
+def suma_lote(lote: list[ParSuma]) -> LoteResponse:
+    """
+    Versión por lotes de `suma`: muchas sumas en una sola llamada.
+
+    Args:
+        lote (list[ParSuma]): Pares de números a sumar.
+
+    Returns:
+        LoteResponse: Un resultado por par, con los campos de `suma` (entero y detalle).
+    """
+    primeros = [par.numero1 for par in lote]
+    segundos = [par.numero2 for par in lote]
+    enteros = None
+    if HAS_NUMPY and lote:
+        # Suma vectorizada; si algún número no cabe (o la suma pudiera desbordar int64) se usa Python
+        try:
+            a, b = np.array(primeros, dtype=np.int64), np.array(segundos, dtype=np.int64)
+            if -2 ** 62 < min(a.min(), b.min()) and max(a.max(), b.max()) < 2 ** 62:
+                enteros = (a + b).tolist()
+        except OverflowError:
+            pass
+    if enteros is None:
+        enteros = [a + b for a, b in zip(primeros, segundos)]
+    return LoteResponse(resultados=[
+        {"entero": str(entero), "detalle": f"La suma de {a} y {b} es {entero}."}
+        for a, b, entero in zip(primeros, segundos, enteros)
+    ])
+
+
+# Herramienta de CPU: se ejecuta en el pool de procesos para no bloquear el bucle
+# del servidor (ver src/ejecutor_tools.py). También es pura, así que el cliente
+# puede cachear su resultado.
+@mcp.tool(annotations={"readOnlyHint": True, "idempotentHint": True})
+@en_ejecutor("proceso", max_concurrencia=4)
+def contar_primos(limite: int) -> IntResponse:
+    """
+    Cuenta los números primos menores que un límite.
+
+    Args:
+        limite (int): Se cuentan los primos en [2, limite).
+
+    Returns:
+        IntResponse: Cantidad de primos encontrados.
+    """
+    cantidad = sum(1 for n in range(2, limite) if all(n % d for d in range(2, int(n ** 0.5) + 1)))
+    return IntResponse(entero=str(cantidad),
+                       detalle=f"Hay {cantidad} números primos menores que {limite}.")
+
+
+def crear_app():
+    """App ASGI del servidor (streamable HTTP sin estado), para uvicorn con varios workers."""
+    return mcp.http_app(stateless_http=True)
+
+
 if __name__ == "__main__":
-    # Arranca el servidor con la configuración por defecto de FastMCP
-    mcp.run()
+    parser = argparse.ArgumentParser(description="Servidor MCP de demostración.")
+    parser.add_argument("--transporte", choices=("stdio", "http"), default="stdio",
+                        help="'stdio' (por defecto, lo lanza el cliente) o 'http' (servidor compartido).")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz en la que escucha el modo HTTP.")
+    parser.add_argument("--port", type=int, default=8000, help="Puerto del modo HTTP.")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos worker del modo HTTP.")
+    args = parser.parse_args()
+
+    if args.transporte == "http":
+        import uvicorn
+
+        # Con varios workers uvicorn importa la app por nombre en cada proceso
+        uvicorn.run("server:crear_app", factory=True, host=args.host, port=args.port, workers=args.workers,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)), log_level="warning")
+    else:
+        # Arranca el servidor con la configuración por defecto de FastMCP (stdio)
+        mcp.run()
@@ -0,0 +1,343 @@
+# src/almacen_historial.py
+"""
+Almacén de historial de conversaciones de solo anexado, sobre SQLite (modo WAL).
+
+`guardar_historial` y `actualizar_json_mensaje_qwen` reescribían el archivo de
+historial completo con `json.dump(..., indent=2)` en cada turno, y `cargar_mensajes`
+lo volvía a leer entero. Con este almacén:
+- Cada mensaje se añade como una fila nueva (sin reescribir lo anterior).
+- Hay varias conversaciones independientes, identificadas por su id de sesión.
+- "Los últimos N intercambios" se resuelven con los índices (sesión, rol, id) y (sesión, id):
+  se localiza el N-ésimo mensaje de usuario más reciente y se leen solo las
+  filas posteriores, así que el coste no depende del tamaño del historial.
+- Los segmentos antiguos se compactan en segundo plano: se mueven a la tabla
+  `segmentos` como un único bloque JSON comprimido, y la tabla de mensajes
+  activos se mantiene pequeña. Nada se pierde (ver `todos()`).
+- Cada mensaje guarda su número de tokens al anexarlo, así que la ventana por
+  presupuesto (`ultimos_intercambios(..., presupuesto_tokens=...)`) no recuenta nada.
+
+🔐 Configuración (opcional, en `.env`):
+    HISTORIAL_SQLITE=contexto/historial.sqlite3
+
+Ejemplo de uso:
+    almacen = obtener_almacen_historial()
+    almacen.agregar_varios("principal", [{"role": "user", "content": "Hola"},
+                                          {"role": "assistant", "content": "¡Hola!"}])
+    mensajes = almacen.ultimos_intercambios("principal", 5)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Iterable
+
+from logging_mcp import error, info
+from presupuesto_tokens import tokens_mensaje
+from serializacion import codificar, decodificar
+
+
+RUTA_SQLITE_POR_DEFECTO = "contexto/historial.sqlite3"
+SESION_POR_DEFECTO = "principal"
+COMPACTAR_CADA_POR_DEFECTO = 200  # mensajes añadidos a una sesión entre compactaciones
+CONSERVAR_INTERCAMBIOS_POR_DEFECTO = 50  # intercambios que quedan sin compactar
+
+Mensaje = dict[str, Any]
+
+
+class AlmacenHistorial:
+    """
+    Historial de conversaciones persistente y de solo anexado.
+    Es seguro entre hilos; la compactación usa su propia conexión, así que
+    no bloquea las lecturas (WAL) y solo compite brevemente con las escrituras.
+    """
+
+    def __init__(self, ruta_sqlite: str = RUTA_SQLITE_POR_DEFECTO, compactar_cada: int = COMPACTAR_CADA_POR_DEFECTO,
+                 conservar_intercambios: int = CONSERVAR_INTERCAMBIOS_POR_DEFECTO) -> None:
+        """
+        Args:
+            ruta_sqlite (str): Archivo SQLite donde se guarda el historial.
+            compactar_cada (int): Mensajes añadidos a una sesión tras los cuales se lanza
+                una compactación en segundo plano. 0 la desactiva.
+            conservar_intercambios (int): Intercambios recientes que la compactación deja activos.
+        """
+        self.ruta_sqlite = ruta_sqlite
+        self.compactar_cada = compactar_cada
+        self.conservar_intercambios = conservar_intercambios
+        self._lock = threading.Lock()
+        self._pendientes: dict[str, int] = {}
+        self._compactando: set[str] = set()
+        self._hilos: list[threading.Thread] = []
+        self._db: sqlite3.Connection | None = self._conectar()
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS mensajes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, sesion TEXT NOT NULL, rol TEXT NOT NULL,"
+            " mensaje TEXT NOT NULL, ts REAL NOT NULL, tokens INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS idx_mensajes_sesion ON mensajes (sesion, id);"
+            "CREATE INDEX IF NOT EXISTS idx_mensajes_sesion_rol ON mensajes (sesion, rol, id);"
+            "CREATE TABLE IF NOT EXISTS segmentos ("
+            " sesion TEXT NOT NULL, desde_id INTEGER NOT NULL, hasta_id INTEGER NOT NULL,"
+            " datos BLOB NOT NULL, PRIMARY KEY (sesion, desde_id));"
+        )
+        columnas = {fila[1] for fila in self._db.execute("PRAGMA table_info(mensajes)")}
+        if "tokens" not in columnas:  # bases creadas antes de guardar el recuento de tokens
+            self._db.execute("ALTER TABLE mensajes ADD COLUMN tokens INTEGER NOT NULL DEFAULT 0")
+        self._db.commit()
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre una conexión en modo WAL (una para el almacén y otra por compactación)."""
+        directorio = os.path.dirname(self.ruta_sqlite)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta_sqlite, timeout=10.0, check_same_thread=False)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        return conexion
+
+    def _conexion(self) -> sqlite3.Connection:
+        if self._db is None:
+            raise RuntimeError("El almacén de historial ya está cerrado.")
+        return self._db
+
+    def agregar(self, sesion: str, mensaje: Mensaje) -> None:
+        """
+        Añade un mensaje al final de la conversación.
+
+        Args:
+            sesion (str): Id de la conversación.
+            mensaje (Mensaje): Mensaje con al menos la clave "role".
+        """
+        self.agregar_varios(sesion, [mensaje])
+
+    def agregar_varios(self, sesion: str, mensajes: Iterable[Mensaje]) -> None:
+        """
+        Añade varios mensajes en una sola transacción.
+
+        Args:
+            sesion (str): Id de la conversación.
+            mensajes (Iterable[Mensaje]): Mensajes en orden cronológico.
+        """
+        ahora = time.time()
+        # Los tokens se cuentan una sola vez, al anexar, y quedan guardados con el mensaje
+        filas = [(sesion, m["role"], codificar(m), ahora, tokens_mensaje(m)) for m in mensajes]
+        if not filas:
+            return
+        with self._lock:
+            db = self._conexion()
+            db.executemany("INSERT INTO mensajes (sesion, rol, mensaje, ts, tokens) VALUES (?, ?, ?, ?, ?)", filas)
+            db.commit()
+            self._pendientes[sesion] = self._pendientes.get(sesion, 0) + len(filas)
+            lanzar = (self.compactar_cada and self._pendientes[sesion] >= self.compactar_cada
+                      and sesion not in self._compactando)
+            if lanzar:
+                self._pendientes[sesion] = 0
+                self._compactando.add(sesion)
+        if lanzar:
+            self.compactar_en_segundo_plano(sesion)
+
+    def existe(self, sesion: str) -> bool:
+        """
+        Args:
+            sesion (str): Id de la conversación.
+
+        Returns:
+            bool: True si la conversación tiene algún mensaje (activo o compactado).
+        """
+        with self._lock:
+            db = self._conexion()
+            return (db.execute("SELECT 1 FROM mensajes WHERE sesion = ? LIMIT 1", (sesion,)).fetchone() is not None
+                    or db.execute("SELECT 1 FROM segmentos WHERE sesion = ? LIMIT 1", (sesion,)).fetchone() is not None)
+
+    def ultimos_intercambios(self, sesion: str, max_intercambios: int | None = 5,
+                             presupuesto_tokens: int | None = None) -> list[Mensaje]:
+        """
+        Devuelve el último mensaje system y los mensajes desde el N-ésimo mensaje
+        de usuario más reciente, sin leer el resto del historial.
+
+        Args:
+            sesion (str): Id de la conversación.
+            max_intercambios (int | None): Número de intercambios (a partir de un mensaje
+                de usuario). None no limita por número.
+            presupuesto_tokens (int | None): Si se indica, se conservan además solo los
+                intercambios más recientes que quepan en ese número de tokens (system
+                incluido), usando los recuentos guardados al anexar. El último
+                intercambio se devuelve siempre.
+
+        Returns:
+            list[Mensaje]: Historial listo para el payload; vacío si la sesión no existe.
+        """
+        with self._lock:
+            db = self._conexion()
+            system = db.execute(
+                "SELECT mensaje, tokens FROM mensajes WHERE sesion = ? AND rol = 'system' ORDER BY id DESC LIMIT 1",
+                (sesion,)).fetchone()
+            desde = None
+            if max_intercambios is not None:
+                desde = db.execute(
+                    "SELECT id FROM mensajes WHERE sesion = ? AND rol = 'user' ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (sesion, max(max_intercambios, 1) - 1)).fetchone()
+            if desde is None:
+                # Menos de N intercambios activos (o sin límite): se parte de todo lo que hay
+                desde = (0,)
+            if presupuesto_tokens is not None:
+                desde = (self._inicio_por_presupuesto(db, sesion, desde[0],
+                                                      presupuesto_tokens - (system[1] if system else 0)),)
+            filas = db.execute(
+                "SELECT mensaje FROM mensajes WHERE sesion = ? AND id >= ? AND rol != 'system' ORDER BY id",
+                (sesion, desde[0])).fetchall()
+        mensajes = [decodificar(fila[0]) for fila in filas]
+        return ([decodificar(system[0])] if system else []) + mensajes
+
+    @staticmethod
+    def _inicio_por_presupuesto(db: sqlite3.Connection, sesion: str, desde_id: int, disponible: int) -> int:
+        """
+        Recorre los mensajes desde el final sumando sus tokens guardados y devuelve el
+        id del `user` más antiguo cuyo intercambio completo aún cabe en `disponible`.
+        """
+        usados = grupo = 0
+        inicio = None
+        cursor = db.execute(
+            "SELECT id, rol, tokens FROM mensajes WHERE sesion = ? AND id >= ? AND rol != 'system' ORDER BY id DESC",
+            (sesion, desde_id))
+        for id_mensaje, rol, tokens in cursor:
+            grupo += tokens
+            if rol == "user":
+                if inicio is not None and usados + grupo > disponible:
+                    break
+                usados += grupo
+                grupo = 0
+                inicio = id_mensaje
+        cursor.close()
+        return desde_id if inicio is None else inicio
+
+    def todos(self, sesion: str) -> list[Mensaje]:
+        """
+        Devuelve la conversación completa, incluidos los segmentos compactados.
+        Pensado para exportar o auditar, no para cada turno.
+
+        Args:
+            sesion (str): Id de la conversación.
+
+        Returns:
+            list[Mensaje]: Todos los mensajes en orden cronológico.
+        """
+        with self._lock:
+            db = self._conexion()
+            segmentos = db.execute("SELECT desde_id, datos FROM segmentos WHERE sesion = ?", (sesion,)).fetchall()
+            filas = db.execute("SELECT id, mensaje FROM mensajes WHERE sesion = ?", (sesion,)).fetchall()
+        # Los segmentos y las filas activas se intercalan por id (el system queda activo)
+        bloques = [(desde_id, decodificar(zlib.decompress(datos))) for desde_id, datos in segmentos]
+        bloques += [(id_mensaje, [decodificar(mensaje)]) for id_mensaje, mensaje in filas]
+        bloques.sort(key=lambda bloque: bloque[0])
+        return [mensaje for _, grupo in bloques for mensaje in grupo]
+
+    def sesiones(self) -> list[str]:
+        """
+        Returns:
+            list[str]: Ids de las conversaciones con mensajes activos.
+        """
+        with self._lock:
+            return [fila[0] for fila in self._conexion().execute("SELECT DISTINCT sesion FROM mensajes ORDER BY sesion")]
+
+    def compactar(self, sesion: str, conservar_intercambios: int | None = None) -> int:
+        """
+        Mueve los mensajes anteriores a los últimos `conservar_intercambios` a un
+        segmento comprimido. El último mensaje system se queda siempre activo.
+        Usa una conexión propia: se puede llamar desde otro hilo.
+
+        Args:
+            sesion (str): Id de la conversación.
+            conservar_intercambios (int | None): Intercambios que quedan activos
+                (por defecto, los del almacén).
+
+        Returns:
+            int: Número de mensajes compactados.
+        """
+        conservar = self.conservar_intercambios if conservar_intercambios is None else conservar_intercambios
+        db = self._conectar()
+        try:
+            with db:  # una única transacción
+                corte = db.execute(
+                    "SELECT id FROM mensajes WHERE sesion = ? AND rol = 'user' ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (sesion, max(conservar, 1) - 1)).fetchone()
+                if corte is None:
+                    return 0
+                system = db.execute(
+                    "SELECT id FROM mensajes WHERE sesion = ? AND rol = 'system' ORDER BY id DESC LIMIT 1",
+                    (sesion,)).fetchone()
+                id_system = system[0] if system else -1
+                filas = db.execute(
+                    "SELECT id, mensaje FROM mensajes WHERE sesion = ? AND id < ? AND id != ? ORDER BY id",
+                    (sesion, corte[0], id_system)).fetchall()
+                if not filas:
+                    return 0
+                datos = zlib.compress(("[" + ",".join(fila[1] for fila in filas) + "]").encode("utf-8"))
+                db.execute("INSERT INTO segmentos VALUES (?, ?, ?, ?)", (sesion, filas[0][0], filas[-1][0], datos))
+                db.execute("DELETE FROM mensajes WHERE sesion = ? AND id < ? AND id != ?", (sesion, corte[0], id_system))
+            return len(filas)
+        finally:
+            db.close()
+
+    def compactar_en_segundo_plano(self, sesion: str) -> threading.Thread:
+        """
+        Lanza `compactar(sesion)` en un hilo aparte, fuera del camino de la petición.
+
+        Args:
+            sesion (str): Id de la conversación.
+
+        Returns:
+            threading.Thread: Hilo lanzado (daemon).
+        """
+        def tarea() -> None:
+            try:
+                compactados = self.compactar(sesion)
+                if compactados:
+                    info(f"🗜️ Historial '{sesion}': {compactados} mensaje(s) compactados.")
+            except Exception as e:
+                error(f"Error al compactar el historial '{sesion}': {e}")
+            finally:
+                with self._lock:
+                    self._compactando.discard(sesion)
+
+        with self._lock:
+            self._compactando.add(sesion)
+            self._hilos = [h for h in self._hilos if h.is_alive()]
+            hilo = threading.Thread(target=tarea, name=f"compactar-{sesion}", daemon=True)
+            self._hilos.append(hilo)
+        hilo.start()
+        return hilo
+
+    def cerrar(self) -> None:
+        """Espera a las compactaciones en curso y cierra la conexión."""
+        for hilo in list(self._hilos):
+            hilo.join()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_almacen_compartido: AlmacenHistorial | None = None
+
+
+def obtener_almacen_historial() -> AlmacenHistorial:
+    """
+    Devuelve el almacén de historial compartido del proceso, creándolo la primera vez.
+    La ruta se toma de `HISTORIAL_SQLITE` (se lee aquí, después de `load_dotenv()`).
+
+    Returns:
+        AlmacenHistorial: Almacén compartido.
+    """
+    global _almacen_compartido
+    if _almacen_compartido is None:
+        _almacen_compartido = AlmacenHistorial(os.getenv("HISTORIAL_SQLITE") or RUTA_SQLITE_POR_DEFECTO)
+    return _almacen_compartido
+
+
+def cerrar_almacen_historial() -> None:
+    """Cierra el almacén compartido (si se llegó a crear)."""
+    global _almacen_compartido
+    if _almacen_compartido is not None:
+        _almacen_compartido.cerrar()
+        _almacen_compartido = None
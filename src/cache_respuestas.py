@@ -0,0 +1,209 @@
+# src/cache_respuestas.py
+"""
+Caché de respuestas del modelo (completions) indexada por el payload normalizado.
+
+La primera llamada de `client.main` es prácticamente determinista (system prompt
+fijo + "Herramienta 'X'"), pero se reenviaba a OpenRouter en cada selección del
+menú. Este módulo guarda el cuerpo de las respuestas 200 y lo reutiliza cuando
+llega un payload equivalente.
+
+Funcionalidades:
+- Clave canónica: hash SHA-256 de modelo, mensajes, tools y temperature
+  (JSON con claves ordenadas, así que el orden de los diccionarios no importa).
+  Las tools del contrato no se vuelven a serializar: se usa el texto que ya
+  guarda el registro (ver `registro_tools.serializar_tools`).
+- Nivel en memoria LRU con tamaño máximo.
+- Nivel opcional en disco (SQLite) que sobrevive entre ejecuciones.
+- Expiración por TTL y desalojo por tamaño en ambos niveles.
+- Contadores de aciertos y fallos (`estadisticas()`).
+
+🔐 Configuración (opcional, en `.env`):
+    OPENROUTER_CACHE_TTL=3600                      # segundos
+    OPENROUTER_CACHE_SQLITE=contexto/cache_completions.sqlite3
+
+Ejemplo de uso:
+    cache = obtener_cache_completions()
+    clave = cache.clave(payload)
+    cuerpo = cache.obtener(clave)      # bytes o None
+    if cuerpo is None:
+        ...
+        cache.guardar(clave, response.content)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from registro_tools import serializar_tools
+
+
+CAMPOS_CLAVE = ("model", "messages", "temperature")  # más "tools", que se añade ya serializado
+MAX_ENTRADAS_MEMORIA_POR_DEFECTO = 256
+MAX_ENTRADAS_DISCO_POR_DEFECTO = 5000
+TTL_POR_DEFECTO = 3600.0  # segundos
+
+
+class CacheCompletions:
+    """
+    Caché de dos niveles (memoria LRU + SQLite opcional) para cuerpos de respuesta.
+    Es segura entre hilos: la sesión síncrona y la asíncrona pueden compartirla.
+    """
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS_MEMORIA_POR_DEFECTO, ttl: float = TTL_POR_DEFECTO,
+                 ruta_sqlite: str | None = None, max_entradas_disco: int = MAX_ENTRADAS_DISCO_POR_DEFECTO) -> None:
+        """
+        Args:
+            max_entradas (int): Número máximo de respuestas en memoria.
+            ttl (float): Segundos de validez de cada respuesta.
+            ruta_sqlite (str | None): Archivo SQLite para el nivel en disco. None lo desactiva.
+            max_entradas_disco (int): Número máximo de respuestas en disco.
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.max_entradas_disco = max_entradas_disco
+        self._memoria: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self._db: sqlite3.Connection | None = None
+        if ruta_sqlite:
+            self._db = sqlite3.connect(ruta_sqlite, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " clave TEXT PRIMARY KEY, cuerpo BLOB NOT NULL, expira REAL NOT NULL, usado REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def clave(payload: dict) -> str:
+        """
+        Calcula la clave canónica de un payload.
+
+        Args:
+            payload (dict): Payload tal como se envía a OpenRouter.
+
+        Returns:
+            str: Hash hexadecimal SHA-256 de los campos relevantes.
+        """
+        relevante = {campo: payload.get(campo) for campo in CAMPOS_CLAVE}
+        canonico = json.dumps(relevante, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        huella = hashlib.sha256(canonico.encode("utf-8"))
+        if payload.get("tools") is not None:
+            huella.update(b"\x00" + serializar_tools(payload["tools"]).encode("utf-8"))
+        return huella.hexdigest()
+
+    def obtener(self, clave: str) -> bytes | None:
+        """
+        Busca una respuesta vigente, primero en memoria y luego en disco.
+
+        Args:
+            clave (str): Clave calculada con `clave()`.
+
+        Returns:
+            bytes | None: Cuerpo de la respuesta cacheada, o None si no hay.
+        """
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                expira, cuerpo = entrada
+                if expira > ahora:
+                    self._memoria.move_to_end(clave)
+                    self.aciertos_memoria += 1
+                    return cuerpo
+                del self._memoria[clave]
+
+            if self._db is not None:
+                fila = self._db.execute("SELECT cuerpo, expira FROM completions WHERE clave = ?", (clave,)).fetchone()
+                if fila is not None and fila[1] > ahora:
+                    self._db.execute("UPDATE completions SET usado = ? WHERE clave = ?", (ahora, clave))
+                    self._db.commit()
+                    self._guardar_en_memoria(clave, fila[1], fila[0])
+                    self.aciertos_disco += 1
+                    return fila[0]
+
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave: str, cuerpo: bytes) -> None:
+        """
+        Guarda el cuerpo de una respuesta en ambos niveles.
+
+        Args:
+            clave (str): Clave calculada con `clave()`.
+            cuerpo (bytes): Cuerpo JSON de una respuesta 200.
+        """
+        ahora = time.time()
+        expira = ahora + self.ttl
+        with self._lock:
+            self._guardar_en_memoria(clave, expira, cuerpo)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)", (clave, cuerpo, expira, ahora))
+                self._db.execute("DELETE FROM completions WHERE expira <= ?", (ahora,))
+                self._db.execute(
+                    "DELETE FROM completions WHERE clave NOT IN"
+                    " (SELECT clave FROM completions ORDER BY usado DESC LIMIT ?)", (self.max_entradas_disco,))
+                self._db.commit()
+
+    def _guardar_en_memoria(self, clave: str, expira: float, cuerpo: bytes) -> None:
+        """Inserta en el nivel LRU desalojando la entrada menos usada si hace falta."""
+        self._memoria[clave] = (expira, cuerpo)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def estadisticas(self) -> dict:
+        """
+        Returns:
+            dict: Aciertos (memoria y disco), fallos, tasa de acierto y entradas en memoria.
+        """
+        with self._lock:
+            aciertos = self.aciertos_memoria + self.aciertos_disco
+            total = aciertos + self.fallos
+            return {
+                "aciertos_memoria": self.aciertos_memoria,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "tasa_acierto": round(aciertos / total, 3) if total else 0.0,
+                "entradas_memoria": len(self._memoria),
+            }
+
+    def limpiar(self) -> None:
+        """Vacía ambos niveles."""
+        with self._lock:
+            self._memoria.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM completions")
+                self._db.commit()
+
+    def cerrar(self) -> None:
+        """Cierra la conexión SQLite (si la hay)."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache_compartida: CacheCompletions | None = None
+
+
+def obtener_cache_completions() -> CacheCompletions:
+    """
+    Devuelve la caché de completions compartida del proceso, creándola la primera vez.
+    El nivel en disco se activa si está definida `OPENROUTER_CACHE_SQLITE` y el TTL
+    se toma de `OPENROUTER_CACHE_TTL` (se leen aquí, después de `load_dotenv()`).
+
+    Returns:
+        CacheCompletions: Caché compartida.
+    """
+    global _cache_compartida
+    if _cache_compartida is None:
+        _cache_compartida = CacheCompletions(ttl=float(os.getenv("OPENROUTER_CACHE_TTL", TTL_POR_DEFECTO)),
+                                             ruta_sqlite=os.getenv("OPENROUTER_CACHE_SQLITE") or None)
+    return _cache_compartida
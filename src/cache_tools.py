@@ -0,0 +1,142 @@
+# src/cache_tools.py
+"""
+Caché en el cliente para resultados de herramientas MCP puras.
+
+Herramientas como `suma` devuelven siempre lo mismo para los mismos argumentos,
+pero cada llamada hacía un viaje de ida y vuelta por stdio hasta `server.py`.
+Las herramientas se marcan como cacheables en el propio servidor con las
+anotaciones MCP estándar:
+
+    @mcp.tool(annotations={"readOnlyHint": True, "idempotentHint": True})
+
+El pool de clientes (`pool_mcp`) lee esas anotaciones con `list_tools` y calcula
+una huella de la lista de herramientas. Esta caché:
+- Indexa por nombre de herramienta + argumentos canónicos (JSON con claves ordenadas).
+- Tiene tamaño máximo (LRU) y TTL.
+- Se vacía sola cuando cambia la huella del servidor (herramientas nuevas,
+  firmas distintas, server.py editado y reiniciado...). La huella que se le pasa
+  tiene como mucho `intervalo_salud` segundos (ver `PoolClientesMCP.huella_reciente`),
+  también cuando todas las llamadas salen de la caché.
+- Guarda cada resultado ya codificado en JSON (ver `serializacion`): un acierto
+  devuelve ese mismo texto para el historial y una copia nueva al decodificarlo.
+"""
+
+import time
+from collections import OrderedDict
+
+from serializacion import codificar, decodificar
+
+
+MAX_ENTRADAS_POR_DEFECTO = 1024
+TTL_POR_DEFECTO = 600.0  # segundos
+
+
+class CacheResultadosTools:
+    """Caché LRU con TTL de resultados de herramientas, invalidada por huella del servidor."""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS_POR_DEFECTO, ttl: float = TTL_POR_DEFECTO) -> None:
+        """
+        Args:
+            max_entradas (int): Número máximo de resultados guardados.
+            ttl (float): Segundos de validez de cada resultado.
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.huella = ""
+        self.cacheables: frozenset[str] = frozenset()
+        self._entradas: OrderedDict[tuple[str, str], tuple[float, str]] = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def sincronizar(self, huella: str, cacheables: frozenset[str]) -> None:
+        """
+        Actualiza qué herramientas son cacheables. Si la huella del servidor cambió,
+        se descartan todos los resultados guardados.
+
+        Args:
+            huella (str): Huella de la lista de herramientas del servidor.
+            cacheables (frozenset[str]): Nombres de herramientas puras.
+        """
+        if huella != self.huella:
+            self._entradas.clear()
+            self.huella = huella
+        self.cacheables = cacheables
+
+    @staticmethod
+    def _clave(nombre_tool: str, argumentos: dict) -> tuple[str, str]:
+        return nombre_tool, codificar(argumentos, ordenar_claves=True)
+
+    def obtener(self, nombre_tool: str, argumentos: dict) -> dict | None:
+        """
+        Args:
+            nombre_tool (str): Nombre de la herramienta.
+            argumentos (dict): Argumentos de la llamada.
+
+        Returns:
+            dict | None: Copia del resultado guardado, o None si no hay (o no es cacheable).
+        """
+        codificado = self.obtener_codificado(nombre_tool, argumentos)
+        return None if codificado is None else decodificar(codificado)
+
+    def obtener_codificado(self, nombre_tool: str, argumentos: dict) -> str | None:
+        """
+        Args:
+            nombre_tool (str): Nombre de la herramienta.
+            argumentos (dict): Argumentos de la llamada.
+
+        Returns:
+            str | None: Resultado guardado como texto JSON, o None si no hay (o no es cacheable).
+        """
+        if nombre_tool not in self.cacheables:
+            return None
+        clave = self._clave(nombre_tool, argumentos)
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[0] > time.monotonic():
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+        if entrada is not None:
+            del self._entradas[clave]
+        self.fallos += 1
+        return None
+
+    def guardar(self, nombre_tool: str, argumentos: dict, resultado: dict | str) -> None:
+        """
+        Guarda el resultado si la herramienta es cacheable.
+
+        Args:
+            nombre_tool (str): Nombre de la herramienta.
+            argumentos (dict): Argumentos de la llamada.
+            resultado (dict | str): Resultado devuelto por `ejecutar_tool_manual`, o su texto JSON.
+        """
+        if nombre_tool not in self.cacheables:
+            return
+        clave = self._clave(nombre_tool, argumentos)
+        codificado = resultado if isinstance(resultado, str) else codificar(resultado)
+        self._entradas[clave] = (time.monotonic() + self.ttl, codificado)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def invalidar(self) -> None:
+        """Descarta todos los resultados guardados."""
+        self._entradas.clear()
+
+
+_CACHES: dict[str, CacheResultadosTools] = {}
+
+
+def obtener_cache_tools(script_path: str = "server.py") -> CacheResultadosTools:
+    """
+    Devuelve la caché de resultados del servidor `script_path` (una por servidor,
+    ya que cada uno tiene su propia huella).
+
+    Args:
+        script_path (str): Ruta al script del servidor MCP.
+
+    Returns:
+        CacheResultadosTools: Caché compartida para ese servidor.
+    """
+    if script_path not in _CACHES:
+        _CACHES[script_path] = CacheResultadosTools()
+    return _CACHES[script_path]
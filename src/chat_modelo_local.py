@@ -1,10 +1,18 @@
+import asyncio
 import requests
+import httpx
 import os
 from dotenv import load_dotenv
 import json
-from typing import Dict, List, Tuple, Any
+from typing import Any, Callable, Dict, List, Tuple
 from pathlib import Path
 from logging_mcp import info, error
+from sesion_http import ESTADOS_REINTENTABLES, SesionOpenRouterAsync, cerrar_sesion_async, obtener_sesion_async
+from cache_respuestas import obtener_cache_completions
+from almacen_historial import SESION_POR_DEFECTO, obtener_almacen_historial
+from presupuesto_tokens import ajustar_a_presupuesto, presupuesto_para_modelo
+from limitador_tasa import obtener_planificador
+from respuesta_modelo import RespuestaModelo
 
 
 load_dotenv()
@@ -42,21 +50,28 @@ usado desde regiones con restricciones (como Cuba), sin necesidad de tarjeta ni
    - El historial incluye contexto para mantener conversaciones coherentes.
 
 3. 📡 Comunicación con la API
-   - `crear_payload()`: prepara los datos para enviar a la API.
-   - `hacer_solicitud_http_al_modelo()`: hace la solicitud POST y maneja errores de red.
+   - `crear_payload()`: prepara los datos para enviar a la API y ajusta los mensajes
+     al presupuesto de tokens del modelo (`presupuesto_tokens`).
+   - `hacer_solicitud_http_al_modelo_async()`: hace la solicitud POST sin bloquear el bucle de
+     eventos, pasando cada intento por el planificador de `limitador_tasa`, y maneja errores de red.
+   - Las conexiones se reutilizan mediante la sesión compartida de `sesion_http`.
+   - Las respuestas se cachean por payload normalizado (`cache_respuestas`); `usar_cache=False` lo evita.
 
 4. 🧹 Limpieza inteligente del historial
-   - Extrae el mensaje `system`.
-   - Agrupa intercambios (user → assistant).
-   - Mantiene solo los últimos N intercambios (por defecto 5).
+   - Conserva el mensaje `system`.
+   - Agrupa intercambios (user → assistant, incluidas llamadas y resultados `tool`).
+   - Mantiene solo los últimos N intercambios (por defecto 5), recorriendo desde el final.
+   - Lo descartado puede resumirse en segundo plano (`resumen_historial.ResumidorHistorial`,
+     vía el parámetro `al_descartar`, o en `crear_payload` con `ajustar_mensajes`).
    - Evita que el archivo crezca indefinidamente.
    - Funciones: `extraer_system_y_conversacion`, `agrupar_en_pares`, `limitar_historial_inteligente`, etc.
 
 5. 💾 Actualización del historial
    - `actualizar_json_mensaje_qwen()`: 
         a) Agrega la respuesta del modelo.
-        b) Limita el historial.
-        c) Guarda en el archivo JSON.
+        b) Con `mensaje_json`, guarda el historial limitado en ese archivo (como antes).
+        c) Con `sesion=`, anexa solo los mensajes nuevos al almacén de historial
+           (`almacen_historial`, SQLite de solo anexado, una conversación por id de sesión).
 
 ⚡ Flujo de ejecución:
   1. Cargar historial
@@ -64,8 +79,7 @@ usado desde regiones con restricciones (como Cuba), sin necesidad de tarjeta ni
   3. Enviar a Qwen vía OpenRouter
   4. Recibir y mostrar respuesta
   5. Agregar respuesta al historial
-  6. Limitar historial (solo últimos intercambios)
-  7. Guardar en disco
+  6. Anexar el turno al almacén (el recorte a los últimos intercambios se hace al leer)
 
 🔐 Configuración requerida:
   - Crea un archivo `.env` en la misma carpeta:
@@ -81,7 +95,6 @@ usado desde regiones con restricciones (como Cuba), sin necesidad de tarjeta ni
 
 💡 Próximos pasos (ideas):
   - Convertirlo en un chat interactivo con `while True` y `input()`.
-  - Añadir resumen automático del historial si es muy largo.
   - Soporte para múltiples modelos (DeepSeek, Mistral, etc.).
 
 Creado por: Abel
@@ -177,19 +190,47 @@ def reconstruir_historial(system_msg: Mensaje | None, pares: List[Par]) -> Histo
     return mensajes
 
 
-def limitar_historial_inteligente(mensajes: Historial, max_intercambios: int = 5) -> Historial:
+def limitar_historial_inteligente(mensajes: Historial, max_intercambios: int = 5,
+                                  al_descartar: Callable[[Historial], None] | None = None) -> Historial:
     """
     Limita el historial manteniendo el system y los últimos N intercambios.
+    Recorre la lista desde el final y se detiene al completar N intercambios, así
+    que el coste es proporcional a la ventana conservada, no al historial completo.
+    Un intercambio es un mensaje `user` y todo lo que le sigue hasta el siguiente
+    `user` (respuestas `assistant`, llamadas a herramientas y sus resultados `tool`),
+    de modo que cada resultado de herramienta se conserva junto a su llamada.
     Args:
         mensajes (Historial): Lista de mensajes completa.
         max_intercambios (int): Número máximo de intercambios a mantener.
+        al_descartar (Callable[[Historial], None] | None): Si se indica, recibe los mensajes
+            descartados (sin el system), p. ej. para resumirlos (ver `resumen_historial`).
     Returns:
-        Historial: Lista de mensajes limitada a system + últimos N pares.
+        Historial: Lista de mensajes limitada a system + últimos N intercambios.
+        El system es el último que aparece en la ventana o, si no hay ninguno, `mensajes[0]`.
     """
-    system_msg, conversacion = extraer_system_y_conversacion(mensajes)
-    pares = agrupar_en_pares(conversacion)
-    pares_recientes = mantener_ultimos_pares(pares, max_intercambios)
-    return reconstruir_historial(system_msg, pares_recientes)
+    inicio = len(mensajes)  # posición del primer mensaje conservado
+    system_msg = None
+    intercambios = 0
+    i = len(mensajes) - 1
+    while i >= 0 and intercambios < max_intercambios:
+        rol = mensajes[i]["role"]
+        if rol == "user":
+            intercambios += 1
+            inicio = i
+        elif rol == "system" and system_msg is None:
+            system_msg = mensajes[i]
+        i -= 1
+
+    if system_msg is None and mensajes and mensajes[0]["role"] == "system":
+        system_msg = mensajes[0]
+    # Los mensajes anteriores al primer `user` de la ventana (huérfanos) se descartan
+    recortado = [system_msg] if system_msg else []
+    recortado.extend(msg for msg in mensajes[inicio:] if msg["role"] != "system")
+    if al_descartar is not None and inicio > 0:
+        descartados = [msg for msg in mensajes[:inicio] if msg["role"] != "system"]
+        if descartados:
+            al_descartar(descartados)
+    return recortado
 
 
 
@@ -253,104 +294,180 @@ def agregar_mensaje_usuario(lista_messages:list, mensaje_usuario: str) -> None:
         raise
 
 
-def crear_payload(lista_messages:list,modelo: str) -> dict:
+# Alias cortos de los modelos gratuitos → id del modelo en OpenRouter
+MODELOS = {
+    "qwen": "qwen/qwen-turbo",
+    "mistral": "mistralai/mistral-7b-instruct",
+    "mixtral": "nousresearch/nous-hermes-2-mixtral-8x7b-dpo",
+}
+
+
+def crear_payload(lista_messages:list,modelo: str, stream: bool = False, tools: list | None = None,
+                  ajustar_contexto: bool = True,
+                  ajustar_mensajes: Callable[[Historial, int], Historial] = ajustar_a_presupuesto) -> dict:
     """
     Prepara los datos del modelo para la solicitud.
+    Los mensajes se recortan al presupuesto de tokens del modelo (ver `presupuesto_tokens`):
+    se conservan el system y los intercambios más recientes que quepan.
     Args:
-        modelo (str): El nombre del modelo a usar.
+        modelo (str): El nombre del modelo a usar (alias de `MODELOS` o id de OpenRouter).
+        stream (bool): Si es True, pide la respuesta en streaming (SSE).
+        tools (list | None): Herramientas a incluir en el payload; cuentan para el presupuesto.
+        ajustar_contexto (bool): Si es False, envía los mensajes sin recortar.
+        ajustar_mensajes (Callable[[Historial, int], Historial]): Recorta los mensajes a un
+            presupuesto de tokens. Por defecto `ajustar_a_presupuesto`; `ResumidorHistorial.ajustador`
+            además resume lo descartado y antepone el resumen.
     Returns:
         dict: Un diccionario con los datos del modelo.
     """
     try:
-        if modelo == "qwen":
-            modelo = "qwen/qwen-turbo"
-        elif modelo == "mistral":
-            modelo = "mistralai/mistral-7b-instruct"
-        elif modelo == "mixtral":
-            modelo = "nousresearch/nous-hermes-2-mixtral-8x7b-dpo"
+        modelo = MODELOS.get(modelo, modelo)
+        if ajustar_contexto:
+            lista_messages = ajustar_mensajes(lista_messages, presupuesto_para_modelo(modelo, tools))
         data = {
         "model": modelo,  # ✅ Modelo gratuito activo
         "messages": lista_messages,
         "temperature": 0.7
         }
+        if tools is not None:
+            data["tools"] = tools
+        if stream:
+            data["stream"] = True
         return data
     except Exception as e:
         error(f"Error al crear el payload: {e}")
         raise
 
 
-def hacer_solicitud_http_al_modelo(url: str, headers: dict, data: dict) -> requests.Response:
+async def hacer_solicitud_http_al_modelo_async(url: str, headers: dict, data: dict, sesion: SesionOpenRouterAsync | None = None,
+                                              usar_cache: bool = True, timeout: float | None = None,
+                                              al_obtener_turno: Callable[[], Any] | None = None) -> httpx.Response:
     """Hace una solicitud POST al modelo de IA usando la URL, cabeceras y datos proporcionados.
+    No bloquea el bucle de eventos, por lo que varias llamadas al modelo (y a MCP)
+    pueden solaparse en el mismo hilo. Si un payload equivalente ya se respondió, devuelve
+    la respuesta cacheada sin tocar la red (ver `cache_respuestas`).
+    Las peticiones que no salen de la caché pasan por el planificador de `limitador_tasa`,
+    que respeta las cuotas por API key y por modelo. Cada intento (también los reintentos
+    ante 429/5xx o fallos de conexión) espera su turno y le pasa la respuesta al planificador:
+    un 429 pausa el cubo del modelo (`Retry-After`) y el reintento espera en la cola.
 
     Args:
         url (str): La URL del modelo de IA.
         headers (dict): Cabeceras de la solicitud.
         data (dict): Payload de la solicitud.
+        sesion (SesionOpenRouterAsync | None): Sesión HTTP asíncrona. Si es None, se usa la compartida.
+        usar_cache (bool): False para prompts no deterministas que no deben cachearse.
+        timeout (float | None): Segundos máximos por intento, contados desde que el planificador
+            da el turno (la espera en la cola no cuenta). None: sin límite.
+        al_obtener_turno (Callable[[], Any] | None): Se llama cada vez que un intento obtiene el
+            turno, p. ej. para medir la latencia del modelo sin la cola (ver `enrutador_modelos`).
 
     Returns:
-        requests.Response: Respuesta a la solicitud POST a la URL de la IA
+        httpx.Response: Respuesta a la solicitud POST a la URL de la IA
 
     Exceptions:
-        requests.RequestException: Si ocurre un error al hacer la solicitud.
+        httpx.HTTPError: Si ocurre un error al hacer la solicitud.
     """
+    cache = obtener_cache_completions() if usar_cache and not data.get("stream") else None
+    clave = cache.clave(data) if cache else ""
+    if cache and (cuerpo := cache.obtener(clave)) is not None:
+        info("♻️ Respuesta del modelo servida desde caché.")
+        return httpx.Response(200, content=cuerpo, request=httpx.Request("POST", url),
+                              headers={"Content-Type": "application/json", "X-Cache": "HIT"})
+    planificador = obtener_planificador()
+    sesion = sesion or obtener_sesion_async()
+    modelo = data.get("model", "")
     try:
-        response = requests.post(url, headers=headers, json=data)
+        for intento in range(sesion.reintentos + 1):
+            ultimo = intento == sesion.reintentos
+            await planificador.esperar_turno(headers, modelo)
+            if al_obtener_turno is not None:
+                al_obtener_turno()
+            try:
+                # Sin reintentos dentro de la sesión: cada uno vuelve a pasar por el planificador
+                response = await asyncio.wait_for(sesion.post(url, headers=headers, json=data, reintentos=0), timeout)
+            except httpx.TransportError:
+                if ultimo:
+                    raise
+                await asyncio.sleep(sesion.espera_reintento(intento, None))
+                continue
+            planificador.registrar_respuesta(headers, modelo, response)
+            if response.status_code not in ESTADOS_REINTENTABLES or ultimo:
+                break
+            if response.status_code != 429:  # un 429 ya pausó el cubo del modelo: se espera en la cola
+                await asyncio.sleep(sesion.espera_reintento(intento, response))
         response.raise_for_status()  # ← Lanza excepción si no es 2xx
-        return response  # ← Solo si fue exitosa
-    except requests.RequestException as e:
-        if hasattr(e, 'response') and e.response is not None:
-            error(f"Error {e.response.status_code}: {e.response.text}")
-        else:
-            error(f"Error de conexión: {e}")
-        raise  # Re-lanza para que el llamador lo maneje
+        if cache:
+            cache.guardar(clave, response.content)
+        return response
+    except httpx.HTTPStatusError as e:
+        error(f"Error {e.response.status_code}: {e.response.text}")
+        raise
+    except httpx.HTTPError as e:
+        error(f"Error de conexión: {e}")
+        raise
 
 
-def actualizar_json_mensaje_qwen(lista_messages: list, response: requests.Response, mensaje_json: str) -> None:
+def actualizar_json_mensaje_qwen(lista_messages: list, response: requests.Response | httpx.Response | RespuestaModelo,
+                                 mensaje_json: str | None = None, *, sesion: str | None = None) -> None:
     """
-    Actualiza el archivo JSON con la respuesta del modelo.
+    Registra la respuesta del modelo en el historial.
     Si la solicitud es exitosa y la respuesta es JSON válido:
-    1. Agrega la respuesta del modelo al historial.
-    2. Limita el historial para evitar crecimiento indefinido (mantiene system + últimos intercambios).
-    3. Guarda el historial limitado en el archivo.
+    1. Agrega la respuesta del modelo a la lista de mensajes.
+    2. Si se indica `mensaje_json`, guarda en ese archivo el historial limitado
+       (comportamiento original, se reescribe el archivo completo).
+    3. Si se indica `sesion` (o no se indica archivo), añade al almacén de historial
+       (`almacen_historial`) solo los mensajes nuevos: el último mensaje del usuario y la
+       respuesta (o toda la lista si la sesión es nueva).
 
     Args:
         lista_messages (list): Lista de mensajes que se actualizará con la respuesta del modelo.
-        response (requests.Response): La respuesta de la API.
-        mensaje_json (str): El nombre del archivo JSON a actualizar.
+        response (requests.Response | httpx.Response | RespuestaModelo): La respuesta de la API (se decodifica una sola vez).
+        mensaje_json (str | None): Ruta del archivo JSON donde se guarda el historial limitado.
+        sesion (str | None): Id de la conversación en el almacén de historial. Si no se
+            indica ni `sesion` ni `mensaje_json`, se usa `SESION_POR_DEFECTO`.
 
     Returns:
-        None: No retorna nada. Modifica la lista y guarda en el archivo.
+        None: No retorna nada. Modifica la lista, el archivo y/o el almacén.
 
     Note:
         - Si la respuesta no es exitosa (código != 200), se imprime el error y no se guarda.
         - Si la respuesta no es JSON válido, se imprime el error y no se guarda.
         - No se lanzan excepciones; todos los errores se manejan internamente.
-        - El historial se limita a los últimos 5 intercambios (ajustable en limitar_historial_inteligente). ← CAMBIO (actualizado en docstring)
+        - Para recuperar el contexto se usa `almacen.ultimos_intercambios(sesion, ...)`,
+          que lee solo los últimos intercambios (por número o por presupuesto de tokens).
     """
-    if response.status_code != 200:
-        error(f"Error: {response.status_code}. Contenido del error:{response.text}")
+    respuesta_modelo = RespuestaModelo.desde(response)
+    if respuesta_modelo.status_code != 200:
+        error(f"Error: {respuesta_modelo.status_code}. Contenido del error:{respuesta_modelo.texto}")
         return
 
     try:
-        result = response.json()
-        reply = result["choices"][0]["message"]["content"]
-        info(f"Respuesta:")
+        reply = respuesta_modelo.contenido
+        info(f"Respuesta: ({respuesta_modelo.usage.total_tokens} tokens)")
         info(f"{reply}")
 
-        # Agregar la respuesta del modelo al historial
-        lista_messages.append({"role": "assistant", "content": reply})
+        if sesion is None and mensaje_json is None:
+            sesion = SESION_POR_DEFECTO
+        if sesion is not None:
+            almacen = obtener_almacen_historial()
+            nuevos = lista_messages[-1:] if almacen.existe(sesion) else list(lista_messages)
 
-        # ← CAMBIO: Limitar el historial ANTES de guardar
-        lista_limitada = limitar_historial_inteligente(lista_messages, max_intercambios=5)
+        # Agregar la respuesta del modelo al historial
+        respuesta = {"role": "assistant", "content": reply}
+        lista_messages.append(respuesta)
 
-        # ← CAMBIO: Guardar el historial limitado, no el original
-        with open(mensaje_json, "w", encoding="utf-8") as file:
-            json.dump(lista_limitada, file, indent=2, ensure_ascii=False)
+        if mensaje_json is not None:
+            lista_limitada = limitar_historial_inteligente(lista_messages, max_intercambios=5)
+            with open(mensaje_json, "w", encoding="utf-8") as file:
+                json.dump(lista_limitada, file, indent=2, ensure_ascii=False)
+        if sesion is not None:
+            almacen.agregar_varios(sesion, nuevos + [respuesta])
 
-    except json.JSONDecodeError as e:
+    except ValueError as e:  # JSONDecodeError de json u orjson
         error(f"Error al decodificar la respuesta JSON: {e}")
         error("Contenido recibido (no es JSON):")
-        error(f"{response.text}")
+        error(f"{respuesta_modelo.texto}")
 
 
 
@@ -360,11 +477,23 @@ ruta_raiz = ruta_actual.parent
 ruta_mensaje_modelo = ruta_raiz / "contexto/mensaje_modelo.json"
 
 if __name__ == "__main__":
-    lista_messages = cargar_mensajes(str(ruta_mensaje_modelo))
+    # Se continúa la conversación "demo" si existe (tantos intercambios como quepan en
+    # el contexto del modelo); si no, se parte de la plantilla
+    presupuesto = presupuesto_para_modelo(MODELOS["mistral"])
+    lista_messages = (obtener_almacen_historial().ultimos_intercambios("demo", None, presupuesto)
+                      or cargar_mensajes(str(ruta_mensaje_modelo)))
     agregar_mensaje_usuario(lista_messages, "Hola, ¿cómo te llamas?")
     data = crear_payload(lista_messages, "mistral")
     url, headers = openrouter_connect()
-    response = hacer_solicitud_http_al_modelo(url, headers, data)
-    actualizar_json_mensaje_qwen(lista_messages, response, str(ruta_mensaje_modelo))
+
+    async def solicitar() -> httpx.Response:
+        # Misma ruta que client.py: cada intento pasa por el planificador de cuotas
+        try:
+            return await hacer_solicitud_http_al_modelo_async(url, headers, data)
+        finally:
+            await cerrar_sesion_async()
+
+    response = asyncio.run(solicitar())
+    actualizar_json_mensaje_qwen(lista_messages, response, sesion="demo")
 
 
@@ -0,0 +1,151 @@
+# src/contrato_servidor.py
+"""
+Generación automática del contrato de herramientas a partir del servidor MCP.
+
+`contexto/contrato_tools.json` repetía a mano lo que `server.py` ya declara con
+`@mcp.tool()` y sus anotaciones de tipos (y se desincronizaba). Este módulo:
+1. Calcula una huella del servidor (contenido de `server.py` y de los módulos locales
+   que importa, más la versión de fastmcp).
+2. Si `contexto/contrato_generado.json` tiene esa misma huella, lo usa tal cual,
+   sin arrancar el servidor.
+3. Si no, pide `list_tools` al servidor (a través del pool de `pool_mcp`),
+   convierte las herramientas al formato `tools` de OpenRouter y guarda el
+   resultado con la huella nueva.
+4. Apunta el registro compartido (`registro_tools`) a ese archivo, de modo que
+   el menú y el payload usan el contrato generado.
+
+Si el servidor no responde, se sigue usando `contrato_tools.json` como respaldo.
+Con un servidor por red (URL) no hay script del que sacar la huella: se usa la de
+`list_tools`, que el pool obtiene al conectar.
+
+Ejemplo de uso (una vez al arrancar):
+    await sincronizar_contrato_con_servidor("server.py")
+"""
+
+import hashlib
+import json
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from logging_mcp import info, warning
+from pool_mcp import es_url, obtener_pool
+from registro_tools import RegistroHerramientas, obtener_registro, usar_contrato
+
+
+ruta_actual = Path(".")
+ruta_raiz = ruta_actual.parent
+ruta_contrato_generado = ruta_raiz / "contexto/contrato_generado.json"
+
+
+def archivos_servidor(script_path: str) -> list[Path]:
+    """
+    Archivos de código de los que depende el servidor: los .py de su directorio
+    y todos los de su `src/` (de donde `server.py` importa sus módulos locales).
+
+    Args:
+        script_path (str): Ruta al script del servidor MCP.
+
+    Returns:
+        list[Path]: Archivos ordenados por ruta (el script incluido).
+    """
+    directorio = Path(script_path).resolve().parent
+    archivos = set(directorio.glob("*.py")) | set((directorio / "src").rglob("*.py"))
+    archivos.add(Path(script_path).resolve())
+    return sorted(archivos)
+
+
+def huella_servidor(script_path: str) -> str:
+    """
+    Huella del servidor sin arrancarlo: hash del script, de los módulos locales
+    que importa (ver `archivos_servidor`) y de la versión de fastmcp (que
+    determina cómo se generan los JSON Schema de los parámetros).
+
+    Args:
+        script_path (str): Ruta al script del servidor MCP.
+
+    Returns:
+        str: Hash hexadecimal SHA-256.
+    """
+    try:
+        version_fastmcp = version("fastmcp")
+    except PackageNotFoundError:
+        version_fastmcp = "desconocida"
+    directorio = Path(script_path).resolve().parent
+    h = hashlib.sha256()
+    for archivo in archivos_servidor(script_path):
+        # La ruta relativa también cuenta: mover o renombrar un módulo cambia la huella
+        h.update(archivo.relative_to(directorio).as_posix().encode("utf-8") + b"\0")
+        h.update(archivo.read_bytes() + b"\0")
+    h.update(version_fastmcp.encode("utf-8"))
+    return h.hexdigest()
+
+
+def convertir_a_formato_openrouter(herramientas_mcp: list[dict]) -> list[dict]:
+    """
+    Convierte definiciones MCP (`list_tools`) al formato `tools` de OpenRouter.
+
+    Args:
+        herramientas_mcp (list[dict]): Herramientas MCP serializadas (con 'name',
+            'description' e 'inputSchema').
+
+    Returns:
+        list[dict]: Lista de `{"type": "function", "function": {...}}`.
+    """
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": tool["name"],
+                "description": tool.get("description") or tool.get("title") or tool["name"],
+                "parameters": tool.get("inputSchema") or {"type": "object", "properties": {}},
+            },
+        }
+        for tool in herramientas_mcp
+    ]
+
+
+def leer_huella_guardada(ruta: Path) -> str | None:
+    """Huella del contrato generado en disco, o None si no existe o no se puede leer."""
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f).get("huella")
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return None
+
+
+async def sincronizar_contrato_con_servidor(script_path: str = "server.py",
+                                            ruta_cache: Path | str = ruta_contrato_generado) -> RegistroHerramientas:
+    """
+    Deja el registro compartido apuntando al contrato generado desde el servidor,
+    regenerándolo solo si el servidor cambió.
+
+    Args:
+        script_path (str): Ruta al script del servidor MCP, o su URL si se sirve por red.
+        ruta_cache (Path | str): Archivo donde se guarda el contrato generado.
+
+    Returns:
+        RegistroHerramientas: Registro compartido ya actualizado.
+    """
+    ruta_cache = Path(ruta_cache)
+    huella = None if es_url(script_path) else huella_servidor(script_path)
+    if huella is not None and leer_huella_guardada(ruta_cache) == huella:
+        info("📜 Contrato generado al día: no hace falta consultar el servidor.")
+        return usar_contrato(ruta_cache)
+
+    try:
+        pool = obtener_pool(script_path)
+        await pool.iniciar()  # el pool ya pide `list_tools` al conectar
+        tools = convertir_a_formato_openrouter(pool.herramientas)
+    except Exception as e:
+        warning(f"No se pudo obtener el contrato desde el servidor ({e}). Se usa contrato_tools.json.")
+        return obtener_registro()
+    if huella is None:
+        huella = pool.huella
+        if leer_huella_guardada(ruta_cache) == huella:
+            info("📜 Contrato generado al día con el servidor por red.")
+            return usar_contrato(ruta_cache)
+
+    with open(ruta_cache, "w", encoding="utf-8") as f:
+        json.dump({"huella": huella, "tools": tools}, f, indent=2, ensure_ascii=False)
+    info(f"📜 Contrato regenerado desde '{script_path}': {len(tools)} herramienta(s).")
+    return usar_contrato(ruta_cache)
@@ -1,44 +1,40 @@
-import json
-from chat_modelo_local import crear_payload
-from pathlib import Path
-from logging_mcp import error
+from typing import Callable
 
-ruta_actual = Path(".")
-ruta_raiz = ruta_actual.parent
-ruta_contrato_tools = ruta_raiz / "contexto/contrato_tools.json"
+from chat_modelo_local import crear_payload
+from presupuesto_tokens import ajustar_a_presupuesto
+from registro_tools import obtener_registro, ruta_contrato_tools
 
 
 
 def lectura_contrato_tools() -> list:
     """
-    Lee el contrato de herramientas desde el archivo JSON.
-    Este contrato es una lista de definiciones de herramientas.
+    Devuelve el contrato de herramientas desde el registro en memoria.
+    El archivo JSON solo se relee si cambió (ver `registro_tools`).
+    Este contrato es una lista de definiciones de herramientas ya validadas.
 
     Returns:
         list: Lista de diccionarios con la definición de cada herramienta.
         Si hay error, retorna una lista vacía.
     """
-    try:
-        with open(str(ruta_contrato_tools), "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        error(f"Error al leer contrato_tools.json: {e}")
-        return []
+    return obtener_registro().tools
     
 
 
-def payload_para_modelo_con_herramientas(mensajes: list, contrato_tools: list) -> dict:
+def payload_para_modelo_con_herramientas(mensajes: list, contrato_tools: list, modelo: str = "mistral",
+                                         ajustar_mensajes: Callable[[list, int], list] = ajustar_a_presupuesto) -> dict:
     """
     Crea un payload que incluye una lista de herramientas y fuerza su uso.
     
     Args:
         mensajes (list): Historial de mensajes.
         contrato_tools (list): Lista de herramientas disponibles.
+        modelo (str): Alias o id del modelo (ver `enrutador_modelos` para elegirlo).
+        ajustar_mensajes (Callable[[list, int], list]): Recorte al presupuesto de tokens (ver `crear_payload`).
     
     Returns:
         dict: Payload listo para enviar al modelo.
     """
-    payload_con_herramientas = crear_payload(mensajes, "mistral")
-    payload_con_herramientas["tools"] = contrato_tools  # ← ahora es una lista
+    # Las tools se pasan a crear_payload para que cuenten en el presupuesto de tokens
+    payload_con_herramientas = crear_payload(mensajes, modelo, tools=contrato_tools, ajustar_mensajes=ajustar_mensajes)
     
     return payload_con_herramientas
\ No newline at end of file
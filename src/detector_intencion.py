@@ -0,0 +1,186 @@
+# src/detector_intencion.py
+"""
+Detección de intención de uso de herramientas con un patrón precompilado.
+
+En lugar de recorrer el texto una vez por frase y por herramienta, todas las
+frases de intención de todas las herramientas se compilan en una sola
+expresión regular con forma de trie (los prefijos comunes se factorizan, así
+que en cada posición del texto solo se prueba un carácter por nivel, igual que
+en Aho-Corasick). El texto se recorre una única vez y se obtienen todas las
+herramientas mencionadas junto con la posición de cada coincidencia, aunque sus
+frases se solapen (con `suma` y `suma_total`, "usar suma_total" detecta ambas,
+igual que lo haría `debe_usar_tool` herramienta a herramienta).
+
+Los comparadores se cachean por contrato (tupla de nombres de herramientas y
+palabras clave), así que el patrón se compila una sola vez.
+
+Ejemplo de uso:
+    comparador = comparador_para_contrato(lectura_contrato_tools())
+    comparador.buscar("Voy a usar la herramienta suma")
+    # → {"suma": [(0, 30)]}
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable
+
+
+def claves_intencion_por_defecto(nombre_tool: str) -> list[str]:
+    """Frases que indican intención de usar `nombre_tool` (en minúsculas).
+
+    Args:
+        nombre_tool (str): Nombre de la herramienta, ya normalizado a minúsculas.
+
+    Returns:
+        list[str]: Frases de intención por defecto.
+    """
+    return [
+        f"{nombre_tool}",
+        f"voy a usar {nombre_tool}",
+        f"voy a usar la herramienta {nombre_tool}",  # ← faltaba coma antes
+        f"usaré {nombre_tool}",
+        f"procedo a usar {nombre_tool}",
+        f"ejecutaré {nombre_tool}",
+        f"llamaré a {nombre_tool}",
+        f"activaré {nombre_tool}",
+        f"quiero usar {nombre_tool}",
+        f"es {nombre_tool}"
+    ]
+
+
+def _patron_trie(frases: Iterable[str]) -> str:
+    """
+    Construye una expresión regular equivalente a `frase1|frase2|...` pero con
+    los prefijos comunes factorizados. Los cuantificadores son codiciosos, así
+    que en cada posición se obtiene la coincidencia más larga.
+
+    Args:
+        frases (Iterable[str]): Frases literales a reconocer.
+
+    Returns:
+        str: Patrón listo para `re.compile` (vacío si no hay frases).
+    """
+    trie: dict = {}
+    for frase in frases:
+        nodo = trie
+        for caracter in frase:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[""] = {}  # marca de fin de frase
+
+    def construir(nodo: dict) -> str:
+        es_final = "" in nodo
+        ramas = [re.escape(c) + construir(hijo) for c, hijo in sorted(nodo.items()) if c]
+        if not ramas:
+            return ""
+        if len(ramas) == 1 and not es_final:
+            return ramas[0]
+        grupo = "(?:" + "|".join(ramas) + ")"
+        return grupo + "?" if es_final else grupo
+
+    return construir(trie)
+
+
+class ComparadorIntencion:
+    """
+    Patrón compilado con las frases de intención de varias herramientas.
+
+    `buscar` informa de todas las coincidencias, también las solapadas: en cada
+    posición el patrón da la frase más larga que empieza ahí, y las demás frases
+    que coinciden en esa posición son prefijos suyos (precalculados al compilar).
+    """
+
+    def __init__(self, nombres_tools: Iterable[str], palabras_clave: dict[str, list[str]] | None = None) -> None:
+        """
+        Args:
+            nombres_tools (Iterable[str]): Nombres de las herramientas a detectar.
+            palabras_clave (dict[str, list[str]] | None): Frases personalizadas por herramienta.
+        """
+        palabras_clave = palabras_clave or {}
+        self.herramientas_por_frase: dict[str, set[str]] = {}
+        for nombre in nombres_tools:
+            nombre_normalizado = nombre.lower().strip()
+            personalizadas = [p.lower().strip() for p in palabras_clave.get(nombre, []) if p.strip()]
+            for frase in personalizadas + claves_intencion_por_defecto(nombre_normalizado):
+                self.herramientas_por_frase.setdefault(frase, set()).add(nombre)
+
+        self.longitud_maxima = max(map(len, self.herramientas_por_frase), default=0)
+        # Sin frases, un patrón que nunca coincide
+        trie = _patron_trie(self.herramientas_por_frase) or r"(?!)"
+        self.patron = re.compile(trie)
+        # Búsqueda anticipada: prueba el trie en cada posición sin consumir texto,
+        # así las coincidencias que empiezan dentro de otra no se pierden
+        self._patron_solapado = re.compile(f"(?=({trie}))")
+        # Para cada frase, las frases que son prefijo suyo (ella incluida): (longitud, herramientas)
+        self._prefijos: dict[str, list[tuple[int, set[str]]]] = {
+            frase: [(len(frase[:fin]), self.herramientas_por_frase[frase[:fin]])
+                    for fin in range(1, len(frase) + 1) if frase[:fin] in self.herramientas_por_frase]
+            for frase in self.herramientas_por_frase
+        }
+
+    def buscar(self, texto: str) -> dict[str, list[tuple[int, int]]]:
+        """
+        Recorre el texto una sola vez y devuelve todas las herramientas detectadas.
+
+        Args:
+            texto (str): Respuesta del modelo. No distingue mayúsculas de minúsculas.
+
+        Returns:
+            dict[str, list[tuple[int, int]]]: Para cada herramienta detectada, la lista
+            de posiciones (inicio, fin) de sus frases de intención en `texto.lower()`.
+        """
+        encontradas: dict[str, list[tuple[int, int]]] = {}
+        for coincidencia in self._patron_solapado.finditer(texto.lower()):
+            inicio = coincidencia.start()
+            for longitud, nombres in self._prefijos[coincidencia.group(1)]:
+                for nombre in nombres:
+                    encontradas.setdefault(nombre, []).append((inicio, inicio + longitud))
+        return encontradas
+
+    def hay_coincidencia(self, texto: str) -> bool:
+        """
+        Indica si hay alguna frase de intención en el texto (se detiene en la primera).
+
+        Args:
+            texto (str): Texto a examinar. No distingue mayúsculas de minúsculas.
+
+        Returns:
+            bool: True si alguna frase aparece en el texto.
+        """
+        return self.patron.search(texto.lower()) is not None
+
+
+@lru_cache(maxsize=64)
+def _comparador_cacheado(nombres_tools: tuple[str, ...],
+                         palabras_clave: tuple[tuple[str, tuple[str, ...]], ...]) -> ComparadorIntencion:
+    return ComparadorIntencion(nombres_tools, {nombre: list(frases) for nombre, frases in palabras_clave})
+
+
+def obtener_comparador(nombres_tools: Iterable[str], palabras_clave: dict[str, list[str]] | None = None) -> ComparadorIntencion:
+    """
+    Devuelve un comparador compilado para estas herramientas, reutilizando el
+    de una llamada anterior con los mismos nombres y palabras clave.
+
+    Args:
+        nombres_tools (Iterable[str]): Nombres de las herramientas.
+        palabras_clave (dict[str, list[str]] | None): Frases personalizadas por herramienta.
+
+    Returns:
+        ComparadorIntencion: Comparador listo para `buscar()`.
+    """
+    claves = tuple(sorted((nombre, tuple(frases)) for nombre, frases in (palabras_clave or {}).items()))
+    return _comparador_cacheado(tuple(nombres_tools), claves)
+
+
+def comparador_para_contrato(contrato_tools: list[dict], adicionales: Iterable[str] = ()) -> ComparadorIntencion:
+    """
+    Comparador para todas las herramientas de un contrato en formato OpenRouter.
+
+    Args:
+        contrato_tools (list[dict]): Lista de herramientas (`{"type": "function", "function": {...}}`).
+        adicionales (Iterable[str]): Otros nombres a detectar aunque no estén en el contrato.
+
+    Returns:
+        ComparadorIntencion: Comparador cacheado para esos nombres.
+    """
+    nombres = [tool["function"]["name"] for tool in contrato_tools]
+    return obtener_comparador(nombres + [nombre for nombre in adicionales if nombre not in nombres])
@@ -0,0 +1,146 @@
+# src/ejecutor_tools.py
+"""
+Ejecución de herramientas MCP pesadas fuera del bucle de eventos del servidor.
+
+FastMCP ejecuta cada herramienta síncrona en su propio bucle: una herramienta que
+consume CPU bloquea todas las demás peticiones mientras dura. El decorador
+`en_ejecutor` se pone debajo de `@mcp.tool()` y hace que el cuerpo se ejecute en:
+- un pool de procesos ("proceso"): para trabajo de CPU en Python puro, que así
+  usa varios núcleos (el GIL no lo limita);
+- un pool de hilos ("hilo"): para código que libera el GIL (E/S, NumPy...).
+
+Además:
+- Límite de concurrencia por herramienta (`max_concurrencia`): el resto de
+  llamadas espera su turno sin ocupar el pool.
+- Cancelación: si el cliente se desconecta, FastMCP cancela la petición; si la
+  llamada aún no había empezado se retira de la cola y nunca se ejecuta. Una
+  llamada ya en curso no se puede interrumpir: termina, su resultado se descarta
+  y hasta entonces sigue contando en el límite.
+- Tamaño de los pools configurable en `.env`.
+
+🔐 Configuración (opcional, en `.env`):
+    MCP_EJECUTOR_PROCESOS=4   # procesos del pool (por defecto, núcleos de la máquina)
+    MCP_EJECUTOR_HILOS=8      # hilos del pool (por defecto, núcleos + 4, máx. 32)
+
+Ejemplo de uso (en server.py):
+    @mcp.tool()
+    @en_ejecutor("proceso", max_concurrencia=4)
+    def contar_primos(limite: int) -> IntResponse:
+        ...
+
+Las funciones decoradas deben estar definidas a nivel de módulo: en el modo
+"proceso" el worker las localiza importando su módulo.
+"""
+
+import asyncio
+import functools
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Literal
+
+from logging_mcp import warning
+
+
+TipoEjecutor = Literal["proceso", "hilo"]
+
+# (módulo, nombre) → función original, para que el worker de procesos la encuentre
+_ORIGINALES: dict[tuple[str, str], Callable[..., Any]] = {}
+_ejecutores: dict[str, Executor] = {}
+_lock_ejecutores = threading.Lock()
+
+
+def _ejecutar_registrada(modulo: str, nombre: str, args: tuple, kwargs: dict) -> Any:
+    """Punto de entrada en el worker: importa el módulo (lo que registra la función) y la llama."""
+    if (modulo, nombre) not in _ORIGINALES:
+        importlib.import_module(modulo)
+    return _ORIGINALES[(modulo, nombre)](*args, **kwargs)
+
+
+def obtener_ejecutor(tipo: TipoEjecutor) -> Executor:
+    """
+    Devuelve el pool compartido del tipo pedido, creándolo la primera vez.
+
+    Args:
+        tipo (TipoEjecutor): "proceso" o "hilo".
+
+    Returns:
+        Executor: Pool de procesos o de hilos.
+    """
+    with _lock_ejecutores:
+        ejecutor = _ejecutores.get(tipo)
+        if ejecutor is None:
+            if tipo == "proceso":
+                procesos = int(os.getenv("MCP_EJECUTOR_PROCESOS", os.cpu_count() or 1))
+                # "spawn": el servidor tiene hilos y un bucle en marcha, que no deben heredarse con fork
+                ejecutor = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+            elif tipo == "hilo":
+                hilos = int(os.getenv("MCP_EJECUTOR_HILOS", min(32, (os.cpu_count() or 1) + 4)))
+                ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="tool")
+            else:
+                raise ValueError(f"Tipo de ejecutor desconocido: {tipo!r} (usa 'proceso' o 'hilo').")
+            _ejecutores[tipo] = ejecutor
+        return ejecutor
+
+
+def cerrar_ejecutores() -> None:
+    """Cierra los pools creados, cancelando las llamadas que aún no empezaron."""
+    with _lock_ejecutores:
+        ejecutores = list(_ejecutores.values())
+        _ejecutores.clear()
+    for ejecutor in ejecutores:
+        ejecutor.shutdown(wait=False, cancel_futures=True)
+
+
+def en_ejecutor(tipo: TipoEjecutor = "proceso", max_concurrencia: int | None = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorador que ejecuta una herramienta síncrona en un pool de procesos o de hilos.
+    Se coloca debajo de `@mcp.tool()`; la firma y las anotaciones se conservan, así que
+    FastMCP genera el mismo esquema de parámetros.
+
+    Args:
+        tipo (TipoEjecutor): "proceso" (CPU en Python puro) o "hilo" (código que libera el GIL).
+        max_concurrencia (int | None): Llamadas simultáneas máximas de esta herramienta.
+            None = sin límite propio (solo el tamaño del pool).
+
+    Returns:
+        Callable: Decorador que convierte la función en una corrutina.
+    """
+    if max_concurrencia is not None and max_concurrencia < 1:
+        raise ValueError("max_concurrencia debe ser al menos 1.")
+
+    def decorador(funcion: Callable[..., Any]) -> Callable[..., Any]:
+        # Con "spawn" el worker importa el script principal como "__mp_main__"
+        modulo = "__main__" if funcion.__module__ == "__mp_main__" else funcion.__module__
+        clave = (modulo, funcion.__qualname__)
+        if "<locals>" in funcion.__qualname__:
+            raise ValueError(f"'{funcion.__qualname__}' debe definirse a nivel de módulo para usar en_ejecutor.")
+        _ORIGINALES[clave] = funcion
+        semaforos: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+        @functools.wraps(funcion)
+        async def envoltura(*args: Any, **kwargs: Any) -> Any:
+            loop = asyncio.get_running_loop()
+            semaforo = None
+            if max_concurrencia is not None:
+                semaforo = semaforos.setdefault(loop, asyncio.Semaphore(max_concurrencia))
+                await semaforo.acquire()  # cancelable: si el cliente se va, no llega a ejecutarse
+            if tipo == "proceso":
+                futuro = obtener_ejecutor(tipo).submit(_ejecutar_registrada, *clave, args, kwargs)
+            else:
+                futuro = obtener_ejecutor(tipo).submit(functools.partial(funcion, *args, **kwargs))
+            if semaforo is not None:
+                # El hueco se libera cuando el trabajo termina de verdad, no al cancelar la espera
+                futuro.add_done_callback(lambda _: loop.call_soon_threadsafe(semaforo.release))
+            try:
+                return await asyncio.wrap_future(futuro)
+            except asyncio.CancelledError:
+                if not futuro.cancel():
+                    warning(f"'{funcion.__name__}' ya estaba en ejecución al cancelarse; su resultado se descartará.")
+                raise
+
+        return envoltura
+
+    return decorador
@@ -0,0 +1,288 @@
+# src/enrutador_modelos.py
+"""
+Enrutador de modelos: elige el modelo más rápido y sano en cada petición.
+
+`client.main` usaba siempre "mistral", y los modelos gratuitos de OpenRouter
+suelen ir lentos o devolver 429. El enrutador:
+- Lleva, por alias de modelo, una ventana móvil de latencias y de resultados
+  (éxito / error) y cuenta los 429.
+- Ordena los modelos: primero los sanos (tasa de error bajo el umbral y sin
+  enfriamiento pendiente), de menor a mayor latencia; los que aún no se han
+  probado van primero, en el orden configurado, para medirlos.
+- Si un modelo falla o supera el timeout, pasa al siguiente (failover). Un 429
+  deja al modelo en enfriamiento (`Retry-After` si viene, si no `enfriamiento`).
+- Cobertura opcional (hedging): si el primer modelo no ha respondido tras
+  `retraso_cobertura` segundos, lanza el siguiente y se queda con la primera
+  respuesta válida; la otra se cancela.
+- Cada modelo puede tener su propio endpoint, lo que permite probarlo contra
+  servidores locales con latencias inyectadas.
+- Devuelve la respuesta ya envuelta en `RespuestaModelo` (cuerpo decodificado una
+  vez) y acumula por modelo los tokens de su campo `usage`.
+
+🔐 Configuración (opcional, en `.env`):
+    OPENROUTER_MODELOS=mistral,qwen,mixtral   # candidatos, en orden de preferencia
+    OPENROUTER_COBERTURA_MS=3000              # activa la cobertura tras 3 s
+    OPENROUTER_TIMEOUT_MODELO=60              # segundos máximos por intento (sin la cola del limitador)
+
+Ejemplo de uso:
+    enrutador = obtener_enrutador()
+    modelo, respuesta = await enrutador.solicitar(url, headers, lambda m: crear_payload(mensajes, m))
+    mensaje = respuesta.mensaje
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from statistics import median
+from typing import Callable
+
+import httpx
+from chat_modelo_local import MODELOS, hacer_solicitud_http_al_modelo_async
+from logging_mcp import info, warning
+from respuesta_modelo import RespuestaModelo, UsoTokens
+from sesion_http import SesionOpenRouterAsync
+
+
+MODELOS_POR_DEFECTO = ("mistral", "qwen", "mixtral")
+VENTANA_POR_DEFECTO = 20  # últimas peticiones consideradas por modelo
+UMBRAL_ERRORES_POR_DEFECTO = 0.5  # tasa de error a partir de la cual un modelo deja de estar sano
+ENFRIAMIENTO_POR_DEFECTO = 30.0  # segundos sin usar un modelo tras un 429 o un error
+TIMEOUT_POR_DEFECTO = 60.0
+
+
+class EstadisticasModelo:
+    """Ventana móvil de latencias y resultados de un modelo."""
+
+    def __init__(self, ventana: int = VENTANA_POR_DEFECTO) -> None:
+        """
+        Args:
+            ventana (int): Número de peticiones recientes que se recuerdan.
+        """
+        self.latencias: deque[float] = deque(maxlen=ventana)
+        self.resultados: deque[bool] = deque(maxlen=ventana)  # True = éxito
+        self.limitados = 0  # respuestas 429 recibidas
+        self.enfriamiento_hasta = 0.0  # time.monotonic() hasta el que no se usa
+        self.uso = UsoTokens()  # tokens acumulados (respuestas fuera de caché)
+
+    @property
+    def latencia(self) -> float | None:
+        """Mediana de las latencias recientes (segundos), o None si no hay datos."""
+        return median(self.latencias) if self.latencias else None
+
+    @property
+    def tasa_errores(self) -> float:
+        """Fracción de peticiones recientes que fallaron."""
+        return self.resultados.count(False) / len(self.resultados) if self.resultados else 0.0
+
+
+class EnrutadorModelos:
+    """
+    Selección de modelo por latencia con failover y cobertura opcional.
+    Todo el estado vive en el bucle de eventos: no es seguro entre hilos.
+    """
+
+    def __init__(self, modelos: list[str] | tuple[str, ...] = MODELOS_POR_DEFECTO, endpoints: dict[str, str] | None = None,
+                 ventana: int = VENTANA_POR_DEFECTO, umbral_errores: float = UMBRAL_ERRORES_POR_DEFECTO,
+                 enfriamiento: float = ENFRIAMIENTO_POR_DEFECTO, timeout: float = TIMEOUT_POR_DEFECTO,
+                 retraso_cobertura: float | None = None) -> None:
+        """
+        Args:
+            modelos (list[str] | tuple[str, ...]): Alias (o ids) de los modelos candidatos, en orden de preferencia.
+            endpoints (dict[str, str] | None): URL propia por alias; el resto usa la URL de `solicitar`.
+            ventana (int): Peticiones recientes consideradas por modelo.
+            umbral_errores (float): Tasa de error a partir de la cual el modelo no está sano.
+            enfriamiento (float): Segundos que se aparta un modelo tras un 429 sin `Retry-After` o un error.
+            timeout (float): Segundos máximos por intento antes de pasar al siguiente modelo.
+            retraso_cobertura (float | None): Segundos tras los cuales se lanza en paralelo el
+                siguiente modelo. None desactiva la cobertura.
+        """
+        if not modelos:
+            raise ValueError("El enrutador necesita al menos un modelo.")
+        self.modelos = list(modelos)
+        self.endpoints = endpoints or {}
+        self.umbral_errores = umbral_errores
+        self.enfriamiento = enfriamiento
+        self.timeout = timeout
+        self.retraso_cobertura = retraso_cobertura
+        self.estadisticas = {alias: EstadisticasModelo(ventana) for alias in self.modelos}
+
+    def esta_sano(self, alias: str) -> bool:
+        """
+        Args:
+            alias (str): Modelo a comprobar.
+
+        Returns:
+            bool: False si está en enfriamiento o su tasa de error supera el umbral.
+        """
+        estadisticas = self.estadisticas[alias]
+        return time.monotonic() >= estadisticas.enfriamiento_hasta and estadisticas.tasa_errores < self.umbral_errores
+
+    def ordenar(self) -> list[str]:
+        """
+        Returns:
+            list[str]: Modelos en el orden en que se probarán: sanos sin medir (orden
+            configurado), sanos por latencia y, al final, los no sanos (por si todos fallan).
+        """
+        posicion = {alias: i for i, alias in enumerate(self.modelos)}
+
+        def clave(alias: str) -> tuple:
+            latencia = self.estadisticas[alias].latencia
+            return (not self.esta_sano(alias), latencia is not None, latencia or 0.0, posicion[alias])
+
+        return sorted(self.modelos, key=clave)
+
+    def elegir(self) -> str:
+        """
+        Returns:
+            str: Modelo preferido para la próxima petición.
+        """
+        return self.ordenar()[0]
+
+    def registrar_exito(self, alias: str, latencia: float) -> None:
+        """Anota una respuesta correcta y su latencia (segundos)."""
+        estadisticas = self.estadisticas[alias]
+        estadisticas.latencias.append(latencia)
+        estadisticas.resultados.append(True)
+
+    def registrar_error(self, alias: str, excepcion: BaseException) -> None:
+        """
+        Anota un fallo. Un 429 o un error de red/timeout aparta el modelo durante el
+        enfriamiento (o lo que indique `Retry-After`).
+        """
+        estadisticas = self.estadisticas[alias]
+        estadisticas.resultados.append(False)
+        espera = self.enfriamiento
+        if isinstance(excepcion, httpx.HTTPStatusError) and excepcion.response.status_code == 429:
+            estadisticas.limitados += 1
+            try:
+                espera = float(excepcion.response.headers.get("Retry-After", espera))
+            except ValueError:
+                pass
+        elif isinstance(excepcion, httpx.HTTPStatusError) and excepcion.response.status_code < 500:
+            return  # error del payload (4xx): no es culpa de la salud del modelo
+        estadisticas.enfriamiento_hasta = time.monotonic() + espera
+
+    async def _intentar(self, alias: str, url: str, headers: dict, construir_payload: Callable[[str], dict],
+                        sesion: SesionOpenRouterAsync | None, usar_cache: bool = True) -> RespuestaModelo:
+        """
+        Una petición a un modelo, con timeout, registrando el resultado y los tokens usados.
+        La latencia y el timeout se cuentan desde que el limitador de tasa da el turno: la
+        espera en su cola no es lentitud del modelo.
+        """
+        inicio = time.perf_counter()
+
+        def al_obtener_turno() -> None:
+            nonlocal inicio
+            inicio = time.perf_counter()
+
+        try:
+            response = await hacer_solicitud_http_al_modelo_async(
+                self.endpoints.get(alias, url), headers, construir_payload(MODELOS.get(alias, alias)), sesion=sesion,
+                usar_cache=usar_cache, timeout=self.timeout, al_obtener_turno=al_obtener_turno)
+        except asyncio.CancelledError:
+            raise  # cancelado por la cobertura: no dice nada de la salud del modelo
+        except Exception as e:
+            self.registrar_error(alias, e)
+            raise
+        respuesta = RespuestaModelo(response)
+        if not respuesta.desde_cache:  # un acierto de caché no mide al modelo ni gasta tokens
+            self.registrar_exito(alias, time.perf_counter() - inicio)
+            try:
+                self.estadisticas[alias].uso += respuesta.uso_gastado
+            except ValueError:
+                warning(f"Respuesta de '{alias}' sin JSON válido: no se registra su uso de tokens.")
+        return respuesta
+
+    async def solicitar(self, url: str, headers: dict, construir_payload: Callable[[str], dict],
+                        sesion: SesionOpenRouterAsync | None = None, usar_cache: bool = True) -> tuple[str, RespuestaModelo]:
+        """
+        Envía la petición al mejor modelo disponible, con failover y cobertura.
+
+        Args:
+            url (str): URL de la API (se sustituye por `endpoints[alias]` si existe).
+            headers (dict): Cabeceras de la solicitud.
+            construir_payload (Callable[[str], dict]): Crea el payload para un id de modelo
+                (p. ej. `lambda m: crear_payload(mensajes, m)`).
+            sesion (SesionOpenRouterAsync | None): Sesión HTTP asíncrona. Si es None, se usa la compartida.
+            usar_cache (bool): False para prompts no deterministas que no deben servirse desde caché.
+
+        Returns:
+            tuple[str, RespuestaModelo]: Alias del modelo que respondió y su respuesta (ver `respuesta_modelo`).
+
+        Exceptions:
+            Exception: El error del último modelo si todos fallan.
+        """
+        pendientes = self.ordenar()
+        preferido = pendientes[0]
+        en_curso: dict[asyncio.Task, str] = {}
+        ultimo_error: BaseException | None = None
+
+        def lanzar() -> None:
+            alias = pendientes.pop(0)
+            tarea = asyncio.ensure_future(self._intentar(alias, url, headers, construir_payload, sesion, usar_cache))
+            en_curso[tarea] = alias
+
+        try:
+            lanzar()
+            while en_curso:
+                cobertura = self.retraso_cobertura if pendientes and len(en_curso) == 1 else None
+                hechas, _ = await asyncio.wait(en_curso, timeout=cobertura, return_when=asyncio.FIRST_COMPLETED)
+                if not hechas:
+                    warning(f"⏱️ '{next(iter(en_curso.values()))}' tarda más de {cobertura:.1f}s: "
+                            f"se lanza también '{pendientes[0]}'.")
+                    lanzar()
+                    continue
+                for tarea in hechas:
+                    alias = en_curso.pop(tarea)
+                    if tarea.exception() is None:
+                        if alias != preferido:
+                            info(f"🔀 Respuesta servida por '{alias}' en lugar de '{preferido}'.")
+                        return alias, tarea.result()
+                    ultimo_error = tarea.exception()
+                    warning(f"Modelo '{alias}' falló ({type(ultimo_error).__name__}); probando el siguiente.")
+                if not en_curso and pendientes:
+                    lanzar()
+        finally:
+            for tarea in en_curso:
+                tarea.cancel()
+        assert ultimo_error is not None
+        raise ultimo_error
+
+    def resumen(self) -> dict[str, dict]:
+        """
+        Returns:
+            dict[str, dict]: Latencia mediana (ms), tasa de error, 429, salud y tokens usados por modelo.
+        """
+        return {
+            alias: {
+                "latencia_ms": round(e.latencia * 1000, 1) if e.latencia is not None else None,
+                "tasa_errores": round(e.tasa_errores, 3),
+                "limitados": e.limitados,
+                "sano": self.esta_sano(alias),
+                "tokens": e.uso.como_dict(),
+            }
+            for alias, e in self.estadisticas.items()
+        }
+
+
+_enrutador_compartido: EnrutadorModelos | None = None
+
+
+def obtener_enrutador() -> EnrutadorModelos:
+    """
+    Devuelve el enrutador compartido del proceso, creándolo la primera vez con la
+    configuración de `.env` (se lee aquí, después de `load_dotenv()`).
+
+    Returns:
+        EnrutadorModelos: Enrutador compartido.
+    """
+    global _enrutador_compartido
+    if _enrutador_compartido is None:
+        modelos = [m.strip() for m in os.getenv("OPENROUTER_MODELOS", "").split(",") if m.strip()]
+        cobertura_ms = os.getenv("OPENROUTER_COBERTURA_MS")
+        _enrutador_compartido = EnrutadorModelos(
+            modelos or MODELOS_POR_DEFECTO,
+            timeout=float(os.getenv("OPENROUTER_TIMEOUT_MODELO", TIMEOUT_POR_DEFECTO)),
+            retraso_cobertura=float(cobertura_ms) / 1000 if cobertura_ms else None)
+    return _enrutador_compartido
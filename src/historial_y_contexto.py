@@ -1,16 +1,118 @@
+import copy
 import json
+import threading
 from pathlib import Path
 import os
 from shutil import copyfile
 
+from presupuesto_tokens import Conversacion
+
 
 ruta_actual = Path(".")
 ruta_raiz = ruta_actual.parent
 ruta_mensaje_modelo = ruta_raiz / "contexto/mensaje_modelo.json"
 
 
+class MensajePlantilla(dict):
+    """
+    Mensaje de una plantilla compartida entre peticiones, de solo lectura.
+    Para cambiarlo se sustituye en la lista (`mensajes[0] = {...}`), nunca en el sitio,
+    así ninguna petición altera la plantilla ni a las demás.
+    """
+
+    def _solo_lectura(self, *args, **kwargs):
+        raise TypeError("Mensaje de plantilla compartido: sustitúyelo en la lista en lugar de modificarlo.")
+
+    __setitem__ = __delitem__ = __ior__ = _solo_lectura
+    clear = pop = popitem = setdefault = update = _solo_lectura
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict) -> dict:
+        return copy.deepcopy(dict(self), memo)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class PlantillasContexto:
+    """
+    Plantillas de contexto (p. ej. `contexto/mensaje_modelo.json`) parseadas una sola
+    vez y guardadas en memoria. Cada petición recibe su propia lista de mensajes,
+    que comparte los mensajes de la plantilla (copia al escribir): crearla no toca
+    el disco, así que cualquier número de flujos concurrentes puede pedir una.
+    """
+
+    def __init__(self) -> None:
+        self._plantillas: dict[Path, tuple[MensajePlantilla, ...]] = {}
+        self._lock = threading.Lock()
+
+    def plantilla(self, ruta: Path | str = ruta_mensaje_modelo) -> tuple[MensajePlantilla, ...]:
+        """
+        Devuelve la plantilla ya parseada, leyéndola del disco solo la primera vez.
+
+        Args:
+            ruta (Path | str): Archivo JSON con la lista de mensajes iniciales.
+
+        Returns:
+            tuple[MensajePlantilla, ...]: Mensajes de la plantilla (de solo lectura).
+        """
+        ruta = Path(ruta)
+        plantilla = self._plantillas.get(ruta)
+        if plantilla is None:
+            with self._lock:
+                plantilla = self._plantillas.get(ruta)
+                if plantilla is None:
+                    with open(ruta, "r", encoding="utf-8") as f:
+                        plantilla = tuple(MensajePlantilla(mensaje) for mensaje in json.load(f))
+                    self._plantillas[ruta] = plantilla
+        return plantilla
+
+    def nueva_conversacion(self, ruta: Path | str = ruta_mensaje_modelo) -> Conversacion:
+        """
+        Lista de mensajes inicial para una petición: una lista nueva (se le pueden
+        añadir o sustituir mensajes libremente) con los mensajes de la plantilla.
+        Es una `Conversacion`, que lleva la cuenta de sus tokens al anexar mensajes.
+
+        Args:
+            ruta (Path | str): Archivo JSON de la plantilla.
+
+        Returns:
+            Conversacion: Mensajes iniciales de la conversación.
+        """
+        return Conversacion(self.plantilla(ruta))
+
+    def recargar(self, ruta: Path | str | None = None) -> None:
+        """
+        Olvida una plantilla (o todas) para que se vuelva a leer en el próximo uso,
+        p. ej. tras editar `mensaje_modelo.json` con el cliente en marcha.
+
+        Args:
+            ruta (Path | str | None): Plantilla a recargar. None recarga todas.
+        """
+        with self._lock:
+            if ruta is None:
+                self._plantillas.clear()
+            else:
+                self._plantillas.pop(Path(ruta), None)
+
+
+_plantillas_compartidas = PlantillasContexto()
+
+
+def obtener_plantillas() -> PlantillasContexto:
+    """
+    Returns:
+        PlantillasContexto: Cargador de plantillas compartido del proceso.
+    """
+    return _plantillas_compartidas
+
+
 def crear_contexto_temporal() -> Path:
     """Método que crea un contexto temporal para la conversación.
+    Se conserva por compatibilidad; `client.main` usa `obtener_plantillas().nueva_conversacion()`,
+    que no toca el disco ni compite por el nombre fijo `temp_context.json`.
 
     Returns:
         Path: Ruta al archivo de contexto temporal creado.
@@ -47,5 +149,13 @@ def extraer_mensaje_usuario(mensajes: list) -> str:
 
 
 def guardar_historial(mensajes: list, archivo: str = "contexto/historial_temp.json") -> None:
+    """Vuelca una lista de mensajes completa a un archivo JSON (exportación puntual).
+    El historial de cada turno se anexa en `almacen_historial`; esta función
+    reescribe el archivo entero, así que no debe usarse en cada turno.
+
+    Args:
+        mensajes (list): Lista de mensajes a exportar.
+        archivo (str): Ruta del archivo JSON de destino.
+    """
     with open(archivo, "w", encoding="utf-8") as f:
         json.dump(mensajes, f, indent=2, ensure_ascii=False)
\ No newline at end of file
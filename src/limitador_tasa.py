@@ -0,0 +1,277 @@
+# src/limitador_tasa.py
+"""
+Limitador de tasa y planificador de peticiones a OpenRouter (lado cliente).
+
+Los planes gratuitos de OpenRouter limitan las peticiones por minuto; con varios
+flujos en paralelo (modo lote) las llamadas acababan en 429. El planificador se
+coloca delante de todas las llamadas asíncronas al modelo:
+- Cubos de tokens compartidos por API key y por modelo: cada petición consume un
+  token de ambos y espera si alguno está vacío.
+- Cola con prioridades: las peticiones del menú interactivo pasan antes que las
+  del modo lote. Entre peticiones listas para salir gana la de mayor prioridad
+  (y, a igual prioridad, la más antigua); una petición bloqueada por el cubo de
+  su modelo no frena a las de otros modelos.
+- Se adapta a las respuestas: `Retry-After` en un 429 pausa el cubo del modelo, y
+  las cabeceras `X-RateLimit-Remaining` / `X-RateLimit-Reset` ajustan el de la key.
+- Métricas: profundidad de la cola y tiempos de espera (`metricas()`).
+
+La prioridad se toma del contexto (`con_prioridad`), así que no hay que pasarla
+por todas las funciones: las tareas creadas dentro del bloque la heredan.
+
+🔐 Configuración (opcional, en `.env`):
+    OPENROUTER_RPM_CLAVE=20    # peticiones por minuto por API key
+    OPENROUTER_RPM_MODELO=20   # peticiones por minuto por modelo
+
+Cada intento pide su propio turno: la sesión no reintenta por su cuenta
+(`reintentos=0`), así que los reintentos también respetan los cubos y el
+planificador ve todas las respuestas (ver `hacer_solicitud_http_al_modelo_async`).
+
+Ejemplo de uso:
+    planificador = obtener_planificador()
+    await planificador.esperar_turno(headers, payload["model"])
+    response = await sesion.post(url, headers=headers, json=payload, reintentos=0)
+    planificador.registrar_respuesta(headers, payload["model"], response)
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Mapping
+
+from logging_mcp import warning
+
+
+PRIORIDAD_INTERACTIVA = 0
+PRIORIDAD_LOTE = 10
+RPM_POR_DEFECTO = 20
+MUESTRAS_ESPERA = 1000  # esperas recientes usadas en las métricas
+
+_prioridad_actual: ContextVar[int] = ContextVar("prioridad_solicitud", default=PRIORIDAD_INTERACTIVA)
+
+
+@contextmanager
+def con_prioridad(prioridad: int) -> Iterator[None]:
+    """
+    Fija la prioridad de las peticiones al modelo hechas dentro del bloque
+    (y en las tareas que se creen dentro). Menor número = más prioridad.
+
+    Args:
+        prioridad (int): p. ej. `PRIORIDAD_INTERACTIVA` o `PRIORIDAD_LOTE`.
+    """
+    token = _prioridad_actual.set(prioridad)
+    try:
+        yield
+    finally:
+        _prioridad_actual.reset(token)
+
+
+class CuboTokens:
+    """Cubo de tokens con recarga continua y pausa explícita (p. ej. tras un 429)."""
+
+    def __init__(self, capacidad: float, recarga_por_segundo: float) -> None:
+        """
+        Args:
+            capacidad (float): Ráfaga máxima de peticiones.
+            recarga_por_segundo (float): Tokens que se recuperan por segundo.
+        """
+        self.capacidad = capacidad
+        self.recarga_por_segundo = recarga_por_segundo
+        self.tokens = capacidad
+        self.pausado_hasta = 0.0
+        self._ultimo = time.monotonic()
+
+    def _recargar(self, ahora: float) -> None:
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.recarga_por_segundo)
+        self._ultimo = ahora
+
+    def disponible_en(self) -> float:
+        """
+        Returns:
+            float: Segundos hasta que haya un token disponible (0 si ya lo hay).
+        """
+        ahora = time.monotonic()
+        self._recargar(ahora)
+        falta = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.recarga_por_segundo
+        return max(falta, self.pausado_hasta - ahora)
+
+    def consumir(self) -> None:
+        """Gasta un token (llamar solo si `disponible_en()` es 0)."""
+        self.tokens -= 1
+
+    def pausar(self, segundos: float) -> None:
+        """No entrega tokens durante `segundos` y vacía el cubo."""
+        self.pausado_hasta = max(self.pausado_hasta, time.monotonic() + segundos)
+        self.tokens = 0.0
+
+    def limitar_restantes(self, restantes: int) -> None:
+        """Ajusta los tokens a lo que el servidor dice que queda."""
+        self._recargar(time.monotonic())
+        self.tokens = min(self.tokens, float(restantes))
+
+
+class _Espera:
+    """Petición en cola: prioridad, orden de llegada y cubos que necesita."""
+
+    __slots__ = ("prioridad", "secuencia", "cubos", "inicio")
+
+    def __init__(self, prioridad: int, secuencia: int, cubos: tuple[CuboTokens, ...]) -> None:
+        self.prioridad = prioridad
+        self.secuencia = secuencia
+        self.cubos = cubos
+        self.inicio = time.monotonic()
+
+    def __lt__(self, otra: "_Espera") -> bool:
+        return (self.prioridad, self.secuencia) < (otra.prioridad, otra.secuencia)
+
+    def espera_necesaria(self) -> float:
+        return max(cubo.disponible_en() for cubo in self.cubos)
+
+
+class PlanificadorSolicitudes:
+    """
+    Cola con prioridades delante de las llamadas al modelo, con cuotas por API key y
+    por modelo. Vive en un bucle de eventos (ver `obtener_planificador`).
+    """
+
+    def __init__(self, rpm_clave: float = RPM_POR_DEFECTO, rpm_modelo: float = RPM_POR_DEFECTO) -> None:
+        """
+        Args:
+            rpm_clave (float): Peticiones por minuto permitidas por API key.
+            rpm_modelo (float): Peticiones por minuto permitidas por modelo.
+        """
+        self.rpm_clave = rpm_clave
+        self.rpm_modelo = rpm_modelo
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._cubos: dict[tuple[str, str], CuboTokens] = {}
+        self._cola: list[_Espera] = []  # ordenada por (prioridad, llegada)
+        self._secuencia = itertools.count()
+        self._condicion: asyncio.Condition | None = None
+        self._esperas: deque[float] = deque(maxlen=MUESTRAS_ESPERA)
+        self.despachadas = 0
+        self.limitadas = 0
+
+    @staticmethod
+    def _id_clave(headers: Mapping[str, str]) -> str:
+        """Identificador de la API key sin guardarla en claro."""
+        return hashlib.sha256(headers.get("Authorization", "").encode("utf-8")).hexdigest()[:16]
+
+    def _cubo(self, tipo: str, nombre: str) -> CuboTokens:
+        cubo = self._cubos.get((tipo, nombre))
+        if cubo is None:
+            rpm = self.rpm_clave if tipo == "clave" else self.rpm_modelo
+            cubo = self._cubos[(tipo, nombre)] = CuboTokens(capacidad=max(rpm, 1.0), recarga_por_segundo=rpm / 60)
+        return cubo
+
+    async def esperar_turno(self, headers: Mapping[str, str], modelo: str, prioridad: int | None = None) -> float:
+        """
+        Espera hasta que la petición pueda enviarse sin superar las cuotas.
+
+        Args:
+            headers (Mapping[str, str]): Cabeceras de la petición (de ellas sale la API key).
+            modelo (str): Id del modelo del payload.
+            prioridad (int | None): Prioridad explícita; por defecto la del contexto (`con_prioridad`).
+
+        Returns:
+            float: Segundos que estuvo esperando en la cola.
+        """
+        self.loop = self.loop or asyncio.get_running_loop()
+        if self._condicion is None:
+            self._condicion = asyncio.Condition()
+        prioridad = _prioridad_actual.get() if prioridad is None else prioridad
+        espera = _Espera(prioridad, next(self._secuencia),
+                         (self._cubo("clave", self._id_clave(headers)), self._cubo("modelo", modelo)))
+        bisect.insort(self._cola, espera)
+        async with self._condicion:
+            try:
+                while True:
+                    necesaria = espera.espera_necesaria()
+                    # Sale la primera petición (por prioridad y llegada) que ya puede salir
+                    antes_lista = any(otra.espera_necesaria() <= 0 for otra in self._cola if otra is not espera and otra < espera)
+                    if necesaria <= 0 and not antes_lista:
+                        break
+                    try:
+                        await asyncio.wait_for(self._condicion.wait(), timeout=necesaria if necesaria > 0 else None)
+                    except asyncio.TimeoutError:
+                        pass
+                for cubo in espera.cubos:
+                    cubo.consumir()
+            finally:
+                self._cola.remove(espera)
+                self._condicion.notify_all()
+        esperado = time.monotonic() - espera.inicio
+        self._esperas.append(esperado)
+        self.despachadas += 1
+        return esperado
+
+    def registrar_respuesta(self, headers: Mapping[str, str], modelo: str, response) -> None:
+        """
+        Adapta los cubos a lo que indica el servidor.
+
+        Args:
+            headers (Mapping[str, str]): Cabeceras de la petición enviada.
+            modelo (str): Id del modelo del payload.
+            response: Respuesta HTTP (requests o httpx) recibida.
+        """
+        respuesta = response.headers
+        cubo_clave = self._cubo("clave", self._id_clave(headers))
+        restantes = respuesta.get("X-RateLimit-Remaining")
+        if restantes is not None and restantes.isdigit():
+            cubo_clave.limitar_restantes(int(restantes))
+            reinicio = respuesta.get("X-RateLimit-Reset")
+            if int(restantes) == 0 and reinicio and reinicio.isdigit():
+                # OpenRouter envía el reinicio como epoch en milisegundos
+                cubo_clave.pausar(max(0.0, int(reinicio) / 1000 - time.time()))
+        if response.status_code == 429:
+            self.limitadas += 1
+            try:
+                pausa = float(respuesta.get("Retry-After", 60 / max(self.rpm_modelo, 1.0)))
+            except ValueError:
+                pausa = 60 / max(self.rpm_modelo, 1.0)
+            self._cubo("modelo", modelo).pausar(pausa)
+            warning(f"🚦 429 de '{modelo}': se pausa durante {pausa:.1f}s.")
+
+    def metricas(self) -> dict:
+        """
+        Returns:
+            dict: Profundidad de la cola (total y por prioridad), peticiones despachadas
+            y limitadas (429), y espera media / p95 / máxima en milisegundos.
+        """
+        por_prioridad: dict[int, int] = {}
+        for espera in self._cola:
+            por_prioridad[espera.prioridad] = por_prioridad.get(espera.prioridad, 0) + 1
+        esperas = sorted(self._esperas)
+        return {
+            "profundidad_cola": len(self._cola),
+            "cola_por_prioridad": por_prioridad,
+            "despachadas": self.despachadas,
+            "limitadas": self.limitadas,
+            "espera_media_ms": round(sum(esperas) / len(esperas) * 1000, 1) if esperas else 0.0,
+            "espera_p95_ms": round(esperas[max(0, -(-len(esperas) * 95 // 100) - 1)] * 1000, 1) if esperas else 0.0,
+            "espera_max_ms": round(esperas[-1] * 1000, 1) if esperas else 0.0,
+        }
+
+
+_planificador_compartido: PlanificadorSolicitudes | None = None
+
+
+def obtener_planificador() -> PlanificadorSolicitudes:
+    """
+    Devuelve el planificador compartido, creándolo si no existe o si pertenece a otro
+    bucle de eventos. Las cuotas se leen de `.env` aquí (después de `load_dotenv()`).
+
+    Returns:
+        PlanificadorSolicitudes: Planificador compartido por las llamadas asíncronas al modelo.
+    """
+    global _planificador_compartido
+    planificador = _planificador_compartido
+    if planificador is None or (planificador.loop is not None and planificador.loop is not asyncio.get_running_loop()):
+        planificador = PlanificadorSolicitudes(rpm_clave=float(os.getenv("OPENROUTER_RPM_CLAVE", RPM_POR_DEFECTO)),
+                                               rpm_modelo=float(os.getenv("OPENROUTER_RPM_MODELO", RPM_POR_DEFECTO)))
+        _planificador_compartido = planificador
+    return planificador
@@ -1,11 +1,22 @@
-import json
+import asyncio
+import os
 import sys
 from fastmcp import Client
 from fastmcp.client.transports import PythonStdioTransport
 import datetime
 from datetime import datetime
 from historial_y_contexto import extraer_mensaje_usuario
-from logging_mcp import warning, info, success, separator
+from pool_mcp import destino_servidor_mcp, es_url, obtener_pool
+from cache_tools import obtener_cache_tools
+from serializacion import codificar, decodificar
+from detector_intencion import obtener_comparador
+from logging_mcp import warning, info, success, error, separator
+
+
+MAX_TOOLS_PARALELO_POR_DEFECTO = 4  # llamadas simultáneas a server.py desde un mismo turno
+TIMEOUT_TOOL_POR_DEFECTO = 30.0     # segundos máximos por llamada
+MAX_LOTE_POR_DEFECTO = 500          # llamadas agrupadas como máximo en un lote
+MAX_ESPERA_LOTE_POR_DEFECTO = 0.005 # segundos que una llamada espera a que se llene su lote
 
 
 def debe_usar_tool(texto: str, nombre_tool: str, palabras_clave: list[str] | None = None) -> bool:
@@ -25,47 +36,52 @@ def debe_usar_tool(texto: str, nombre_tool: str, palabras_clave: list[str] | Non
     if not texto or not texto.strip():
         return False
 
-    # Normalizar: convertir todo a minúsculas
-    texto = texto.lower().strip()
-    nombre_tool = nombre_tool.lower().strip()
-
-    # 1. Si se pasan palabras clave, usarlas primero (en minúsculas)
-    if palabras_clave:
-        for palabra in palabras_clave:
-            if palabra.lower().strip() in texto:
-                return True
-
-    # 2. Palabras clave por defecto (todas en minúsculas por construcción)
-    claves_por_defecto = [
-        f"{nombre_tool}",
-        f"voy a usar {nombre_tool}",
-        f"voy a usar la herramienta {nombre_tool}",  # ← faltaba coma antes
-        f"usaré {nombre_tool}",
-        f"procedo a usar {nombre_tool}",
-        f"ejecutaré {nombre_tool}",
-        f"llamaré a {nombre_tool}",
-        f"activaré {nombre_tool}",
-        f"quiero usar {nombre_tool}",
-        f"es {nombre_tool}"
-    ]
-
-    for clave in claves_por_defecto:
-        if clave in texto:
-            return True
+    # Todas las frases (personalizadas + por defecto) están compiladas en un único
+    # patrón cacheado por herramienta, así que el texto se recorre una sola vez.
+    # El respaldo "nombre + contexto de herramientas" ya queda cubierto porque el
+    # nombre de la herramienta por sí solo es una de las frases por defecto.
+    palabras = {nombre_tool: list(palabras_clave)} if palabras_clave else None
+    return obtener_comparador((nombre_tool,), palabras).hay_coincidencia(texto)
 
-    # 3. Como respaldo: ¿menciona la herramienta en contexto de herramientas?
-    contexto_herramientas = [
-        "usar herramienta",
-        "ejecutar herramienta",
-        "llamar a la herramienta",
-        "activar herramienta"
-    ]
-    if nombre_tool in texto:
-        for contexto in contexto_herramientas:
-            if contexto in texto:
-                return True
 
-    return False
+class DetectorIntencionIncremental:
+    """
+    Versión incremental de `debe_usar_tool` para respuestas en streaming.
+    Recibe el texto fragmento a fragmento y solo examina el fragmento nuevo más
+    una cola del largo de la frase más larga, no todo el texto acumulado.
+    """
+
+    def __init__(self, nombre_tool: str | list[str], palabras_clave: list[str] | None = None) -> None:
+        """
+        Args:
+            nombre_tool (str | list[str]): Nombre exacto de la herramienta (o varios: basta con
+                detectar cualquiera de ellos).
+            palabras_clave (list[str] | None): Frases personalizadas adicionales (solo con un nombre).
+        """
+        nombres = (nombre_tool,) if isinstance(nombre_tool, str) else tuple(nombre_tool)
+        palabras = {nombres[0]: list(palabras_clave)} if palabras_clave and len(nombres) == 1 else None
+        self.comparador = obtener_comparador(nombres, palabras)
+        self._solapamiento = self.comparador.longitud_maxima - 1
+        self._cola = ""
+        self.detectado = False
+
+    def alimentar(self, fragmento: str) -> bool:
+        """
+        Añade un fragmento de la respuesta y comprueba si ya hay intención.
+
+        Args:
+            fragmento (str): Nuevo trozo de texto recibido del modelo.
+
+        Returns:
+            bool: True en cuanto se detecta la intención (y en adelante).
+        """
+        if self.detectado:
+            return True
+        ventana = self._cola + fragmento
+        self.detectado = self.comparador.hay_coincidencia(ventana)
+        # Solo se conserva lo necesario para detectar frases partidas entre fragmentos
+        self._cola = ventana[-self._solapamiento:] if self._solapamiento else ""
+        return self.detectado
 
 
 def extraer_argumentos_necesarios_herramienta(herramienta_server_mcp:str, mensajes:list) -> dict:
@@ -88,6 +104,8 @@ def extraer_argumentos_necesarios_herramienta(herramienta_server_mcp:str, mensaj
         argumentos_tool = {"mensaje": mensaje_a_enviar}
     elif herramienta_server_mcp == "suma":
         argumentos_tool = {"numero1": 5, "numero2": 3}
+    elif herramienta_server_mcp == "contar_primos":
+        argumentos_tool = {"limite": 100_000}
     
     else:
 # Para cualquier otra herramienta, puedes manejarla aquí
@@ -97,32 +115,196 @@ def extraer_argumentos_necesarios_herramienta(herramienta_server_mcp:str, mensaj
 
 
 
-async def ejecutar_tool_manual(nombre_tool: str, argumentos: dict, script_path: str = "server.py") -> dict:
+async def ejecutar_tool_manual(nombre_tool: str, argumentos: dict, script_path: str = "server.py", usar_pool: bool = True,
+                               url: str | None = None) -> dict:
     """
     Ejecuta una herramienta MCP manualmente a través del servidor.
+    Por defecto toma prestado un cliente ya conectado del pool compartido
+    (ver `pool_mcp`), evitando lanzar `server.py` en cada llamada. Si la
+    herramienta está anotada como pura en el servidor, el resultado se sirve
+    desde la caché del cliente cuando los argumentos se repiten (ver `cache_tools`).
+    El servidor puede ser el script (stdio) o uno servido por red en `url`
+    (`python server.py --transporte http`), compartido por muchos clientes.
     
     Args:
         nombre_tool (str): Nombre de la herramienta a ejecutar.
         argumentos (dict): Argumentos que se pasan a la herramienta.
         script_path (str): Ruta al script del servidor MCP.
+        usar_pool (bool): Si es False, abre una conexión (o lanza un servidor) solo para esta llamada.
+        url (str | None): URL del servidor MCP por red (p. ej. "http://127.0.0.1:8000/mcp").
+            Si es None se usa `MCP_SERVIDOR_URL` y, si tampoco está, `script_path`.
     
     Returns:
-        dict: Resultado de la herramienta, serializable a JSON.
+        dict: `"tool_name"`, `"result"` (resultado con solo tipos JSON) y `"result_json"`
+        (el mismo resultado ya codificado, para el historial y el log sin volver a serializar).
     """
-    transport = PythonStdioTransport(script_path=script_path, python_cmd=sys.executable)
-    
-    async with Client(transport) as client:
-        resultado = await client.call_tool(nombre_tool, argumentos)
+    destino = url or destino_servidor_mcp(script_path)
+    if usar_pool:
+        pool = obtener_pool(destino)
+        cache = obtener_cache_tools(destino)
+        # Los aciertos no tocan el servidor: la huella se refresca si es vieja, para que
+        # un servidor que cambió sus herramientas no siga sirviendo resultados antiguos
+        cache.sincronizar(await pool.huella_reciente(), pool.herramientas_cacheables)
+        cacheado = cache.obtener_codificado(nombre_tool, argumentos)
+        if cacheado is not None:
+            return {"tool_name": nombre_tool, "result": decodificar(cacheado), "result_json": cacheado}
+        async with pool.prestar() as client:
+            resultado = await client.call_tool(nombre_tool, argumentos)
+    else:
+        transport = destino if es_url(destino) else PythonStdioTransport(
+            script_path=destino, python_cmd=sys.executable, keep_alive=False)
+        async with Client(transport) as client:
+            resultado = await client.call_tool(nombre_tool, argumentos)
     
-    # Retorna un dict plano para poder hacer json.dumps()
+    # Se codifica una sola vez (modelos anidados y datetimes incluidos); el dict plano
+    # sale de decodificar ese mismo texto, que se reutiliza para caché, historial y log
+    resultado_json = codificar(resultado.data)
+    if usar_pool:
+        # Si el cliente se reinició durante la llamada la huella pudo cambiar
+        cache.sincronizar(pool.huella, pool.herramientas_cacheables)
+        cache.guardar(nombre_tool, argumentos, resultado_json)
     return {
         "tool_name": nombre_tool,
-        "result": {k: v.isoformat() if isinstance(v, datetime) else v 
-                   for k, v in resultado.data.__dict__.items()}
+        "result": decodificar(resultado_json),
+        "result_json": resultado_json
     }
 
 
-def agregar_al_historial_simulando_call_tool(mensajes: list, tool_name: str, tool_call_id: str, resultado: dict) -> None:
+async def ejecutar_tools_en_paralelo(llamadas: list[dict], script_path: str = "server.py", max_concurrencia: int | None = None,
+                                     timeout: float | None = None) -> list[dict]:
+    """
+    Ejecuta a la vez varias llamadas a herramientas de un mismo turno con `asyncio.gather`.
+    Un semáforo limita cuántas van al servidor MCP al mismo tiempo y cada una tiene su
+    propio timeout: una herramienta lenta o que falla no tumba a las demás.
+
+    Args:
+        llamadas (list[dict]): Llamadas `{"id", "nombre", "argumentos"}` con ids distintos.
+        script_path (str): Ruta al script del servidor MCP.
+        max_concurrencia (int | None): Llamadas simultáneas (por defecto `MCP_MAX_TOOLS_PARALELO` o 4).
+        timeout (float | None): Segundos máximos por llamada (por defecto `MCP_TIMEOUT_TOOL` o 30).
+
+    Returns:
+        list[dict]: Una entrada por llamada, en el mismo orden: la llamada más
+        `"estado"` ('ok', 'timeout' o 'error') y `"result"`/`"result_json"` o `"detalle"`.
+    """
+    if max_concurrencia is None:
+        max_concurrencia = int(os.getenv("MCP_MAX_TOOLS_PARALELO", MAX_TOOLS_PARALELO_POR_DEFECTO))
+    if timeout is None:
+        timeout = float(os.getenv("MCP_TIMEOUT_TOOL", TIMEOUT_TOOL_POR_DEFECTO))
+    semaforo = asyncio.Semaphore(max(1, max_concurrencia))
+
+    async def ejecutar(llamada: dict) -> dict:
+        async with semaforo:
+            try:
+                resultado = await asyncio.wait_for(
+                    ejecutar_tool_manual(llamada["nombre"], llamada["argumentos"], script_path=script_path), timeout)
+            except asyncio.TimeoutError:
+                error(f"⏱️ '{llamada['nombre']}' ({llamada['id']}) superó {timeout:.1f}s.")
+                return {**llamada, "estado": "timeout", "detalle": f"Sin respuesta en {timeout:.1f}s"}
+            except Exception as e:
+                error(f"Error al ejecutar '{llamada['nombre']}' ({llamada['id']}): {e}")
+                return {**llamada, "estado": "error", "detalle": str(e)}
+        return {**llamada, "estado": "ok", "result": resultado["result"], "result_json": resultado["result_json"]}
+
+    return list(await asyncio.gather(*(ejecutar(llamada) for llamada in llamadas)))
+
+
+class AgrupadorLlamadas:
+    """
+    Agrupa llamadas individuales a una herramienta en llamadas a su versión por
+    lotes (p. ej. `suma` → `suma_lote`), que recibe `{"lote": [argumentos, ...]}` y
+    devuelve `{"resultados": [resultado, ...]}` en el mismo orden.
+
+    Cada `llamar()` espera como mucho `max_espera` segundos a que lleguen más
+    llamadas; el lote se envía antes si alcanza `max_lote`. Así miles de llamadas
+    concurrentes cuestan unas pocas idas y vueltas JSON-RPC en lugar de una cada una.
+    Debe usarse desde un bucle de eventos en marcha.
+
+    Ejemplo de uso:
+        agrupador = AgrupadorLlamadas("suma_lote")
+        resultados = await asyncio.gather(*(agrupador.llamar({"numero1": i, "numero2": 1}) for i in range(10_000)))
+    """
+
+    def __init__(self, herramienta_lote: str, max_lote: int = MAX_LOTE_POR_DEFECTO,
+                 max_espera: float = MAX_ESPERA_LOTE_POR_DEFECTO, script_path: str = "server.py",
+                 url: str | None = None) -> None:
+        """
+        Args:
+            herramienta_lote (str): Nombre de la herramienta por lotes en el servidor.
+            max_lote (int): Llamadas máximas por lote.
+            max_espera (float): Segundos máximos que una llamada espera a su lote.
+            script_path (str): Ruta al script del servidor MCP.
+            url (str | None): URL del servidor MCP por red (ver `ejecutar_tool_manual`).
+        """
+        if max_lote < 1:
+            raise ValueError("max_lote debe ser al menos 1.")
+        self.herramienta_lote = herramienta_lote
+        self.max_lote = max_lote
+        self.max_espera = max_espera
+        self.script_path = script_path
+        self.url = url
+        self._pendientes: list[tuple[dict, asyncio.Future]] = []
+        self._temporizador: asyncio.TimerHandle | None = None
+        self._envios: set[asyncio.Task] = set()
+        self.lotes_enviados = 0
+
+    async def llamar(self, argumentos: dict) -> dict:
+        """
+        Encola una llamada y espera su resultado.
+
+        Args:
+            argumentos (dict): Argumentos de la herramienta individual.
+
+        Returns:
+            dict: Resultado de esa llamada (mismos campos que la herramienta individual).
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendientes.append((argumentos, futuro))
+        if len(self._pendientes) >= self.max_lote:
+            self.vaciar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.max_espera, self.vaciar)
+        return await futuro
+
+    def vaciar(self) -> None:
+        """Envía ya, como un lote, las llamadas pendientes (sin esperar a `max_espera`)."""
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if not self._pendientes:
+            return
+        lote, self._pendientes = self._pendientes, []
+        envio = asyncio.get_running_loop().create_task(self._enviar(lote))
+        self._envios.add(envio)
+        envio.add_done_callback(self._envios.discard)
+
+    async def _enviar(self, lote: list[tuple[dict, asyncio.Future]]) -> None:
+        """Llama a la herramienta por lotes y reparte los resultados (o el error) entre las llamadas."""
+        self.lotes_enviados += 1
+        try:
+            respuesta = await ejecutar_tool_manual(self.herramienta_lote, {"lote": [argumentos for argumentos, _ in lote]},
+                                                   script_path=self.script_path, url=self.url)
+            resultados = respuesta["result"]["resultados"]
+            if len(resultados) != len(lote):
+                raise ValueError(f"'{self.herramienta_lote}' devolvió {len(resultados)} resultados para {len(lote)} llamadas.")
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for (_, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():  # la llamada pudo cancelarse mientras tanto
+                futuro.set_result(resultado)
+
+    async def cerrar(self) -> None:
+        """Envía lo pendiente y espera a que terminen los lotes en curso."""
+        self.vaciar()
+        while self._envios:
+            await asyncio.gather(*list(self._envios), return_exceptions=True)
+
+
+def agregar_al_historial_simulando_call_tool(mensajes: list, tool_name: str, tool_call_id: str, resultado: dict | str) -> None:
     """Método que simula un tool_call real agregando el resultado de la herramienta al historial. 
     Usa el formato esperado por el modelo (role: 'tool').
 
@@ -130,13 +312,33 @@ def agregar_al_historial_simulando_call_tool(mensajes: list, tool_name: str, too
         mensajes (list): Lista de mensajes del historial de conversación.
         tool_name (str): Nombre de la herramienta que se está simulando.
         tool_call_id (str): ID único de la llamada a la herramienta (puede ser 'manual-1' o similar).
-        resultado (dict): Resultado de la herramienta que queremos agregar al historial.
+        resultado (dict | str): Resultado de la herramienta que queremos agregar al historial,
+            o su texto JSON ya codificado (`"result_json"`), que se usa tal cual.
     """
     mensajes.append({
         "role": "tool",
         "name": tool_name,
         "tool_call_id": tool_call_id,
-        "content": json.dumps(resultado, ensure_ascii=False)
+        "content": resultado if isinstance(resultado, str) else codificar(resultado)
+    })
+
+def agregar_al_historial_llamadas_tool(mensajes: list, llamadas: list[dict], contenido: str | None = None) -> None:
+    """Agrega al historial el mensaje del asistente con sus `tool_calls` nativos,
+    para que cada resultado (role: 'tool') quede enlazado a su llamada por el id.
+
+    Args:
+        mensajes (list): Lista de mensajes del historial de conversación.
+        llamadas (list[dict]): Llamadas `{"id", "nombre", "argumentos"}` (ver `extraer_llamadas_herramienta`).
+        contenido (str | None): Texto que acompañaba a las llamadas, si lo hubo.
+    """
+    mensajes.append({
+        "role": "assistant",
+        "content": contenido,
+        "tool_calls": [
+            {"id": llamada["id"], "type": "function",
+             "function": {"name": llamada["nombre"], "arguments": codificar(llamada["argumentos"])}}
+            for llamada in llamadas
+        ]
     })
 
 def resumen_ejecucion(herramienta_server_mcp,argumentos_tool, resultado_completo):
@@ -144,5 +346,5 @@ def resumen_ejecucion(herramienta_server_mcp,argumentos_tool, resultado_completo
     success("Ejecución completada")
     info(f"   Herramienta: {herramienta_server_mcp}")
     info(f"   Entrada: {argumentos_tool}")  # o ajusta según la herramienta
-    info(f"   Resultado: {resultado_completo['result']}")
+    info(f"   Resultado: {resultado_completo.get('result_json') or codificar(resultado_completo['result'])}")
     info(f"   Hora: {datetime.now().strftime('%H:%M:%S')}")
\ No newline at end of file
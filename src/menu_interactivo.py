@@ -6,15 +6,9 @@ Permite al usuario elegir una herramienta y mantiene el programa activo hasta qu
 
 import asyncio
 import os
-from typing import Callable, Any
+from typing import Callable, Any, Awaitable
 from logging_mcp import info, success, error, warning, debug, separator
-from pathlib import Path
-import json
-
-
-ruta_actual = Path(".")
-ruta_raiz = ruta_actual.parent
-RUTA_CONTRATO = ruta_raiz / "contexto/contrato_tools.json"
+from registro_tools import obtener_registro
 
 def limpiar_pantalla() -> None:
     """Limpia la pantalla del terminal de forma portable (Windows, Linux, Mac).
@@ -31,66 +25,82 @@ def cerrar_programa() -> None:
 
 
 def cargar_herramientas_del_contrato() -> dict[int, str]:
-    """Carga las herramientas disponibles desde contrato_tools.json.
+    """Carga las herramientas disponibles desde el registro del contrato (contrato_tools.json).
     Devuelve un diccionario {número: nombre_herramienta}.
 
     Returns:
         dict[int, str]: Diccionario con las herramientas disponibles.
         Si no se puede cargar el contrato, retorna un diccionario con una herramienta por defecto.
     """
-    try:
-        with open(RUTA_CONTRATO, "r", encoding="utf-8") as f:
-            contrato = json.load(f)
-        return {i + 1: tool["function"]["name"] for i, tool in enumerate(contrato)}
-    except Exception as e:
-        from .logging_mcp import error
-        error(f"No se pudo cargar el contrato de herramientas: {e}")
+    nombres = obtener_registro().nombres()
+    if not nombres:
+        error("No se pudo cargar el contrato de herramientas.")
         return {1: "suma"}  # Fallback
+    return {i + 1: nombre for i, nombre in enumerate(nombres)}
 
 
-def menu_interactivo(main_func: Callable[[str], Any]) -> None:
+def menu_interactivo(main_func: Callable[[str], Any], al_salir: Callable[[], Awaitable[Any]] | None = None,
+                     al_iniciar: Callable[[], Awaitable[Any]] | None = None) -> None:
     """
     Muestra un menú interactivo para seleccionar herramientas.
     El programa se mantiene vivo hasta que el usuario elija salir (0).
+    Todas las ejecuciones comparten un mismo bucle de eventos, de modo que los
+    recursos asíncronos (p. ej. el pool de clientes MCP) sobreviven entre opciones.
 
     Args:
         main_func (Callable[[str], Any]): 
             Función principal asincrónica que ejecuta una herramienta dada su nombre.
-            Se espera que reciba un str (nombre de herramienta) y devuelva cualquier tipo.
+            Se espera que reciba un str (nombre de herramienta, o varios separados por comas
+            si se eligen varias opciones) y devuelva cualquier tipo.
             Ejemplo: `main(herramienta: str) -> None`
+        al_salir (Callable[[], Awaitable[Any]] | None):
+            Corrutina opcional de limpieza que se ejecuta al cerrar el menú.
+            Ejemplo: `cerrar_pools` para terminar los procesos de `server.py`.
+        al_iniciar (Callable[[], Awaitable[Any]] | None):
+            Corrutina opcional de preparación que se ejecuta antes de mostrar el menú,
+            en el mismo bucle de eventos. Ejemplo: sincronizar el contrato con el servidor.
     """
     #HERRAMIENTAS_DISPONIBLES = {
     #    1: "hola_mundo_mcp",
     #    2: "suma"
     #}
-    HERRAMIENTAS_DISPONIBLES = cargar_herramientas_del_contrato()
-    while True:
-        limpiar_pantalla()
-        print("\n" + "🔧" * 20)
-        print("   MENÚ DE HERRAMIENTAS")
-        print("🔧" * 20)
-        for num, nombre in HERRAMIENTAS_DISPONIBLES.items():
-            print(f"  {num}. {nombre}")
-        print("  0. Salir")
-        print("🔹" * 20)
+    # Un único bucle de eventos para toda la sesión del menú
+    loop = asyncio.new_event_loop()
+    try:
+        if al_iniciar is not None:
+            loop.run_until_complete(al_iniciar())
+        HERRAMIENTAS_DISPONIBLES = cargar_herramientas_del_contrato()
+        while True:
+            limpiar_pantalla()
+            print("\n" + "🔧" * 20)
+            print("   MENÚ DE HERRAMIENTAS")
+            print("🔧" * 20)
+            for num, nombre in HERRAMIENTAS_DISPONIBLES.items():
+                print(f"  {num}. {nombre}")
+            print("  0. Salir")
+            print("🔹" * 20)
 
-        try:
-            opcion = int(input("\n> Selecciona una opción: "))
-            if opcion == 0:
+            try:
+                # Varias opciones separadas por comas (p. ej. "1,2") se ejecutan en el mismo turno
+                opciones = [int(parte) for parte in input("\n> Selecciona una opción (o varias: 1,2): ").split(",")]
+                if opciones == [0]:
+                    cerrar_programa()
+                    break
+                elif all(opcion in HERRAMIENTAS_DISPONIBLES for opcion in opciones):
+                    herramientas = ",".join(HERRAMIENTAS_DISPONIBLES[opcion] for opcion in opciones)
+                    info(f"🔄 Ejecutando herramienta: {herramientas}")
+                    loop.run_until_complete(main_func(herramientas))
+                else:
+                    error("❌ Opción no válida. Elige un número del menú.")
+                    input("   Presiona ENTER para continuar...")  # ← PAUSA AQUÍ
+            except ValueError:
+                error("❌ Por favor, ingresa un número válido.")
+                input("   Presiona ENTER para continuar...")  # ← PAUSA AQUÍ
+            except KeyboardInterrupt:
+                print("")  # Nueva línea después de Ctrl+C
                 cerrar_programa()
                 break
-            elif opcion in HERRAMIENTAS_DISPONIBLES:
-                info(f"🔄 Ejecutando herramienta: {HERRAMIENTAS_DISPONIBLES[opcion]}")
-                asyncio.run(main_func(HERRAMIENTAS_DISPONIBLES[opcion]))
-            else:
-                error("❌ Opción no válida. Elige un número del menú.")
-                input("   Presiona ENTER para continuar...")  # ← PAUSA AQUÍ
-        except ValueError:
-            error("❌ Por favor, ingresa un número válido.")
-            input("   Presiona ENTER para continuar...")  # ← PAUSA AQUÍ
-        except KeyboardInterrupt:
-            print("")  # Nueva línea después de Ctrl+C
-            cerrar_programa()
-            break
-
-
+    finally:
+        if al_salir is not None:
+            loop.run_until_complete(al_salir())
+        loop.close()
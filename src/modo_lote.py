@@ -0,0 +1,153 @@
+# src/modo_lote.py
+"""
+Modo por lotes (sin menú) para ejecutar muchas herramientas en paralelo.
+
+Lee un archivo JSONL con una solicitud por línea y pasa cada una por el flujo
+detectar → ejecutar → resumir de `client.main`, con:
+- Límite de concurrencia (semáforo).
+- Timeout por solicitud.
+- Resultados emitidos en JSONL a medida que terminan (no al final).
+- Estadísticas finales: throughput y latencias p50/p95/p99.
+
+📁 Formato de entrada (una línea por solicitud; 'id' es opcional):
+    {"id": "a1", "herramienta": "suma"}
+    {"id": "a2", "herramienta": "hola_mundo_mcp"}
+
+Ejemplo de uso:
+    python client.py --lote solicitudes.jsonl --salida resultados.jsonl --concurrencia 8 --timeout 60
+"""
+
+import asyncio
+import json
+import math
+import sys
+import time
+from typing import Any, Awaitable, Callable, TextIO
+
+from logging_mcp import info, error, separator
+
+
+def leer_solicitudes(ruta_entrada: str) -> list[dict]:
+    """
+    Lee las solicitudes del archivo JSONL. Las líneas vacías se ignoran y las
+    inválidas se registran como error sin detener el lote.
+
+    Args:
+        ruta_entrada (str): Ruta al archivo JSONL de solicitudes.
+
+    Returns:
+        list[dict]: Solicitudes con 'id' y 'herramienta'.
+    """
+    solicitudes = []
+    with open(ruta_entrada, "r", encoding="utf-8") as f:
+        for num_linea, linea in enumerate(f, start=1):
+            if not linea.strip():
+                continue
+            try:
+                solicitud = json.loads(linea)
+                herramienta = solicitud["herramienta"]
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                error(f"Línea {num_linea} ignorada ({e!r}): {linea.strip()}")
+                continue
+            solicitudes.append({"id": solicitud.get("id", str(num_linea)), "herramienta": herramienta})
+    return solicitudes
+
+
+def percentil(valores_ordenados: list[float], p: float) -> float:
+    """
+    Percentil por el método del rango más cercano.
+
+    Args:
+        valores_ordenados (list[float]): Valores ya ordenados de menor a mayor.
+        p (float): Percentil entre 0 y 100.
+
+    Returns:
+        float: Valor del percentil (0.0 si no hay valores).
+    """
+    if not valores_ordenados:
+        return 0.0
+    rango = max(1, math.ceil(p / 100 * len(valores_ordenados)))
+    return valores_ordenados[rango - 1]
+
+
+def calcular_estadisticas(latencias: list[float], estados: list[str], duracion_total: float) -> dict:
+    """
+    Calcula throughput y percentiles de latencia de un lote.
+
+    Args:
+        latencias (list[float]): Latencia de cada solicitud, en segundos.
+        estados (list[str]): Estado final de cada solicitud.
+        duracion_total (float): Tiempo de pared del lote completo, en segundos.
+
+    Returns:
+        dict: Totales por estado, throughput (solicitudes/s) y p50/p95/p99 en ms.
+    """
+    ordenadas = sorted(latencias)
+    por_estado: dict[str, int] = {}
+    for estado in estados:
+        por_estado[estado] = por_estado.get(estado, 0) + 1
+    return {
+        "total": len(estados),
+        "por_estado": por_estado,
+        "duracion_s": round(duracion_total, 3),
+        "throughput_rps": round(len(estados) / duracion_total, 3) if duracion_total > 0 else 0.0,
+        "p50_ms": round(percentil(ordenadas, 50) * 1000, 1),
+        "p95_ms": round(percentil(ordenadas, 95) * 1000, 1),
+        "p99_ms": round(percentil(ordenadas, 99) * 1000, 1),
+    }
+
+
+async def ejecutar_lote(pipeline: Callable[[str], Awaitable[dict]], ruta_entrada: str,
+                        ruta_salida: str | None = None, concurrencia: int = 4,
+                        timeout: float = 60.0) -> dict:
+    """
+    Ejecuta todas las solicitudes del archivo a través de `pipeline` en paralelo.
+
+    Args:
+        pipeline (Callable[[str], Awaitable[dict]]): Flujo a ejecutar por solicitud,
+            normalmente `client.main` en modo no interactivo. Recibe el nombre de la herramienta.
+        ruta_entrada (str): Archivo JSONL con las solicitudes.
+        ruta_salida (str | None): Archivo JSONL de resultados. Si es None, se escribe en stdout.
+        concurrencia (int): Número máximo de solicitudes en vuelo a la vez.
+        timeout (float): Segundos máximos por solicitud.
+
+    Returns:
+        dict: Estadísticas del lote (ver `calcular_estadisticas`).
+    """
+    solicitudes = leer_solicitudes(ruta_entrada)
+    info(f"📦 Lote: {len(solicitudes)} solicitud(es), concurrencia={concurrencia}, timeout={timeout}s")
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def procesar(solicitud: dict) -> dict:
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                resultado: dict[str, Any] = await asyncio.wait_for(pipeline(solicitud["herramienta"]), timeout)
+            except asyncio.TimeoutError:
+                resultado = {"herramienta": solicitud["herramienta"], "estado": "timeout"}
+            except Exception as e:
+                resultado = {"herramienta": solicitud["herramienta"], "estado": "error", "detalle": str(e)}
+            latencia = time.perf_counter() - inicio
+        return {"id": solicitud["id"], **resultado, "latencia_ms": round(latencia * 1000, 1)}
+
+    salida: TextIO = open(ruta_salida, "w", encoding="utf-8") if ruta_salida else sys.stdout
+    latencias: list[float] = []
+    estados: list[str] = []
+    inicio_lote = time.perf_counter()
+    try:
+        for tarea in asyncio.as_completed([procesar(s) for s in solicitudes]):
+            registro = await tarea
+            latencias.append(registro["latencia_ms"] / 1000)
+            estados.append(registro["estado"])
+            salida.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+            salida.flush()
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+    estadisticas = calcular_estadisticas(latencias, estados, time.perf_counter() - inicio_lote)
+    separator()
+    info(f"📊 Total: {estadisticas['total']} {estadisticas['por_estado']} en {estadisticas['duracion_s']}s")
+    info(f"📊 Throughput: {estadisticas['throughput_rps']} solicitudes/s")
+    info(f"📊 Latencia p50={estadisticas['p50_ms']}ms  p95={estadisticas['p95_ms']}ms  p99={estadisticas['p99_ms']}ms")
+    return estadisticas
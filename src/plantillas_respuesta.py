@@ -0,0 +1,126 @@
+# src/plantillas_respuesta.py
+"""
+Respuestas finales formateadas en local a partir del resultado de la herramienta.
+
+Tras ejecutar una herramienta, `client.main` hacía una segunda llamada al modelo
+solo para contar en prosa lo que la herramienta ya devolvía (p. ej. el campo
+`detalle` de `IntResponse`). Con el modo de respuesta "plantilla":
+- Cada herramienta puede declarar una plantilla en `contexto/plantillas_respuesta.json`
+  (`{"suma": "{detalle}"}`), con los campos del resultado entre llaves.
+- Si hay plantilla y el resultado tiene todos sus campos, la respuesta se genera
+  en local y se ahorra la segunda ida y vuelta al modelo.
+- Si no hay plantilla (o falta algún campo), se sigue preguntando al modelo.
+
+El modo "modelo" (por defecto) conserva el comportamiento de siempre: la respuesta
+final la redacta el modelo. El archivo se carga una vez y solo se vuelve a leer si
+cambia su mtime, como el contrato de herramientas (ver `registro_tools`).
+
+Ejemplo de uso:
+    respuesta = obtener_plantillas_respuesta().renderizar("suma", {"entero": "8", "detalle": "La suma de 5 y 3 es 8."})
+    # → "La suma de 5 y 3 es 8." (o None si hay que preguntar al modelo)
+"""
+
+import json
+import os
+import string
+from pathlib import Path
+from typing import Any
+
+from logging_mcp import error, info, warning
+
+
+ruta_actual = Path(".")
+ruta_raiz = ruta_actual.parent
+ruta_plantillas_respuesta = ruta_raiz / "contexto/plantillas_respuesta.json"
+
+MODO_MODELO = "modelo"        # la respuesta final la redacta el modelo (segunda llamada)
+MODO_PLANTILLA = "plantilla"  # plantilla local si existe; el modelo solo como respaldo
+MODOS_RESPUESTA = (MODO_MODELO, MODO_PLANTILLA)
+
+
+class PlantillasRespuesta:
+    """Plantillas de respuesta por herramienta, cargadas en memoria."""
+
+    def __init__(self, ruta: Path | str = ruta_plantillas_respuesta) -> None:
+        """
+        Args:
+            ruta (Path | str): Ruta al JSON `{nombre_tool: plantilla}`.
+        """
+        self.ruta = Path(ruta)
+        self._mtime: int | None = None
+        self._plantillas: dict[str, str] = {}
+
+    def _recargar_si_cambio(self) -> None:
+        """Vuelve a leer el archivo solo si su mtime cambió (sin archivo no hay plantillas)."""
+        try:
+            mtime = os.stat(self.ruta).st_mtime_ns
+        except FileNotFoundError:
+            self._mtime, self._plantillas = -1, {}
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                plantillas = json.load(f)
+        except json.JSONDecodeError as e:
+            error(f"Error al leer {self.ruta.name}: {e}")
+            self._plantillas = {}
+            return
+        if not isinstance(plantillas, dict):
+            error(f"{self.ruta.name} debe ser un objeto {{herramienta: plantilla}}.")
+            self._plantillas = {}
+            return
+        self._plantillas = {nombre: texto for nombre, texto in plantillas.items() if isinstance(texto, str)}
+        info(f"🧾 Plantillas de respuesta cargadas: {', '.join(self._plantillas) or '(ninguna)'}.")
+
+    def plantilla(self, nombre_tool: str) -> str | None:
+        """
+        Args:
+            nombre_tool (str): Nombre de la herramienta.
+
+        Returns:
+            str | None: Plantilla declarada para la herramienta, o None.
+        """
+        self._recargar_si_cambio()
+        return self._plantillas.get(nombre_tool)
+
+    def renderizar(self, nombre_tool: str, resultado: Any) -> str | None:
+        """
+        Formatea la respuesta final con los campos del resultado de la herramienta.
+
+        Args:
+            nombre_tool (str): Nombre de la herramienta ejecutada.
+            resultado (Any): Resultado plano (`ejecutar_tool_manual(...)["result"]`); solo
+                un dict puede rellenar la plantilla.
+
+        Returns:
+            str | None: Respuesta formateada, o None si no hay plantilla o no se puede
+            rellenar (en ese caso hay que preguntar al modelo).
+        """
+        plantilla = self.plantilla(nombre_tool)
+        if plantilla is None:
+            return None
+        if not isinstance(resultado, dict):
+            # Una lista o un escalar no tiene campos con los que rellenar la plantilla
+            warning(f"El resultado de '{nombre_tool}' no es un objeto; se pregunta al modelo.")
+            return None
+        try:
+            return string.Formatter().vformat(plantilla, (), resultado).strip()
+        except (KeyError, IndexError, ValueError, AttributeError, TypeError) as e:
+            warning(f"La plantilla de '{nombre_tool}' no encaja con el resultado ({e!r}); se pregunta al modelo.")
+            return None
+
+
+_plantillas_compartidas: PlantillasRespuesta | None = None
+
+
+def obtener_plantillas_respuesta() -> PlantillasRespuesta:
+    """
+    Returns:
+        PlantillasRespuesta: Plantillas de respuesta compartidas del proceso.
+    """
+    global _plantillas_compartidas
+    if _plantillas_compartidas is None:
+        _plantillas_compartidas = PlantillasRespuesta()
+    return _plantillas_compartidas
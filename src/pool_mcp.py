@@ -0,0 +1,304 @@
+# src/pool_mcp.py
+"""
+Pool de clientes MCP persistentes.
+
+Cada llamada a `ejecutar_tool_manual` lanzaba un proceso nuevo de `server.py`
+(intérprete + imports de fastmcp/pydantic + handshake MCP). Este módulo mantiene
+un conjunto de clientes ya conectados que se prestan y se devuelven, de modo que
+el coste de arranque se paga una sola vez.
+
+Funcionalidades:
+- Tamaño configurable (parámetro o variable de entorno `MCP_POOL_TAMANO`).
+- Verificación de salud de los clientes que llevan tiempo inactivos.
+- Reinicio automático de un cliente si su servidor se cae.
+- Cierre ordenado de todos los procesos (`cerrar_pools`).
+- Lista de herramientas del servidor (`list_tools`) y su huella, actualizadas al
+  conectar y al reiniciar, para detectar cambios en el servidor. `huella_reciente()`
+  la vuelve a pedir si tiene más de `intervalo_salud` segundos.
+- El destino puede ser un script (transporte stdio, un proceso por cliente) o la
+  URL de un servidor ya en marcha (`python server.py --transporte http`), que
+  comparten muchos clientes. `MCP_SERVIDOR_URL` hace que se use la URL.
+
+Ejemplo de uso:
+    pool = obtener_pool("server.py")
+    async with pool.prestar() as client:
+        resultado = await client.call_tool("suma", {"numero1": 5, "numero2": 3})
+    await cerrar_pools()
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport, StreamableHttpTransport
+from logging_mcp import info, warning, error
+
+
+TAMANO_POOL_POR_DEFECTO = int(os.getenv("MCP_POOL_TAMANO", "2"))
+INTERVALO_SALUD_POR_DEFECTO = 30.0  # segundos de inactividad antes de verificar un cliente
+
+
+def es_url(destino: str) -> bool:
+    """True si `destino` es la URL de un servidor MCP por red y no la ruta de un script."""
+    return destino.startswith(("http://", "https://"))
+
+
+def destino_servidor_mcp(script_path: str = "server.py") -> str:
+    """
+    Servidor MCP al que se conecta el cliente: la URL de `MCP_SERVIDOR_URL` si está
+    definida (p. ej. "http://127.0.0.1:8000/mcp") o, si no, el script por stdio.
+
+    Args:
+        script_path (str): Script que se usa cuando no hay URL configurada.
+
+    Returns:
+        str: URL o ruta del script.
+    """
+    return os.getenv("MCP_SERVIDOR_URL") or script_path
+
+
+class PoolClientesMCP:
+    """
+    Conjunto de clientes MCP conectados a un mismo `server.py`.
+
+    Los clientes se crean de forma perezosa en la primera llamada a `prestar()`
+    y quedan ligados al bucle de eventos en el que se conectaron.
+    """
+
+    def __init__(self, script_path: str = "server.py", tamano: int = TAMANO_POOL_POR_DEFECTO,
+                 intervalo_salud: float = INTERVALO_SALUD_POR_DEFECTO) -> None:
+        """
+        Args:
+            script_path (str): Ruta al script del servidor MCP, o su URL si se sirve por red.
+            tamano (int): Número de clientes (procesos servidor, o conexiones si es una URL) a mantener vivos.
+            intervalo_salud (float): Segundos de inactividad tras los cuales se verifica
+                que un cliente sigue respondiendo antes de prestarlo.
+        """
+        if tamano < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1.")
+        self.script_path = script_path
+        self.tamano = tamano
+        self.intervalo_salud = intervalo_salud
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._disponibles: asyncio.Queue[Client] | None = None
+        self._clientes: list[Client] = []
+        self._ultimo_uso: dict[int, float] = {}
+        self._lock_inicio: asyncio.Lock | None = None
+        self._cerrado = False
+        self.herramientas: list[dict] = []  # definiciones MCP (formato JSON, con alias)
+        self.huella = ""  # hash de `herramientas`; cambia si el servidor cambia sus tools
+        self._huella_actualizada = 0.0  # time.monotonic() del último `list_tools`
+
+    def _crear_cliente(self) -> Client:
+        """Crea un cliente (sin conectar): HTTP si el destino es una URL, stdio si es un script."""
+        if es_url(self.script_path):
+            return Client(StreamableHttpTransport(self.script_path))
+        # keep_alive=False: el pool decide cuándo termina cada proceso; con el valor por
+        # defecto de fastmcp, `__aexit__` dejaba el servidor vivo hasta que acababa el bucle
+        transport = PythonStdioTransport(script_path=self.script_path, python_cmd=sys.executable, keep_alive=False)
+        return Client(transport)
+
+    async def _conectar(self) -> Client:
+        """Crea y conecta un cliente nuevo. Con stdio lanza el proceso del servidor."""
+        client = self._crear_cliente()
+        await client.__aenter__()
+        self._ultimo_uso[id(client)] = time.monotonic()
+        return client
+
+    async def _desconectar(self, client: Client) -> None:
+        """Cierra un cliente ignorando errores (el proceso puede estar ya muerto)."""
+        self._ultimo_uso.pop(id(client), None)
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception as e:
+            warning(f"Error al cerrar cliente MCP: {e}")
+
+    async def _actualizar_herramientas(self, client: Client) -> None:
+        """Pide la lista de herramientas al servidor y recalcula la huella."""
+        tools = await client.list_tools()
+        self.herramientas = [t.model_dump(mode="json", by_alias=True, exclude_none=True) for t in tools]
+        canonico = json.dumps(self.herramientas, sort_keys=True, ensure_ascii=False)
+        self.huella = hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+        self._huella_actualizada = time.monotonic()
+
+    async def huella_reciente(self) -> str:
+        """
+        Huella de herramientas con como mucho `intervalo_salud` segundos de antigüedad.
+        Quien sirve resultados sin tocar el servidor (ver `cache_tools`) no pasa por
+        `prestar()`, así que la huella no se refrescaría nunca: si es más vieja, se
+        vuelve a pedir `list_tools` con un cliente prestado.
+
+        Returns:
+            str: Huella actual de la lista de herramientas.
+        """
+        await self.iniciar()
+        if time.monotonic() - self._huella_actualizada >= self.intervalo_salud:
+            async with self.prestar() as client:
+                # La verificación de salud de `prestar()` pudo refrescarla ya
+                if time.monotonic() - self._huella_actualizada >= self.intervalo_salud:
+                    await self._actualizar_herramientas(client)
+        return self.huella
+
+    @property
+    def herramientas_cacheables(self) -> frozenset[str]:
+        """
+        Herramientas cuyo resultado se puede cachear en el cliente: las que el servidor
+        anota como de solo lectura e idempotentes (`readOnlyHint` e `idempotentHint`).
+        """
+        return frozenset(
+            t["name"] for t in self.herramientas
+            if t.get("annotations", {}).get("readOnlyHint") and t.get("annotations", {}).get("idempotentHint")
+        )
+
+    async def iniciar(self) -> None:
+        """Conecta todos los clientes del pool. Es idempotente."""
+        if self._disponibles is not None:
+            return
+        if self._lock_inicio is None:
+            self._lock_inicio = asyncio.Lock()
+        async with self._lock_inicio:
+            if self._disponibles is not None:
+                return
+            self.loop = asyncio.get_running_loop()
+            clientes = await asyncio.gather(*(self._conectar() for _ in range(self.tamano)))
+            self._clientes = list(clientes)
+            await self._actualizar_herramientas(self._clientes[0])
+            disponibles: asyncio.Queue[Client] = asyncio.Queue()
+            for client in self._clientes:
+                disponibles.put_nowait(client)
+            self._disponibles = disponibles
+            info(f"🔌 Pool MCP iniciado con {self.tamano} cliente(s) para '{self.script_path}'.")
+
+    async def _esta_sano(self, client: Client) -> bool:
+        """
+        Comprueba que el cliente sigue conectado. Si lleva más de `intervalo_salud`
+        segundos sin usarse, hace además una petición ligera (`list_tools`), que de
+        paso refresca la huella de herramientas.
+        """
+        if not client.is_connected():
+            return False
+        inactivo = time.monotonic() - self._ultimo_uso.get(id(client), 0.0)
+        if inactivo < self.intervalo_salud:
+            return True
+        try:
+            await self._actualizar_herramientas(client)
+            return True
+        except Exception:
+            return False
+
+    async def _reiniciar(self, client: Client) -> Client:
+        """Sustituye un cliente caído por uno nuevo conectado."""
+        warning(f"♻️ Reiniciando cliente MCP de '{self.script_path}'.")
+        await self._desconectar(client)
+        nuevo = await self._conectar()
+        self._clientes = [nuevo if c is client else c for c in self._clientes]
+        # El servidor pudo cambiar (p. ej. se editó server.py): se refresca la huella
+        await self._actualizar_herramientas(nuevo)
+        return nuevo
+
+    @asynccontextmanager
+    async def prestar(self) -> AsyncIterator[Client]:
+        """
+        Presta un cliente conectado durante el bloque `async with`.
+        Si el cliente no está sano se reinicia antes de entregarlo, y si se
+        desconecta durante el uso se reinicia al devolverlo.
+
+        Yields:
+            Client: Cliente MCP conectado y listo para `call_tool`.
+        """
+        if self._cerrado:
+            raise RuntimeError("El pool MCP ya está cerrado.")
+        await self.iniciar()
+        assert self._disponibles is not None
+        client = await self._disponibles.get()
+        try:
+            if not await self._esta_sano(client):
+                client = await self._reiniciar(client)
+            yield client
+        finally:
+            try:
+                if not self._cerrado and not client.is_connected():
+                    client = await self._reiniciar(client)
+            except Exception as e:
+                error(f"No se pudo reiniciar el cliente MCP: {e}")
+            self._ultimo_uso[id(client)] = time.monotonic()
+            self._disponibles.put_nowait(client)
+
+    async def cerrar(self) -> None:
+        """Cierra todos los clientes y termina los procesos del servidor."""
+        if self._cerrado:
+            return
+        self._cerrado = True
+        await asyncio.gather(*(self._desconectar(c) for c in self._clientes))
+        self._clientes = []
+        if self._disponibles is not None:
+            info(f"🔌 Pool MCP de '{self.script_path}' cerrado.")
+
+
+# === Registro de pools compartidos (uno por script y bucle de eventos) ===
+_POOLS: dict[str, PoolClientesMCP] = {}
+TIMEOUT_CIERRE_POOL_ANTERIOR = 10.0  # segundos máximos para cerrar un pool de otro bucle
+
+
+def _cerrar_pool_de_otro_bucle(pool: PoolClientesMCP) -> None:
+    """
+    Cierra un pool cuyos clientes pertenecen a otro bucle de eventos, antes de sustituirlo.
+    Los procesos de `server.py` viven en tareas de ese bucle, así que el cierre se
+    ejecuta allí: si sigue en marcha (en otro hilo) se le encarga `cerrar()`; si está
+    parado pero abierto, se ejecuta en un hilo auxiliar hasta terminar. Si ya está
+    cerrado no queda nada que hacer: `asyncio.run` cancela sus tareas (y con ellas
+    termina los procesos) antes de cerrarlo.
+    """
+    loop = pool.loop
+    if pool._cerrado or loop is None or loop.is_closed():
+        pool._cerrado = True
+        return
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.cerrar(), loop)
+        return
+    hilo = threading.Thread(target=loop.run_until_complete, args=(pool.cerrar(),), name="cierre-pool-mcp", daemon=True)
+    hilo.start()
+    hilo.join(TIMEOUT_CIERRE_POOL_ANTERIOR)
+    if hilo.is_alive():
+        warning(f"El pool MCP anterior de '{pool.script_path}' no terminó de cerrarse a tiempo.")
+
+
+def obtener_pool(script_path: str = "server.py", tamano: int = TAMANO_POOL_POR_DEFECTO) -> PoolClientesMCP:
+    """
+    Devuelve el pool compartido para `script_path`, creándolo si no existe.
+    Si el pool existente pertenece a otro bucle de eventos (p. ej. tras un
+    `asyncio.run` nuevo) se cierra (terminando sus procesos) y se crea otro.
+
+    Args:
+        script_path (str): Ruta al script del servidor MCP, o su URL.
+        tamano (int): Tamaño del pool si hay que crearlo.
+
+    Returns:
+        PoolClientesMCP: Pool listo para `prestar()`.
+    """
+    pool = _POOLS.get(script_path)
+    loop_actual = asyncio.get_running_loop()
+    if pool is not None and pool.loop is not None and pool.loop is not loop_actual:
+        _cerrar_pool_de_otro_bucle(pool)
+    if pool is None or pool._cerrado or (pool.loop is not None and pool.loop is not loop_actual):
+        pool = PoolClientesMCP(script_path=script_path, tamano=tamano)
+        _POOLS[script_path] = pool
+    return pool
+
+
+async def cerrar_pools() -> None:
+    """Cierra de forma ordenada todos los pools creados con `obtener_pool` (los de otros bucles, en su bucle)."""
+    loop_actual = asyncio.get_running_loop()
+    pools = list(_POOLS.values())
+    _POOLS.clear()
+    for pool in pools:
+        if pool.loop is not None and pool.loop is not loop_actual:
+            _cerrar_pool_de_otro_bucle(pool)
+    await asyncio.gather(*(pool.cerrar() for pool in pools if pool.loop is None or pool.loop is loop_actual))
@@ -0,0 +1,329 @@
+# src/presupuesto_tokens.py
+"""
+Ventana de contexto ajustada a un presupuesto de tokens.
+
+El historial solo se limitaba por número de intercambios (`max_intercambios=5`),
+sin mirar cuántos tokens ocupa: un resultado de herramienta largo podía superar
+el contexto del modelo y, en chats cortos, se desaprovechaba el margen. Este módulo:
+- Cuenta los tokens de cada mensaje con `tiktoken` si está instalado o, si no,
+  con una aproximación rápida (~4 caracteres por token). El recuento se cachea
+  por contenido, así que cada mensaje se cuenta una sola vez.
+- Conoce el contexto máximo de cada modelo (`LIMITES_CONTEXTO`) y calcula el
+  presupuesto: contexto - tokens de `tools` - reserva para la respuesta,
+  con un tope opcional (`CONTEXTO_PRESUPUESTO_TOKENS`).
+- Llena la ventana desde el final con intercambios completos (un `user` y todo
+  lo que le sigue, incluidos los resultados `tool`) hasta agotar el presupuesto.
+
+El almacén de historial guarda además el recuento de cada mensaje al anexarlo
+(ver `almacen_historial`), de modo que los totales no se recalculan en cada turno.
+En memoria, `Conversacion` hace lo mismo con la lista de mensajes de una petición:
+lleva el total a medida que se anexan o se descartan mensajes, y
+`ajustar_a_presupuesto` ya no vuelve a sumar la lista en cada payload.
+
+🔐 Configuración (opcional, en `.env`):
+    CONTEXTO_PRESUPUESTO_TOKENS=6000   # tope de tokens del prompt
+    CONTEXTO_RESERVA_RESPUESTA=1024    # tokens reservados para la respuesta
+
+Ejemplo de uso:
+    mensajes = Conversacion(plantilla)
+    mensajes.append({"role": "user", "content": "Hola"})   # actualiza mensajes.total_tokens
+    presupuesto = presupuesto_para_modelo("mistralai/mistral-7b-instruct", tools)
+    ventana = ajustar_a_presupuesto(mensajes, presupuesto)
+"""
+
+import json
+import os
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+from logging_mcp import warning
+from registro_tools import serializar_tools
+
+# tiktoken es opcional: sin él se usa la aproximación por caracteres
+try:
+    import tiktoken
+
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+
+# Contexto máximo (tokens) de los modelos usados vía OpenRouter
+LIMITES_CONTEXTO: dict[str, int] = {
+    "qwen/qwen-turbo": 131072,
+    "mistralai/mistral-7b-instruct": 32768,
+    "nousresearch/nous-hermes-2-mixtral-8x7b-dpo": 32768,
+}
+LIMITE_CONTEXTO_POR_DEFECTO = 8192
+RESERVA_RESPUESTA_POR_DEFECTO = 1024
+TOKENS_POR_MENSAJE = 4  # rol, separadores y formato del chat
+CARACTERES_POR_TOKEN = 4
+
+Mensaje = dict[str, Any]
+
+
+@lru_cache(maxsize=1)
+def _codificador():
+    """Codificador de tiktoken, o None si no está disponible (p. ej. sin red para descargarlo)."""
+    if not HAS_TIKTOKEN:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        warning(f"tiktoken no disponible ({e}); se usa la aproximación por caracteres.")
+        return None
+
+
+@lru_cache(maxsize=8192)
+def contar_tokens(texto: str) -> int:
+    """
+    Cuenta (o estima) los tokens de un texto. El resultado se cachea por contenido.
+
+    Args:
+        texto (str): Texto a contar.
+
+    Returns:
+        int: Número de tokens.
+    """
+    if not texto:
+        return 0
+    codificador = _codificador()
+    if codificador is not None:
+        return len(codificador.encode(texto))
+    return -(-len(texto) // CARACTERES_POR_TOKEN)  # división redondeando hacia arriba
+
+
+def tokens_mensaje(mensaje: Mensaje) -> int:
+    """
+    Tokens que ocupa un mensaje en el prompt: contenido, nombre, llamadas a
+    herramientas y la sobrecarga fija del formato de chat.
+
+    Args:
+        mensaje (Mensaje): Mensaje con "role" y "content".
+
+    Returns:
+        int: Número de tokens del mensaje.
+    """
+    total = TOKENS_POR_MENSAJE + contar_tokens(mensaje.get("content") or "")
+    if mensaje.get("name"):
+        total += contar_tokens(mensaje["name"])
+    if mensaje.get("tool_calls"):
+        total += contar_tokens(json.dumps(mensaje["tool_calls"], ensure_ascii=False, sort_keys=True))
+    return total
+
+
+def presupuesto_para_modelo(modelo: str, tools: list[dict] | None = None, reserva_respuesta: int | None = None) -> int:
+    """
+    Tokens disponibles para los mensajes del prompt de `modelo`.
+
+    Args:
+        modelo (str): Id del modelo en OpenRouter (p. ej. "mistralai/mistral-7b-instruct").
+        tools (list[dict] | None): Herramientas que viajan en el payload (también ocupan contexto).
+        reserva_respuesta (int | None): Tokens reservados para la respuesta
+            (por defecto `CONTEXTO_RESERVA_RESPUESTA` o 1024).
+
+    Returns:
+        int: Presupuesto de tokens para `messages`.
+    """
+    if reserva_respuesta is None:
+        reserva_respuesta = int(os.getenv("CONTEXTO_RESERVA_RESPUESTA", RESERVA_RESPUESTA_POR_DEFECTO))
+    presupuesto = LIMITES_CONTEXTO.get(modelo, LIMITE_CONTEXTO_POR_DEFECTO) - reserva_respuesta
+    tope = os.getenv("CONTEXTO_PRESUPUESTO_TOKENS")
+    if tope:
+        presupuesto = min(presupuesto, int(tope))
+    if tools:
+        presupuesto -= contar_tokens(serializar_tools(tools))
+    return max(presupuesto, 0)
+
+
+class Conversacion(list):
+    """
+    Lista de mensajes que lleva la cuenta de sus tokens.
+
+    Cada mensaje se cuenta una vez, al entrar en la lista, y `total_tokens` se
+    actualiza en cada `append`/`extend`/sustitución. Para cada presupuesto usado
+    guarda además su ventana (posición del primer mensaje conservado y tokens desde
+    ahí), que solo avanza al descartar intercambios: ajustar la conversación al
+    presupuesto cuesta lo que se anexó o se descartó desde la vez anterior.
+
+    Los mensajes no deben modificarse en el sitio (se sustituyen, como los de las
+    plantillas); cualquier otra operación de lista vuelve a contar desde cero.
+    """
+
+    def __init__(self, mensajes: Iterable[Mensaje] = ()) -> None:
+        """
+        Args:
+            mensajes (Iterable[Mensaje]): Mensajes iniciales.
+        """
+        super().__init__(mensajes)
+        self._recontar()
+
+    def _recontar(self) -> None:
+        self._tokens = [tokens_mensaje(m) for m in self]
+        self.total_tokens = sum(self._tokens)
+        # tokens disponibles (sin el system) → [primer mensaje conservado, tokens desde él]
+        self._ventanas: dict[int, list[int]] = {}
+
+    def append(self, mensaje: Mensaje) -> None:
+        super().append(mensaje)
+        tokens = tokens_mensaje(mensaje)
+        self._tokens.append(tokens)
+        self.total_tokens += tokens
+        for ventana in self._ventanas.values():
+            ventana[1] += tokens
+
+    def extend(self, mensajes: Iterable[Mensaje]) -> None:
+        for mensaje in mensajes:
+            self.append(mensaje)
+
+    def __iadd__(self, mensajes: Iterable[Mensaje]) -> "Conversacion":
+        self.extend(mensajes)
+        return self
+
+    def __setitem__(self, indice, valor) -> None:
+        anterior = self[indice]
+        super().__setitem__(indice, valor)
+        if not isinstance(indice, int):
+            self._recontar()
+            return
+        indice %= len(self)
+        tokens = tokens_mensaje(valor)
+        diferencia = tokens - self._tokens[indice]
+        self._tokens[indice] = tokens
+        self.total_tokens += diferencia
+        if indice == 0 and (anterior["role"] == "system") != (valor["role"] == "system"):
+            self._ventanas.clear()  # cambia lo que cuenta como system
+        elif indice > 0 or valor["role"] != "system":
+            for ventana in self._ventanas.values():
+                if indice >= ventana[0]:
+                    ventana[1] += diferencia
+
+    def _al_modificar(nombre: str):
+        def metodo(self, *args, **kwargs):
+            resultado = getattr(list, nombre)(self, *args, **kwargs)
+            self._recontar()
+            return resultado
+        metodo.__name__ = nombre
+        return metodo
+
+    insert = _al_modificar("insert")
+    pop = _al_modificar("pop")
+    remove = _al_modificar("remove")
+    clear = _al_modificar("clear")
+    sort = _al_modificar("sort")
+    reverse = _al_modificar("reverse")
+    __delitem__ = _al_modificar("__delitem__")
+    __imul__ = _al_modificar("__imul__")
+    del _al_modificar
+
+    def __reduce__(self):
+        return (Conversacion, (list(self),))
+
+    def ajustar(self, presupuesto: int) -> list[Mensaje]:
+        """
+        `ajustar_a_presupuesto` con los totales acumulados: no cuenta ningún mensaje.
+
+        Args:
+            presupuesto (int): Tokens disponibles para los mensajes.
+
+        Returns:
+            list[Mensaje]: La propia conversación si cabe entera; si no, una lista nueva
+            con el system y los últimos intercambios completos.
+        """
+        primero = 1 if self and self[0]["role"] == "system" else 0
+        disponible = presupuesto - (self._tokens[0] if primero else 0)
+        inicio, usados = self._inicio_ventana(primero, disponible)
+        if usados > disponible:
+            if inicio == len(self) or self[inicio]["role"] != "user":
+                warning("No hay mensajes de usuario en el historial; no se puede recortar por presupuesto.")
+                return self
+            warning(f"El último intercambio ({usados} tokens) supera el presupuesto de {disponible} tokens.")
+        if inicio == primero:
+            return self
+        return self[:primero] + self[inicio:]
+
+    def _inicio_ventana(self, primero: int, disponible: int) -> tuple[int, int]:
+        """
+        Primer mensaje conservado para `disponible` tokens (sin el system) y los tokens
+        desde él. Descarta intercambios completos por el principio de la ventana guardada
+        para ese presupuesto, restando sus tokens, sin recorrer el resto.
+        """
+        ventana = self._ventanas.get(disponible)
+        if ventana is None:
+            ventana = self._ventanas[disponible] = [primero, self.total_tokens - sum(self._tokens[:primero])]
+        inicio, usados = ventana
+        while usados > disponible:
+            # Siguiente `user` después del inicio: todo lo anterior sale de la ventana
+            siguiente = next((i for i in range(inicio + 1, len(self)) if self[i]["role"] == "user"), None)
+            if siguiente is None:
+                break
+            usados -= sum(self._tokens[inicio:siguiente])
+            inicio = siguiente
+        ventana[:] = [inicio, usados]
+        return inicio, usados
+
+
+def ajustar_a_presupuesto(mensajes: list[Mensaje], presupuesto: int,
+                          al_descartar: Callable[[list[Mensaje]], Any] | None = None) -> list[Mensaje]:
+    """
+    Deja el system (si `mensajes[0]` lo es) y los intercambios más recientes que
+    quepan en `presupuesto`. Con una `Conversacion` se usa su total acumulado (no
+    se cuenta nada); con una lista normal se recorre desde el final y se detiene al
+    agotar el presupuesto, así que solo se cuentan los mensajes de la ventana.
+
+    Args:
+        mensajes (list[Mensaje]): Historial completo.
+        presupuesto (int): Tokens disponibles para los mensajes.
+        al_descartar (Callable[[list[Mensaje]], Any] | None): Si se indica y se recorta, recibe
+            los mensajes descartados (sin el system), p. ej. para resumirlos (ver `resumen_historial`).
+
+    Returns:
+        list[Mensaje]: La misma lista si cabe entera; si no, una lista nueva con el
+        system y los últimos intercambios completos. El último intercambio se
+        conserva siempre (aunque no quepa) para no perder la pregunta actual.
+    """
+    if not mensajes:
+        return mensajes
+    if isinstance(mensajes, Conversacion):
+        ventana = mensajes.ajustar(presupuesto)
+    else:
+        ventana = _ajustar_lista(mensajes, presupuesto)
+    if al_descartar is not None and ventana is not mensajes:
+        primero = 1 if mensajes[0]["role"] == "system" else 0
+        descartados = [m for m in mensajes[primero:len(mensajes) - len(ventana) + primero] if m["role"] != "system"]
+        if descartados:
+            al_descartar(descartados)
+    return ventana
+
+
+def _ajustar_lista(mensajes: list[Mensaje], presupuesto: int) -> list[Mensaje]:
+    """`ajustar_a_presupuesto` para una lista normal: recorre desde el final contando tokens."""
+    system = mensajes[0] if mensajes[0]["role"] == "system" else None
+    primero = 1 if system else 0
+    disponible = presupuesto - (tokens_mensaje(system) if system else 0)
+
+    usados = 0  # tokens de los intercambios ya aceptados
+    grupo = 0   # tokens del intercambio en curso (desde el final hasta su `user`)
+    corte = len(mensajes)  # posición del primer mensaje conservado
+    i = len(mensajes) - 1
+    while i >= primero:
+        grupo += tokens_mensaje(mensajes[i])
+        if mensajes[i]["role"] == "user":
+            if usados + grupo > disponible and corte < len(mensajes):
+                break
+            usados += grupo
+            grupo = 0
+            corte = i
+        i -= 1
+    else:
+        # Se llegó al principio: si lo anterior al primer `user` también cabe, no se recorta nada
+        if usados + grupo <= disponible:
+            return mensajes
+
+    if corte == len(mensajes):
+        warning("No hay mensajes de usuario en el historial; no se puede recortar por presupuesto.")
+        return mensajes
+    if usados > disponible:
+        warning(f"El último intercambio ({usados} tokens) supera el presupuesto de {disponible} tokens.")
+    return ([system] if system else []) + mensajes[corte:]
+
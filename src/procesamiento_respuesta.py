@@ -1,38 +1,154 @@
 import json
+from typing import AsyncIterator, Protocol
+import httpx
 from requests import Response
+from sesion_http import SesionOpenRouterAsync, obtener_sesion_async
+from limitador_tasa import obtener_planificador
+from registro_tools import obtener_registro
+from respuesta_modelo import RespuestaModelo
 from logging_mcp import info, success, error, warning, debug, separator
 
 
-def extraer_mensaje_modelo(response: Response) -> dict:
-    """Crea un payload que incluye herramientas y fuerza su uso.
-    Prepara la solicitud para que el modelo considere activar una tool.
+def extraer_mensaje_modelo(response: RespuestaModelo | Response | httpx.Response) -> dict:
+    """Extrae el mensaje de la primera opción de la respuesta del modelo.
+    Si ya es una `RespuestaModelo`, se usa el cuerpo que ya decodificó.
 
     Args:
-        response (Response): Respuesta del modelo tras la solicitud HTTP.
+        response (RespuestaModelo | Response | httpx.Response): Respuesta del modelo tras la solicitud HTTP.
 
     Returns:
         dict: Diccionario con el mensaje del modelo.
         Contiene el contenido del mensaje y otros metadatos.
     """
-    data = response.json()
-    mensaje = data["choices"][0]["message"]
-    return mensaje
+    return RespuestaModelo.desde(response).mensaje
 
 
-def extraer_contenido(response_final: Response) -> str:
+def extraer_llamadas_herramienta(mensaje: dict) -> list[dict]:
+    """Lee los `tool_calls` nativos del mensaje del modelo y valida sus argumentos
+    contra el JSON Schema de cada herramienta en el contrato (ver `registro_tools`).
+    Así una sola llamada al modelo da a la vez la herramienta y sus argumentos.
+
+    Args:
+        mensaje (dict): Mensaje del modelo (ver `extraer_mensaje_modelo`).
+
+    Returns:
+        list[dict]: Llamadas válidas `{"id", "nombre", "argumentos"}`, en el orden del modelo y
+        con ids distintos (si el modelo repite o no envía un id, se genera uno).
+        Las que no existen en el contrato o traen argumentos inválidos se descartan con un
+        error en el log. Lista vacía si el modelo no usó `tool_calls` (modelos sin soporte
+        de herramientas): entonces se recurre a la detección por palabras clave.
+    """
+    registro = obtener_registro()
+    llamadas = []
+    ids: set[str] = set()
+    for posicion, tool_call in enumerate(mensaje.get("tool_calls") or []):
+        funcion = tool_call.get("function") or {}
+        nombre = funcion.get("name", "")
+        argumentos = funcion.get("arguments") or {}
+        if isinstance(argumentos, str):
+            # OpenRouter envía los argumentos como texto JSON
+            try:
+                argumentos = json.loads(argumentos) if argumentos.strip() else {}
+            except json.JSONDecodeError as e:
+                error(f"tool_call '{nombre}' descartado: argumentos no son JSON válido ({e}).")
+                continue
+        if not isinstance(argumentos, dict):
+            error(f"tool_call '{nombre}' descartado: los argumentos deben ser un objeto.")
+            continue
+        problema = registro.validar_argumentos(nombre, argumentos)
+        if problema:
+            error(f"tool_call '{nombre}' descartado: {problema}")
+            continue
+        id_llamada = tool_call.get("id") or f"call-{posicion + 1}"
+        if id_llamada in ids:
+            id_llamada = f"{id_llamada}-{posicion + 1}"
+        ids.add(id_llamada)
+        llamadas.append({"id": id_llamada, "nombre": nombre, "argumentos": argumentos})
+    return llamadas
+
+
+def extraer_contenido(response_final: RespuestaModelo | Response | httpx.Response) -> str:
     """Extrae solo el contenido textual (campo 'content') de la respuesta del modelo.
     Útil para mostrar o guardar la respuesta final.
 
     Args:
-        response_final (Response): Respuesta final del modelo tras la segunda llamada.
+        response_final (RespuestaModelo | Response | httpx.Response): Respuesta final del modelo tras la segunda llamada.
 
     Returns:
         str: Contenido textual de la respuesta del modelo.
         Si no se encuentra el campo 'content', retorna una cadena vacía.
     """
-    final_data = response_final.json()
-    respuesta_final = final_data["choices"][0]["message"]["content"]
-    return respuesta_final
+    return RespuestaModelo.desde(response_final).contenido or ""
+
+
+async def iterar_deltas_sse(response: httpx.Response) -> AsyncIterator[str]:
+    """Recorre una respuesta en streaming (SSE) de OpenRouter y produce los
+    fragmentos de texto ('delta.content') a medida que llegan.
+    Ignora comentarios SSE (p. ej. ': OPENROUTER PROCESSING') y termina con 'data: [DONE]'.
+
+    Args:
+        response (httpx.Response): Respuesta abierta con `stream=True`.
+
+    Yields:
+        str: Cada fragmento de contenido no vacío.
+    """
+    async for linea in response.aiter_lines():
+        if not linea.startswith("data:"):
+            continue
+        datos = linea[5:].strip()
+        if datos == "[DONE]":
+            break
+        try:
+            chunk = json.loads(datos)
+        except json.JSONDecodeError:
+            warning(f"Fragmento SSE no válido: {datos}")
+            continue
+        choices = chunk.get("choices") or [{}]
+        fragmento = choices[0].get("delta", {}).get("content")
+        if fragmento:
+            yield fragmento
+
+
+class DetectorIncremental(Protocol):
+    """Cualquier objeto que reciba fragmentos de texto y diga si ya hay intención."""
+
+    def alimentar(self, fragmento: str) -> bool: ...
+
+
+async def detectar_intencion_en_streaming_async(url: str, headers: dict, payload: dict, detector: DetectorIncremental,
+                                                sesion: SesionOpenRouterAsync | None = None) -> tuple[str, bool]:
+    """Envía el payload en modo streaming y pasa cada fragmento al detector.
+    En cuanto se detecta la intención se deja de leer: al salir del bloque del
+    stream se cierra la conexión y el resto de la respuesta se cancela.
+    Como las demás llamadas asíncronas al modelo, espera su turno en `limitador_tasa`.
+
+    Args:
+        url (str): La URL del modelo de IA.
+        headers (dict): Cabeceras de la solicitud.
+        payload (dict): Payload con 'stream': True (ver `crear_payload`).
+        detector (DetectorIncremental): Detector incremental de intención (ver `mcp_manual`).
+        sesion (SesionOpenRouterAsync | None): Sesión asíncrona. Si es None, se usa la compartida.
+
+    Returns:
+        tuple[str, bool]: Texto recibido hasta el momento y si se detectó la intención.
+
+    Exceptions:
+        httpx.HTTPStatusError: Si el modelo responde con un código distinto de 2xx.
+    """
+    recibido: list[str] = []
+    planificador = obtener_planificador()
+    await planificador.esperar_turno(headers, payload.get("model", ""))
+    async with (sesion or obtener_sesion_async()).stream(url, headers=headers, json=payload) as response:
+        planificador.registrar_respuesta(headers, payload.get("model", ""), response)
+        if response.status_code != 200:
+            await response.aread()
+            error(f"Error {response.status_code}: {response.text}")
+            response.raise_for_status()
+        async for fragmento in iterar_deltas_sse(response):
+            recibido.append(fragmento)
+            if detector.alimentar(fragmento):
+                return "".join(recibido), True
+    return "".join(recibido), False
 
 
 def imprimir_estructura_mensaje_enviado(mensaje: dict) -> None:
@@ -0,0 +1,231 @@
+# src/registro_tools.py
+"""
+Registro en memoria del contrato de herramientas (`contexto/contrato_tools.json`,
+o el contrato generado desde el servidor, ver `contrato_servidor`).
+
+Antes el contrato se leía y parseaba desde disco en cada `client.main` y otra
+vez en el menú. El registro:
+- Carga el archivo una sola vez y solo lo vuelve a leer si cambia su mtime.
+- Valida cada herramienta: estructura OpenRouter (`type: function`, nombre,
+  parámetros de tipo `object`) y que `parameters` sea un JSON Schema válido.
+  Las herramientas inválidas se descartan con un error en el log.
+- Indexa las herramientas por nombre y prepara un validador de argumentos por
+  herramienta (para comprobar los `tool_calls` nativos del modelo).
+- Guarda la lista `tools` ya serializada a JSON canónico (claves ordenadas): el
+  presupuesto de tokens y la clave de la caché de completions la usan en lugar
+  de volver a serializar el contrato en cada payload (ver `serializar_tools`).
+
+Ejemplo de uso:
+    registro = obtener_registro()
+    registro.tools            # lista para el payload
+    registro.nombres()        # ["hola_mundo_mcp", "suma"]
+    registro.por_nombre("suma")
+    registro.validar_argumentos("suma", {"numero1": 5, "numero2": 3})  # None si son válidos
+"""
+
+import json
+import os
+from pathlib import Path
+
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import SchemaError
+from logging_mcp import error, info
+
+
+ruta_actual = Path(".")
+ruta_raiz = ruta_actual.parent
+ruta_contrato_tools = ruta_raiz / "contexto/contrato_tools.json"
+
+
+def _json_canonico(tools: list[dict]) -> str:
+    return json.dumps(tools, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def validar_definicion_tool(tool: dict) -> str | None:
+    """
+    Valida una definición de herramienta en formato OpenRouter.
+
+    Args:
+        tool (dict): Definición `{"type": "function", "function": {...}}`.
+
+    Returns:
+        str | None: Descripción del problema, o None si es válida.
+    """
+    if not isinstance(tool, dict) or tool.get("type") != "function":
+        return "debe ser un objeto con \"type\": \"function\""
+    funcion = tool.get("function")
+    if not isinstance(funcion, dict) or not isinstance(funcion.get("name"), str) or not funcion["name"]:
+        return "falta \"function.name\""
+    parametros = funcion.get("parameters", {"type": "object", "properties": {}})
+    if not isinstance(parametros, dict) or parametros.get("type") != "object":
+        return "\"parameters\" debe ser un JSON Schema de tipo \"object\""
+    try:
+        Draft202012Validator.check_schema(parametros)
+    except SchemaError as e:
+        return f"JSON Schema inválido en \"parameters\": {e.message}"
+    return None
+
+
+class RegistroHerramientas:
+    """
+    Contrato de herramientas cargado, validado e indexado en memoria.
+    Las listas devueltas se comparten entre llamadas: no deben modificarse.
+    """
+
+    def __init__(self, ruta: Path | str = ruta_contrato_tools) -> None:
+        """
+        Args:
+            ruta (Path | str): Ruta al archivo JSON del contrato.
+        """
+        self.ruta = Path(ruta)
+        self._mtime: int | None = None
+        self._tools: list[dict] = []
+        self._por_nombre: dict[str, dict] = {}
+        self._validadores: dict[str, Draft202012Validator] = {}
+        self._tools_json = "[]"
+
+    def _recargar_si_cambio(self) -> None:
+        """Vuelve a leer el archivo solo si su mtime cambió desde la última carga."""
+        try:
+            mtime = os.stat(self.ruta).st_mtime_ns
+        except FileNotFoundError as e:
+            if self._mtime != -1:
+                error(f"Error al leer {self.ruta.name}: {e}")
+                self._establecer([])
+                self._mtime = -1
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                contrato = json.load(f)
+        except json.JSONDecodeError as e:
+            error(f"Error al leer {self.ruta.name}: {e}")
+            self._establecer([])
+            return
+        if isinstance(contrato, dict):
+            # Contrato generado desde el servidor: {"huella": ..., "tools": [...]}
+            contrato = contrato.get("tools")
+        if not isinstance(contrato, list):
+            error(f"{self.ruta.name} debe contener una lista de herramientas.")
+            self._establecer([])
+            return
+
+        validas = []
+        for posicion, tool in enumerate(contrato):
+            problema = validar_definicion_tool(tool)
+            if problema:
+                error(f"Herramienta #{posicion + 1} de {self.ruta.name} descartada: {problema}")
+            else:
+                validas.append(tool)
+        self._establecer(validas)
+        info(f"📜 Contrato cargado: {len(validas)} herramienta(s) desde {self.ruta.name}.")
+
+    def _establecer(self, tools: list[dict]) -> None:
+        self._tools = tools
+        self._por_nombre = {tool["function"]["name"]: tool for tool in tools}
+        self._validadores = {
+            nombre: Draft202012Validator(tool["function"].get("parameters", {"type": "object", "properties": {}}))
+            for nombre, tool in self._por_nombre.items()
+        }
+        self._tools_json = _json_canonico(tools)
+
+    @property
+    def tools(self) -> list[dict]:
+        """Lista de herramientas válidas, lista para el campo `tools` del payload."""
+        self._recargar_si_cambio()
+        return self._tools
+
+    @property
+    def tools_json(self) -> str:
+        """La lista `tools` ya serializada a JSON compacto con claves ordenadas."""
+        self._recargar_si_cambio()
+        return self._tools_json
+
+    def nombres(self) -> list[str]:
+        """
+        Returns:
+            list[str]: Nombres de las herramientas en el orden del contrato.
+        """
+        self._recargar_si_cambio()
+        return list(self._por_nombre)
+
+    def por_nombre(self, nombre: str) -> dict | None:
+        """
+        Args:
+            nombre (str): Nombre de la herramienta.
+
+        Returns:
+            dict | None: Definición de la herramienta, o None si no existe.
+        """
+        self._recargar_si_cambio()
+        return self._por_nombre.get(nombre)
+
+    def validar_argumentos(self, nombre: str, argumentos: dict) -> str | None:
+        """
+        Comprueba los argumentos de una llamada contra el JSON Schema de la herramienta.
+
+        Args:
+            nombre (str): Nombre de la herramienta.
+            argumentos (dict): Argumentos propuestos (p. ej. por un `tool_call` del modelo).
+
+        Returns:
+            str | None: Descripción del problema, o None si son válidos.
+        """
+        self._recargar_si_cambio()
+        validador = self._validadores.get(nombre)
+        if validador is None:
+            return f"la herramienta '{nombre}' no está en el contrato"
+        problema = next(validador.iter_errors(argumentos), None)
+        if problema is None:
+            return None
+        ruta = "/".join(str(parte) for parte in problema.absolute_path)
+        return f"{ruta + ': ' if ruta else ''}{problema.message}"
+
+
+_registro_compartido: RegistroHerramientas | None = None
+
+
+def obtener_registro() -> RegistroHerramientas:
+    """
+    Returns:
+        RegistroHerramientas: Registro compartido del proceso (por defecto, `contrato_tools.json`).
+    """
+    global _registro_compartido
+    if _registro_compartido is None:
+        _registro_compartido = RegistroHerramientas()
+    return _registro_compartido
+
+
+def usar_contrato(ruta: Path | str) -> RegistroHerramientas:
+    """
+    Hace que el registro compartido lea el contrato desde otro archivo
+    (p. ej. el generado desde el servidor MCP por `contrato_servidor`).
+
+    Args:
+        ruta (Path | str): Archivo de contrato: lista de tools o `{"huella": ..., "tools": [...]}`.
+
+    Returns:
+        RegistroHerramientas: Nuevo registro compartido.
+    """
+    global _registro_compartido
+    _registro_compartido = RegistroHerramientas(ruta)
+    return _registro_compartido
+
+
+def serializar_tools(tools: list[dict]) -> str:
+    """
+    JSON compacto y canónico (claves ordenadas) de una lista `tools`.
+
+    Args:
+        tools (list[dict]): Herramientas de un payload.
+
+    Returns:
+        str: Si `tools` es la lista del registro compartido, su texto ya serializado;
+        si no, la serialización de `tools`.
+    """
+    registro = obtener_registro()
+    if tools is registro.tools:
+        return registro.tools_json
+    return _json_canonico(tools)
@@ -0,0 +1,156 @@
+# src/respuesta_modelo.py
+"""
+Respuesta de chat completions de OpenRouter decodificada una sola vez.
+
+`extraer_mensaje_modelo` y `extraer_contenido` llamaban cada uno a
+`response.json()`, `actualizar_json_mensaje_qwen` lo volvía a hacer por su lado
+y las rutas de error releían `response.text`. `RespuestaModelo` envuelve la
+respuesta HTTP (requests o httpx) y:
+- Decodifica el cuerpo la primera vez que se pide un campo (ver `serializacion`)
+  y lo guarda; los demás accesos no vuelven a leerlo.
+- Expone `choices`, `mensaje`, `contenido`, `tool_calls`, `finish_reason` y
+  `usage`, calculados también bajo demanda.
+- Conserva el uso de tokens (`usage`), que antes se descartaba: el enrutador lo
+  acumula por modelo (ver `enrutador_modelos`) y `client.main` lo suma por turno.
+
+Ejemplo de uso:
+    respuesta = RespuestaModelo(response)
+    if respuesta.tool_calls: ...
+    info(f"{respuesta.contenido} ({respuesta.usage.total_tokens} tokens)")
+"""
+
+from functools import cached_property
+from typing import Any
+
+import httpx
+from requests import Response
+
+from serializacion import decodificar
+
+
+class UsoTokens:
+    """Tokens consumidos según el campo `usage` de la respuesta (0 si el proveedor no lo envía)."""
+
+    def __init__(self, prompt_tokens: int = 0, completion_tokens: int = 0, total_tokens: int | None = None) -> None:
+        """
+        Args:
+            prompt_tokens (int): Tokens de entrada.
+            completion_tokens (int): Tokens generados.
+            total_tokens (int | None): Total; si es None, la suma de los dos anteriores.
+        """
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens if total_tokens is None else total_tokens
+
+    @classmethod
+    def desde_dict(cls, usage: dict | None) -> "UsoTokens":
+        """
+        Args:
+            usage (dict | None): Campo `usage` de la respuesta.
+
+        Returns:
+            UsoTokens: Uso leído (todo a 0 si no hay campo `usage`).
+        """
+        usage = usage or {}
+        return cls(int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0),
+                   int(usage["total_tokens"]) if usage.get("total_tokens") is not None else None)
+
+    def __add__(self, otro: "UsoTokens") -> "UsoTokens":
+        return UsoTokens(self.prompt_tokens + otro.prompt_tokens, self.completion_tokens + otro.completion_tokens,
+                         self.total_tokens + otro.total_tokens)
+
+    def __repr__(self) -> str:
+        return (f"UsoTokens(prompt_tokens={self.prompt_tokens}, completion_tokens={self.completion_tokens}, "
+                f"total_tokens={self.total_tokens})")
+
+    def como_dict(self) -> dict[str, int]:
+        """
+        Returns:
+            dict[str, int]: Mismo formato que el campo `usage` de OpenRouter.
+        """
+        return {"prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+                "total_tokens": self.total_tokens}
+
+
+class RespuestaModelo:
+    """Respuesta HTTP del modelo con el cuerpo decodificado una sola vez y sus campos bajo demanda."""
+
+    def __init__(self, response: Response | httpx.Response) -> None:
+        """
+        Args:
+            response (Response | httpx.Response): Respuesta de la API de chat completions.
+        """
+        self.response = response
+
+    @classmethod
+    def desde(cls, respuesta: "RespuestaModelo | Response | httpx.Response") -> "RespuestaModelo":
+        """
+        Envuelve la respuesta, o la devuelve tal cual si ya estaba envuelta (y decodificada).
+
+        Args:
+            respuesta (RespuestaModelo | Response | httpx.Response): Respuesta del modelo.
+
+        Returns:
+            RespuestaModelo: Respuesta envuelta.
+        """
+        return respuesta if isinstance(respuesta, cls) else cls(respuesta)
+
+    @property
+    def status_code(self) -> int:
+        return self.response.status_code
+
+    @property
+    def headers(self) -> Any:
+        return self.response.headers
+
+    @property
+    def desde_cache(self) -> bool:
+        """True si la respuesta salió de la caché de completions (ver `cache_respuestas`)."""
+        return self.response.headers.get("X-Cache") == "HIT"
+
+    @cached_property
+    def texto(self) -> str:
+        """Cuerpo como texto (para mensajes de error), decodificado una sola vez."""
+        return self.response.content.decode("utf-8", errors="replace")
+
+    @cached_property
+    def datos(self) -> dict:
+        """
+        Cuerpo JSON decodificado (la única lectura del cuerpo).
+
+        Exceptions:
+            ValueError: Si el cuerpo no es JSON válido (`json.JSONDecodeError` u `orjson.JSONDecodeError`).
+        """
+        datos = decodificar(self.response.content)
+        return datos if isinstance(datos, dict) else {}
+
+    @cached_property
+    def choices(self) -> list[dict]:
+        return self.datos.get("choices") or []
+
+    @cached_property
+    def mensaje(self) -> dict:
+        """Mensaje de la primera opción ('role', 'content' y posiblemente 'tool_calls'); {} si no hay."""
+        return (self.choices[0].get("message") or {}) if self.choices else {}
+
+    @property
+    def contenido(self) -> str | None:
+        """Campo 'content' del mensaje (None si el modelo solo devolvió tool_calls)."""
+        return self.mensaje.get("content")
+
+    @property
+    def tool_calls(self) -> list[dict]:
+        return self.mensaje.get("tool_calls") or []
+
+    @property
+    def finish_reason(self) -> str | None:
+        return self.choices[0].get("finish_reason") if self.choices else None
+
+    @cached_property
+    def usage(self) -> UsoTokens:
+        return UsoTokens.desde_dict(self.datos.get("usage"))
+
+    @property
+    def uso_gastado(self) -> UsoTokens:
+        """Tokens que costó esta respuesta: los de `usage`, o 0 si salió de la caché."""
+        return UsoTokens() if self.desde_cache else self.usage
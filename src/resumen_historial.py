@@ -0,0 +1,264 @@
+# src/resumen_historial.py
+"""
+Resumen automático, en segundo plano, de los intercambios que salen del historial.
+
+`limitar_historial_inteligente` descartaba los intercambios antiguos sin más.
+Con `ResumidorHistorial`, lo que se descarta se va plegando en un resumen
+acumulado que viaja como un segundo mensaje `system`, justo después del prompt:
+- El resumen se calcula en una tarea asíncrona (`asyncio.create_task`): el turno
+  del usuario nunca lo espera y usa el último resumen disponible.
+- Los resúmenes son incrementales: cada tarea recibe el resumen anterior y solo
+  los mensajes descartados desde entonces. Las tareas de una misma sesión se
+  encadenan para respetar el orden.
+- Se cachean por segmento (hash del resumen previo + mensajes), así que un mismo
+  segmento nunca se resume dos veces.
+- El modelo que resume es inyectable: `resumidor_openrouter` usa OpenRouter, y
+  en pruebas basta una corrutina local.
+- Sirve tanto para el recorte por intercambios (`recortar`) como para el ajuste
+  por presupuesto de tokens de `crear_payload` (`ajustador`), que es el que usa
+  `client.main` con el resumidor compartido (`obtener_resumidor`).
+
+🔐 Configuración (opcional, en `.env`):
+    RESUMEN_MODELO=mistral   # alias o id del modelo que resume
+
+Ejemplo de uso:
+    resumidor = ResumidorHistorial(resumidor_openrouter(url, headers))
+    mensajes_payload = resumidor.recortar("principal", mensajes, max_intercambios=5)
+    payload = crear_payload(mensajes, modelo, ajustar_mensajes=resumidor.ajustador("principal"))
+    ...
+    await resumidor.esperar()  # al salir, para no dejar tareas a medias
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+from chat_modelo_local import crear_payload, hacer_solicitud_http_al_modelo_async, limitar_historial_inteligente
+from logging_mcp import error, info
+from presupuesto_tokens import ajustar_a_presupuesto, tokens_mensaje
+from respuesta_modelo import RespuestaModelo
+
+
+Mensaje = dict[str, Any]
+FuncionResumen = Callable[[str, list[Mensaje]], Awaitable[str]]
+
+PREFIJO_RESUMEN = "Resumen de la conversación anterior: "
+MAX_RESUMENES_POR_DEFECTO = 256
+
+
+def _huella(datos: Any) -> str:
+    """Hash SHA-256 del JSON canónico de `datos`."""
+    canonico = json.dumps(datos, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def resumidor_openrouter(url: str, headers: dict, modelo: str = "mistral") -> FuncionResumen:
+    """
+    Crea una función de resumen que llama al modelo vía OpenRouter.
+    Pasa por `hacer_solicitud_http_al_modelo_async` sin la caché de completions:
+    los resúmenes ya se cachean por contenido en `ResumidorHistorial`.
+
+    Args:
+        url (str): URL de la API de OpenRouter.
+        headers (dict): Cabeceras con la API key.
+        modelo (str): Alias o id del modelo que resume.
+
+    Returns:
+        FuncionResumen: Corrutina `resumir(resumen_previo, mensajes) -> str`.
+    """
+    async def resumir(resumen_previo: str, mensajes: list[Mensaje]) -> str:
+        transcripcion = "\n".join(f"{m['role']}: {m.get('content') or ''}" for m in mensajes)
+        prompt = [
+            {"role": "system", "content": "Resume la conversación en español en pocas frases. Conserva datos concretos, "
+                                          "resultados de herramientas y decisiones. Responde solo con el resumen."},
+            {"role": "user", "content": f"Resumen previo:\n{resumen_previo or '(ninguno)'}\n\nNuevos mensajes:\n{transcripcion}"},
+        ]
+        response = await hacer_solicitud_http_al_modelo_async(url, headers, crear_payload(prompt, modelo),
+                                                              usar_cache=False)
+        return (RespuestaModelo(response).contenido or "").strip()
+
+    return resumir
+
+
+class ResumidorHistorial:
+    """
+    Resumen acumulado por sesión de los mensajes que salen de la ventana de contexto.
+    Debe usarse desde un bucle de eventos en marcha (lanza tareas con `create_task`).
+    """
+
+    def __init__(self, resumir: FuncionResumen, max_resumenes: int = MAX_RESUMENES_POR_DEFECTO) -> None:
+        """
+        Args:
+            resumir (FuncionResumen): Corrutina que recibe el resumen previo y los mensajes
+                nuevos a plegar, y devuelve el resumen actualizado.
+            max_resumenes (int): Número máximo de resúmenes en la caché por segmento.
+        """
+        self.resumir = resumir
+        self.max_resumenes = max_resumenes
+        self.resumenes: dict[str, str] = {}  # sesión → último resumen disponible
+        # sesión → (nº de descartados, huella del último) ya programados
+        self._ultimo_descartado: dict[str, tuple[int, str]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._tareas: set[asyncio.Task] = set()
+        self.aciertos = 0
+        self.llamadas_modelo = 0
+
+    def recortar(self, sesion: str, mensajes: list[Mensaje], max_intercambios: int = 5) -> list[Mensaje]:
+        """
+        Limita el historial como `limitar_historial_inteligente`, programa el resumen de
+        lo descartado e inserta el resumen disponible tras el system. No espera al modelo.
+
+        Args:
+            sesion (str): Id de la conversación.
+            mensajes (list[Mensaje]): Historial completo.
+            max_intercambios (int): Intercambios que se envían literalmente.
+
+        Returns:
+            list[Mensaje]: system + resumen (si ya hay uno) + últimos intercambios.
+        """
+        recortado = limitar_historial_inteligente(
+            mensajes, max_intercambios, al_descartar=lambda descartados: self.programar(sesion, descartados))
+        resumen = self.mensaje_resumen(sesion)
+        if resumen:
+            posicion = 1 if recortado and recortado[0]["role"] == "system" else 0
+            recortado.insert(posicion, resumen)
+        return recortado
+
+    def mensaje_resumen(self, sesion: str) -> Mensaje | None:
+        """
+        Args:
+            sesion (str): Id de la conversación.
+
+        Returns:
+            Mensaje | None: Mensaje `system` con el último resumen disponible, o None si aún no hay.
+        """
+        resumen = self.resumenes.get(sesion)
+        return {"role": "system", "content": PREFIJO_RESUMEN + resumen} if resumen else None
+
+    def ajustar(self, sesion: str, mensajes: list[Mensaje], presupuesto: int) -> list[Mensaje]:
+        """
+        Ajusta el historial al presupuesto como `ajustar_a_presupuesto`, programa el resumen
+        de lo descartado e inserta el resumen disponible tras el system (descontando sus
+        tokens del presupuesto). No espera al modelo.
+
+        Args:
+            sesion (str): Id de la conversación.
+            mensajes (list[Mensaje]): Historial completo.
+            presupuesto (int): Tokens disponibles para los mensajes.
+
+        Returns:
+            list[Mensaje]: system + resumen (si ya hay uno) + intercambios que caben.
+        """
+        resumen = self.mensaje_resumen(sesion)
+        if resumen:
+            presupuesto -= tokens_mensaje(resumen)
+        ventana = ajustar_a_presupuesto(mensajes, presupuesto,
+                                        al_descartar=lambda descartados: self.programar(sesion, descartados))
+        if not resumen:
+            return ventana
+        posicion = 1 if ventana and ventana[0]["role"] == "system" else 0
+        # Lista nueva: `ventana` puede ser la propia conversación
+        return ventana[:posicion] + [resumen] + ventana[posicion:]
+
+    def ajustador(self, sesion: str) -> Callable[[list[Mensaje], int], list[Mensaje]]:
+        """
+        Args:
+            sesion (str): Id de la conversación.
+
+        Returns:
+            Callable[[list[Mensaje], int], list[Mensaje]]: `ajustar` para esa sesión, con la firma
+            de `ajustar_a_presupuesto` (para `crear_payload(..., ajustar_mensajes=...)`).
+        """
+        return partial(self.ajustar, sesion)
+
+    def programar(self, sesion: str, descartados: list[Mensaje]) -> asyncio.Task | None:
+        """
+        Lanza en segundo plano el resumen de los mensajes descartados que aún no se
+        habían programado (los descartes se acumulan turno a turno por el principio).
+
+        Args:
+            sesion (str): Id de la conversación.
+            descartados (list[Mensaje]): Todos los mensajes que quedan fuera de la ventana.
+
+        Returns:
+            asyncio.Task | None: Tarea lanzada, o None si no había nada nuevo.
+        """
+        nuevos = descartados
+        if sesion in self._ultimo_descartado:
+            cantidad, ultimo = self._ultimo_descartado[sesion]
+            if 0 < cantidad <= len(descartados) and _huella(descartados[cantidad - 1]) == ultimo:
+                # Caso normal: el historial solo crece por el final
+                nuevos = descartados[cantidad:]
+            else:
+                # El historial se reconstruyó (p. ej. recargado del almacén): se busca desde el final
+                for posicion in range(len(descartados) - 1, -1, -1):
+                    if _huella(descartados[posicion]) == ultimo:
+                        nuevos = descartados[posicion + 1:]
+                        break
+        if not nuevos:
+            return None
+        self._ultimo_descartado[sesion] = (len(descartados), _huella(descartados[-1]))
+        tarea = asyncio.get_running_loop().create_task(self._plegar(sesion, list(nuevos)))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+        return tarea
+
+    async def _plegar(self, sesion: str, nuevos: list[Mensaje]) -> None:
+        """Pliega `nuevos` en el resumen de la sesión (en orden, una tarea tras otra)."""
+        lock = self._locks.setdefault(sesion, asyncio.Lock())
+        async with lock:
+            previo = self.resumenes.get(sesion, "")
+            clave = _huella([previo, nuevos])
+            resumen = self._cache.get(clave)
+            if resumen is not None:
+                self._cache.move_to_end(clave)
+                self.aciertos += 1
+            else:
+                try:
+                    self.llamadas_modelo += 1
+                    resumen = await self.resumir(previo, nuevos)
+                except Exception as e:
+                    # Se conserva el resumen anterior; estos mensajes quedan sin resumir
+                    error(f"Error al resumir el historial de '{sesion}': {e}")
+                    return
+                self._cache[clave] = resumen
+                while len(self._cache) > self.max_resumenes:
+                    self._cache.popitem(last=False)
+            self.resumenes[sesion] = resumen
+            info(f"📝 Resumen de '{sesion}' actualizado ({len(nuevos)} mensaje(s) nuevos).")
+
+    async def esperar(self) -> None:
+        """Espera a que terminen los resúmenes en curso (p. ej. antes de cerrar el bucle)."""
+        while self._tareas:
+            await asyncio.gather(*list(self._tareas), return_exceptions=True)
+
+
+_resumidores: dict[str, ResumidorHistorial] = {}
+
+
+def obtener_resumidor(url: str, headers: dict) -> ResumidorHistorial:
+    """
+    Devuelve el resumidor compartido para una URL de la API, creándolo la primera vez
+    con el modelo de `RESUMEN_MODELO` (se lee aquí, después de `load_dotenv()`).
+
+    Args:
+        url (str): URL de la API de OpenRouter.
+        headers (dict): Cabeceras con la API key.
+
+    Returns:
+        ResumidorHistorial: Resumidor compartido (los resúmenes se conservan entre turnos).
+    """
+    if url not in _resumidores:
+        _resumidores[url] = ResumidorHistorial(resumidor_openrouter(url, headers, os.getenv("RESUMEN_MODELO", "mistral")))
+    return _resumidores[url]
+
+
+async def esperar_resumenes() -> None:
+    """Espera a que terminen los resúmenes en curso de los resumidores compartidos (al salir)."""
+    for resumidor in list(_resumidores.values()):
+        await resumidor.esperar()
@@ -0,0 +1,91 @@
+# src/serializacion.py
+"""
+Capa única de serialización JSON para los resultados de herramientas.
+
+Antes, cada resultado se convertía a mano (`resultado.data.__dict__` con
+`isinstance(v, datetime)` por campo, sin tocar los modelos anidados), después
+`json.dumps` lo volvía a recorrer al anexarlo al historial y el log lo formateaba
+una tercera vez. Ahora:
+- `codificar` convierte cualquier resultado (dataclasses de FastMCP, modelos
+  Pydantic, datetimes, listas y dicts anidados) a texto JSON en una sola pasada.
+- Ese texto se reutiliza para el historial (`content` del mensaje `tool`), para
+  el log y para la caché de resultados (ver `ejecutar_tool_manual`).
+- Con `orjson` instalado (opcional) la codificación se hace en C; si no, se usa
+  `json` de la librería estándar con el mismo resultado. orjson solo admite
+  enteros de 64 bits: con enteros mayores (p. ej. `suma` de 2**70) se recurre
+  a `json` en ambos sentidos, para no fallar al codificar ni perder precisión
+  al decodificar (orjson los leería como float).
+
+Ejemplo de uso:
+    texto = codificar(resultado.data)   # '{"mensaje":"Hola","timestamp":"2025-01-01T12:00:00"}'
+    plano = decodificar(texto)          # dict con solo tipos JSON
+"""
+
+import dataclasses
+import datetime
+import json
+import re
+from typing import Any
+
+# orjson es opcional: codifica dataclasses y datetimes de forma nativa y mucho más rápido
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# 19 dígitos seguidos o más: posible entero fuera de 64 bits (2**63 tiene 19 dígitos)
+_ENTERO_GRANDE_TEXTO = re.compile(r"[0-9]{19,}")
+_ENTERO_GRANDE_BYTES = re.compile(rb"[0-9]{19,}")
+
+
+def _por_defecto(valor: Any) -> Any:
+    """Convierte a tipos JSON lo que el codificador no sabe serializar por sí mismo."""
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return valor.isoformat()
+    if hasattr(valor, "model_dump"):  # modelos Pydantic
+        return valor.model_dump(mode="json")
+    if dataclasses.is_dataclass(valor) and not isinstance(valor, type):
+        # Sin `asdict`: el codificador recorre los campos anidados, sin copias intermedias
+        return {campo.name: getattr(valor, campo.name) for campo in dataclasses.fields(valor)}
+    if isinstance(valor, (set, frozenset, tuple)):
+        return list(valor)
+    if hasattr(valor, "__dict__"):
+        return vars(valor)
+    return str(valor)
+
+
+def codificar(valor: Any, ordenar_claves: bool = False) -> str:
+    """
+    Codifica un valor a texto JSON compacto (UTF-8 sin escapar).
+
+    Args:
+        valor (Any): Valor a codificar; puede contener dataclasses, modelos y datetimes anidados.
+        ordenar_claves (bool): Si es True, las claves se ordenan (forma canónica, para claves de caché).
+
+    Returns:
+        str: Texto JSON.
+    """
+    if HAS_ORJSON:
+        opciones = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if ordenar_claves else 0)
+        try:
+            return orjson.dumps(valor, default=_por_defecto, option=opciones).decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass  # p. ej. un entero fuera de 64 bits: lo codifica `json`
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":"), sort_keys=ordenar_claves, default=_por_defecto)
+
+
+def decodificar(texto: str | bytes) -> Any:
+    """
+    Args:
+        texto (str | bytes): Texto JSON.
+
+    Returns:
+        Any: Valor con solo tipos JSON (dict, list, str, int, float, bool, None).
+    """
+    if HAS_ORJSON:
+        patron = _ENTERO_GRANDE_TEXTO if isinstance(texto, str) else _ENTERO_GRANDE_BYTES
+        if not patron.search(texto):
+            return orjson.loads(texto)
+    return json.loads(texto)
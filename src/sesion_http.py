@@ -0,0 +1,242 @@
+# src/sesion_http.py
+"""
+Sesión HTTP compartida para las llamadas a OpenRouter.
+
+`requests.post` abre una conexión TCP+TLS nueva en cada llamada. Este módulo
+expone una sesión reutilizable (`SesionOpenRouter`) con:
+- Pool de conexiones keep-alive de tamaño configurable.
+- Timeouts de conexión y lectura por defecto.
+- Reintentos con backoff exponencial para 429 y errores 5xx
+  (respetando la cabecera `Retry-After`).
+
+También ofrece la variante asíncrona (`SesionOpenRouterAsync`, basada en
+`httpx.AsyncClient`) con la misma configuración, para que `client.main` pueda
+esperar las llamadas al modelo sin bloquear el bucle de eventos. Las llamadas al
+modelo usan solo la asíncrona: sus reintentos pasan por el planificador de
+`limitador_tasa`, mientras que la síncrona reintenta los 429 por su cuenta.
+
+Ejemplo de uso:
+    sesion = obtener_sesion()
+    response = sesion.post(url, headers=headers, json=payload)
+
+    sesion_async = obtener_sesion_async()
+    response = await sesion_async.post(url, headers=headers, json=payload)
+"""
+
+import asyncio
+import os
+from typing import AsyncContextManager
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+TAMANO_POOL_HTTP_POR_DEFECTO = int(os.getenv("OPENROUTER_POOL_TAMANO", "4"))
+TIMEOUT_POR_DEFECTO: tuple[float, float] = (5.0, 60.0)  # (conexión, lectura) en segundos
+REINTENTOS_POR_DEFECTO = 3
+BACKOFF_POR_DEFECTO = 0.5  # 0.5s, 1s, 2s...
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+
+class SesionOpenRouter:
+    """
+    Envoltorio de `requests.Session` con keep-alive, timeouts y reintentos.
+    Una misma instancia debe compartirse entre todas las llamadas al modelo.
+    """
+
+    def __init__(self, tamano_pool: int = TAMANO_POOL_HTTP_POR_DEFECTO,
+                 timeout: tuple[float, float] = TIMEOUT_POR_DEFECTO,
+                 reintentos: int = REINTENTOS_POR_DEFECTO,
+                 backoff: float = BACKOFF_POR_DEFECTO) -> None:
+        """
+        Args:
+            tamano_pool (int): Conexiones keep-alive máximas por host.
+            timeout (tuple[float, float]): Timeout de conexión y de lectura, en segundos.
+            reintentos (int): Número máximo de reintentos ante 429/5xx o fallos de conexión.
+            backoff (float): Factor de espera exponencial entre reintentos.
+        """
+        self.tamano_pool = tamano_pool
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.session = requests.Session()
+        politica = Retry(
+            total=reintentos,
+            backoff_factor=backoff,
+            status_forcelist=ESTADOS_REINTENTABLES,
+            allowed_methods=None,  # POST también se reintenta (las completions no tienen efectos laterales)
+            respect_retry_after_header=True,
+            raise_on_status=False,  # se devuelve la última respuesta; el llamador decide
+        )
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamano_pool, max_retries=politica)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+
+    def post(self, url: str, headers: dict | None = None, json: dict | None = None,
+             timeout: tuple[float, float] | float | None = None) -> requests.Response:
+        """
+        Hace un POST reutilizando las conexiones abiertas del pool.
+
+        Args:
+            url (str): URL de destino.
+            headers (dict | None): Cabeceras de la solicitud.
+            json (dict | None): Payload que se serializa como JSON.
+            timeout (tuple[float, float] | float | None): Timeout específico; si es None se usa el de la sesión.
+
+        Returns:
+            requests.Response: Respuesta del servidor (tras los reintentos necesarios).
+        """
+        return self.session.post(url, headers=headers, json=json, timeout=timeout or self.timeout)
+
+    def cerrar(self) -> None:
+        """Cierra todas las conexiones del pool."""
+        self.session.close()
+
+
+_sesion_compartida: SesionOpenRouter | None = None
+
+
+def obtener_sesion() -> SesionOpenRouter:
+    """
+    Devuelve la sesión HTTP compartida del proceso, creándola la primera vez.
+
+    Returns:
+        SesionOpenRouter: Sesión compartida del proceso.
+    """
+    global _sesion_compartida
+    if _sesion_compartida is None:
+        _sesion_compartida = SesionOpenRouter()
+    return _sesion_compartida
+
+
+def cerrar_sesion() -> None:
+    """Cierra la sesión compartida (si existe) liberando sus conexiones."""
+    global _sesion_compartida
+    if _sesion_compartida is not None:
+        _sesion_compartida.cerrar()
+        _sesion_compartida = None
+
+
+class SesionOpenRouterAsync:
+    """
+    Equivalente asíncrono de `SesionOpenRouter` sobre `httpx.AsyncClient`.
+    Queda ligada al bucle de eventos en el que se hace la primera petición.
+    """
+
+    def __init__(self, tamano_pool: int = TAMANO_POOL_HTTP_POR_DEFECTO,
+                 timeout: tuple[float, float] = TIMEOUT_POR_DEFECTO,
+                 reintentos: int = REINTENTOS_POR_DEFECTO,
+                 backoff: float = BACKOFF_POR_DEFECTO) -> None:
+        """
+        Args:
+            tamano_pool (int): Conexiones keep-alive máximas.
+            timeout (tuple[float, float]): Timeout de conexión y de lectura, en segundos.
+            reintentos (int): Número máximo de reintentos ante 429/5xx o fallos de conexión.
+            backoff (float): Factor de espera exponencial entre reintentos.
+        """
+        self.tamano_pool = tamano_pool
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.loop: asyncio.AbstractEventLoop | None = None
+        conexion, lectura = timeout
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(lectura, connect=conexion),
+            limits=httpx.Limits(max_connections=tamano_pool, max_keepalive_connections=tamano_pool),
+        )
+
+    def espera_reintento(self, intento: int, response: httpx.Response | None) -> float:
+        """Segundos a esperar antes del siguiente intento (usa `Retry-After` si viene)."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return max(0.0, float(retry_after))
+                except ValueError:
+                    pass
+        return self.backoff * (2 ** intento)
+
+    async def post(self, url: str, headers: dict | None = None, json: dict | None = None,
+                   reintentos: int | None = None) -> httpx.Response:
+        """
+        Hace un POST reutilizando las conexiones abiertas, con reintentos ante 429/5xx.
+
+        Args:
+            url (str): URL de destino.
+            headers (dict | None): Cabeceras de la solicitud.
+            json (dict | None): Payload que se serializa como JSON.
+            reintentos (int | None): Reintentos de esta petición; por defecto los de la sesión.
+                Con 0 se devuelve la primera respuesta tal cual, p. ej. para que los reintentos
+                pasen por el limitador de tasa (ver `hacer_solicitud_http_al_modelo_async`).
+
+        Returns:
+            httpx.Response: Respuesta del servidor (tras los reintentos necesarios).
+
+        Exceptions:
+            httpx.TransportError: Si la conexión falla en todos los intentos.
+        """
+        self.loop = self.loop or asyncio.get_running_loop()
+        reintentos = self.reintentos if reintentos is None else reintentos
+        for intento in range(reintentos + 1):
+            ultimo = intento == reintentos
+            try:
+                response = await self.client.post(url, headers=headers, json=json)
+            except httpx.TransportError:
+                if ultimo:
+                    raise
+                await asyncio.sleep(self.espera_reintento(intento, None))
+                continue
+            if response.status_code not in ESTADOS_REINTENTABLES or ultimo:
+                return response
+            await asyncio.sleep(self.espera_reintento(intento, response))
+        raise AssertionError("inalcanzable")
+
+    def stream(self, url: str, headers: dict | None = None, json: dict | None = None) -> AsyncContextManager[httpx.Response]:
+        """
+        Abre un POST en streaming (p. ej. SSE). No se reintenta: una respuesta
+        parcialmente consumida no puede repetirse de forma transparente.
+        Salir del bloque `async with` cierra la conexión y cancela el resto del stream.
+
+        Args:
+            url (str): URL de destino.
+            headers (dict | None): Cabeceras de la solicitud.
+            json (dict | None): Payload que se serializa como JSON.
+
+        Returns:
+            AsyncContextManager[httpx.Response]: Respuesta cuyo cuerpo se lee de forma incremental.
+        """
+        self.loop = self.loop or asyncio.get_running_loop()
+        return self.client.stream("POST", url, headers=headers, json=json)
+
+    async def cerrar(self) -> None:
+        """Cierra todas las conexiones del pool."""
+        await self.client.aclose()
+
+
+_sesion_async_compartida: SesionOpenRouterAsync | None = None
+
+
+def obtener_sesion_async() -> SesionOpenRouterAsync:
+    """
+    Devuelve la sesión asíncrona compartida, creándola si no existe o si la
+    existente pertenece a otro bucle de eventos.
+
+    Returns:
+        SesionOpenRouterAsync: Sesión compartida por las llamadas asíncronas al modelo.
+    """
+    global _sesion_async_compartida
+    sesion = _sesion_async_compartida
+    if sesion is None or (sesion.loop is not None and sesion.loop is not asyncio.get_running_loop()):
+        sesion = SesionOpenRouterAsync()
+        _sesion_async_compartida = sesion
+    return sesion
+
+
+async def cerrar_sesion_async() -> None:
+    """Cierra la sesión asíncrona compartida (si existe)."""
+    global _sesion_async_compartida
+    if _sesion_async_compartida is not None:
+        await _sesion_async_compartida.cerrar()
+        _sesion_async_compartida = None
@@ -0,0 +1,51 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+
+from stub_openrouter import ServidorOpenRouterFalso  # noqa: E402
+
+
+@pytest.fixture
+def entorno_limpio(tmp_path, monkeypatch):
+    """Directorio del proyecto, historial en un SQLite temporal y singletons del cliente sin estado previo."""
+    import almacen_historial
+    import cache_respuestas
+    import cache_tools
+    import enrutador_modelos
+    import limitador_tasa
+    import resumen_historial
+    import sesion_http
+
+    monkeypatch.chdir(RAIZ)
+    monkeypatch.setenv("HISTORIAL_SQLITE", str(tmp_path / "historial.sqlite3"))
+    monkeypatch.setenv("OPENROUTER_API_KEY", "clave-de-prueba")
+    for variable in ("OPENROUTER_CACHE_SQLITE", "OPENROUTER_COBERTURA_MS", "OPENROUTER_MODELOS", "MCP_SERVIDOR_URL",
+                     "CONTEXTO_PRESUPUESTO_TOKENS", "RESUMEN_MODELO"):
+        monkeypatch.delenv(variable, raising=False)
+    almacen_historial.cerrar_almacen_historial()
+    monkeypatch.setattr(cache_respuestas, "_cache_compartida", None)
+    monkeypatch.setattr(cache_tools, "_CACHES", {})
+    monkeypatch.setattr(enrutador_modelos, "_enrutador_compartido", None)
+    monkeypatch.setattr(limitador_tasa, "_planificador_compartido", None)
+    monkeypatch.setattr(sesion_http, "_sesion_async_compartida", None)
+    monkeypatch.setattr(resumen_historial, "_resumidores", {})
+    yield tmp_path
+    almacen_historial.cerrar_almacen_historial()
+
+
+@pytest.fixture
+def openrouter_falso(entorno_limpio, monkeypatch):
+    """Stub de OpenRouter en marcha, con `client.openrouter_connect` apuntando a él."""
+    import client
+
+    with ServidorOpenRouterFalso() as servidor:
+        monkeypatch.setattr(client, "openrouter_connect",
+                            lambda: (servidor.url, {"Authorization": "Bearer clave-de-prueba",
+                                                    "Content-Type": "application/json"}))
+        yield servidor
@@ -0,0 +1,106 @@
+# tests/stub_openrouter.py
+"""
+Servidor OpenRouter falso para las pruebas: responde a /chat/completions en
+127.0.0.1 con HTTP/1.1 keep-alive, guarda cada payload recibido y cuenta las
+conexiones TCP aceptadas (para comprobar que la sesión HTTP las reutiliza).
+
+Cada ruta puede tener su propia respuesta (`por_ruta`), p. ej. para simular varios
+modelos con latencias o errores distintos detrás de `EnrutadorModelos(endpoints=...)`.
+
+Ejemplo de uso:
+    with ServidorOpenRouterFalso() as servidor:
+        ...  # peticiones a servidor.url
+        assert servidor.conexiones == 1
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+
+def respuesta_por_defecto(payload: dict) -> dict:
+    """Pide la herramienta si el último mensaje la menciona; si no, da la respuesta final."""
+    ultimo = payload["messages"][-1].get("content") or ""
+    texto = "Voy a usar la herramienta suma" if "Herramienta" in ultimo else "El resultado es 8"
+    return {"choices": [{"message": {"role": "assistant", "content": texto}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}
+
+
+class _ServidorContador(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.conexiones = 0
+
+    def get_request(self):
+        peticion = super().get_request()
+        self.conexiones += 1  # una por socket aceptado
+        return peticion
+
+
+class ServidorOpenRouterFalso:
+    """Stub local de la API de chat completions."""
+
+    def __init__(self, responder: Callable[[dict], dict | tuple] = respuesta_por_defecto) -> None:
+        """
+        Args:
+            responder (Callable[[dict], dict | tuple]): Construye el cuerpo JSON de la respuesta a partir
+                del payload, o una tupla (estado HTTP, cuerpo, cabeceras) para simular errores como un 429.
+        """
+        self.responder = responder
+        # ruta → responder propio (las demás rutas usan `responder`)
+        self.por_ruta: dict[str, Callable[[dict], dict | tuple]] = {}
+        self.solicitudes: list[dict] = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_POST(self) -> None:
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                servidor.solicitudes.append(payload)
+                respuesta = servidor.por_ruta.get(self.path, servidor.responder)(payload)
+                estado, datos, cabeceras = respuesta if isinstance(respuesta, tuple) else (200, respuesta, {})
+                cuerpo = json.dumps(datos).encode("utf-8")
+                self.send_response(estado)
+                for nombre, valor in cabeceras.items():
+                    self.send_header(nombre, valor)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                try:
+                    self.wfile.write(cuerpo)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # el cliente canceló la petición (p. ej. la cobertura del enrutador)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._http = _ServidorContador(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self._http.server_port}/api/v1/chat/completions"
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    def url_de(self, ruta: str) -> str:
+        """
+        Args:
+            ruta (str): Ruta a registrar en `por_ruta` (p. ej. "/lento").
+
+        Returns:
+            str: URL de esa ruta en el servidor.
+        """
+        return self.url.rsplit("/api/", 1)[0] + ruta
+
+    @property
+    def conexiones(self) -> int:
+        """Conexiones TCP aceptadas desde el arranque."""
+        return self._http.conexiones
+
+    def __enter__(self) -> "ServidorOpenRouterFalso":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._http.shutdown()
+        self._http.server_close()
@@ -0,0 +1,122 @@
+# tests/test_almacen_historial.py
+import json
+
+import httpx
+import pytest
+
+from almacen_historial import AlmacenHistorial, obtener_almacen_historial
+from chat_modelo_local import actualizar_json_mensaje_qwen
+from presupuesto_tokens import tokens_mensaje
+from respuesta_modelo import RespuestaModelo
+
+SYSTEM = {"role": "system", "content": "Eres un asistente."}
+
+
+def _intercambio(i: int) -> list[dict]:
+    return [{"role": "user", "content": f"pregunta {i}"}, {"role": "assistant", "content": f"respuesta {i}"}]
+
+
+def _conversacion(n: int) -> list[dict]:
+    return [SYSTEM] + [m for i in range(n) for m in _intercambio(i)]
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenHistorial(str(tmp_path / "historial.sqlite3"), compactar_cada=0, conservar_intercambios=2)
+    yield almacen
+    almacen.cerrar()
+
+
+def test_ultimos_intercambios_devuelve_el_system_y_los_n_ultimos(almacen):
+    almacen.agregar_varios("s", _conversacion(6))
+
+    assert almacen.ultimos_intercambios("s", 2) == [SYSTEM] + _intercambio(4) + _intercambio(5)
+    assert almacen.ultimos_intercambios("s", 10) == _conversacion(6)
+    assert almacen.ultimos_intercambios("otra", 2) == []
+
+
+def test_ultimos_intercambios_por_presupuesto_conserva_solo_lo_que_cabe(almacen):
+    almacen.agregar_varios("s", _conversacion(6))
+    por_intercambio = sum(tokens_mensaje(m) for m in _intercambio(5))
+
+    # Caben el system y dos intercambios completos, no tres
+    presupuesto = tokens_mensaje(SYSTEM) + 2 * por_intercambio + por_intercambio // 2
+    assert almacen.ultimos_intercambios("s", None, presupuesto) == [SYSTEM] + _intercambio(4) + _intercambio(5)
+    # El último intercambio se devuelve siempre, aunque no quepa
+    assert almacen.ultimos_intercambios("s", None, 1) == [SYSTEM] + _intercambio(5)
+
+
+def test_inicio_por_presupuesto_devuelve_el_user_mas_antiguo_que_cabe(almacen):
+    almacen.agregar_varios("s", _conversacion(4))
+    db = almacen._conexion()
+    ids_user = [fila[0] for fila in db.execute("SELECT id FROM mensajes WHERE rol = 'user' ORDER BY id")]
+    por_intercambio = sum(tokens_mensaje(m) for m in _intercambio(3))
+
+    assert AlmacenHistorial._inicio_por_presupuesto(db, "s", 0, 3 * por_intercambio) == ids_user[1]
+    assert AlmacenHistorial._inicio_por_presupuesto(db, "s", 0, 10 * por_intercambio) == ids_user[0]
+    # Sin mensajes a partir de `desde_id`, se devuelve el propio `desde_id`
+    assert AlmacenHistorial._inicio_por_presupuesto(db, "s", 10_000, 0) == 10_000
+
+
+def test_compactacion_en_segundo_plano_deja_activos_los_ultimos_intercambios(almacen):
+    almacen.agregar_varios("s", _conversacion(5))
+
+    almacen.compactar_en_segundo_plano("s").join()
+
+    activos = almacen._conexion().execute("SELECT COUNT(*) FROM mensajes WHERE sesion = 's'").fetchone()[0]
+    assert activos == 1 + 2 * 2  # system + los dos intercambios conservados
+    assert almacen.ultimos_intercambios("s", 5) == [SYSTEM] + _intercambio(3) + _intercambio(4)
+    assert almacen.existe("s")
+
+
+def test_todos_intercala_segmentos_y_filas_activas_en_orden(almacen):
+    almacen.agregar_varios("s", _conversacion(4))
+    almacen.compactar("s")
+    almacen.agregar_varios("s", _intercambio(4) + _intercambio(5))
+    almacen.compactar("s")
+    almacen.agregar_varios("s", _intercambio(6))
+
+    assert almacen._conexion().execute("SELECT COUNT(*) FROM segmentos").fetchone()[0] == 2
+    assert almacen.todos("s") == _conversacion(7)
+
+
+def test_la_compactacion_se_lanza_sola_al_superar_el_umbral(tmp_path):
+    almacen = AlmacenHistorial(str(tmp_path / "historial.sqlite3"), compactar_cada=6, conservar_intercambios=1)
+    try:
+        for mensajes in [[SYSTEM]] + [_intercambio(i) for i in range(4)]:
+            almacen.agregar_varios("s", mensajes)
+        for hilo in list(almacen._hilos):
+            hilo.join()
+
+        assert almacen._conexion().execute("SELECT COUNT(*) FROM segmentos").fetchone()[0] == 1
+        assert almacen.todos("s") == _conversacion(4)
+    finally:
+        almacen.cerrar()
+
+
+def _respuesta(contenido: str) -> RespuestaModelo:
+    return RespuestaModelo(httpx.Response(200, json={"choices": [{"message": {"role": "assistant",
+                                                                              "content": contenido}}]}))
+
+
+def test_actualizar_con_ruta_de_archivo_reescribe_el_archivo(entorno_limpio, tmp_path):
+    ruta = tmp_path / "temp_context.json"
+    mensajes = _conversacion(6) + [{"role": "user", "content": "pregunta 6"}]
+
+    actualizar_json_mensaje_qwen(mensajes, _respuesta("respuesta 6"), str(ruta))
+
+    guardados = json.loads(ruta.read_text(encoding="utf-8"))
+    assert guardados[0] == SYSTEM
+    assert guardados[-1] == {"role": "assistant", "content": "respuesta 6"}
+    assert len(guardados) == 1 + 5 * 2  # historial limitado a 5 intercambios
+    assert obtener_almacen_historial().sesiones() == []  # no se crea una sesión con el nombre del archivo
+
+
+def test_actualizar_con_sesion_anexa_solo_los_mensajes_nuevos(entorno_limpio):
+    mensajes = _conversacion(1) + [{"role": "user", "content": "pregunta 1"}]
+
+    actualizar_json_mensaje_qwen(mensajes, _respuesta("respuesta 1"), sesion="demo")
+    mensajes.append({"role": "user", "content": "pregunta 2"})
+    actualizar_json_mensaje_qwen(mensajes, _respuesta("respuesta 2"), sesion="demo")
+
+    assert obtener_almacen_historial().todos("demo") == _conversacion(3)
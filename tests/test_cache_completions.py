@@ -0,0 +1,22 @@
+# tests/test_cache_completions.py
+import asyncio
+
+import client
+
+
+def test_solo_la_llamada_de_deteccion_sale_de_cache(openrouter_falso, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_MODELOS", "mistral")  # sin exploración: siempre el mismo modelo
+    async def dos_turnos_iguales() -> list[dict]:
+        try:
+            # Sesiones distintas: el primer payload de ambos turnos es idéntico
+            return [await client.main("suma", interactivo=False, id_sesion=sesion) for sesion in ("a", "b")]
+        finally:
+            await client.cerrar_recursos()
+
+    resultados = asyncio.run(dos_turnos_iguales())
+
+    assert [r["estado"] for r in resultados] == ["ok", "ok"]
+    # Detección una vez (la segunda sale de caché) y respuesta final en cada turno
+    ultimos = [payload["messages"][-1]["content"] for payload in openrouter_falso.solicitudes]
+    assert ultimos.count("¿Qué resultado se obtuvo?") == 2
+    assert len(openrouter_falso.solicitudes) == 3
@@ -0,0 +1,114 @@
+# tests/test_cache_tools.py
+import asyncio
+
+import pytest
+
+import cache_tools
+from cache_tools import CacheResultadosTools, obtener_cache_tools
+from mcp_manual import ejecutar_tool_manual
+from pool_mcp import PoolClientesMCP, cerrar_pools, obtener_pool
+
+ARGUMENTOS = {"numero1": 5, "numero2": 3}
+RESULTADO = {"entero": "8", "detalle": "La suma de 5 y 3 es 8."}
+
+
+class Reloj:
+    def __init__(self) -> None:
+        self.ahora = 1000.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(cache_tools.time, "monotonic", reloj)
+    return reloj
+
+
+def test_los_resultados_caducan_tras_el_ttl(reloj):
+    cache = CacheResultadosTools(ttl=10.0)
+    cache.sincronizar("h1", frozenset({"suma"}))
+    cache.guardar("suma", ARGUMENTOS, RESULTADO)
+
+    reloj.ahora += 9.0
+    assert cache.obtener("suma", {"numero2": 3, "numero1": 5}) == RESULTADO  # mismo orden canónico
+    reloj.ahora += 2.0
+    assert cache.obtener("suma", ARGUMENTOS) is None
+    assert (cache.aciertos, cache.fallos) == (1, 1)
+
+
+def test_un_cambio_de_huella_vacia_la_cache(reloj):
+    cache = CacheResultadosTools()
+    cache.sincronizar("h1", frozenset({"suma"}))
+    cache.guardar("suma", ARGUMENTOS, RESULTADO)
+
+    cache.sincronizar("h1", frozenset({"suma"}))
+    assert cache.obtener("suma", ARGUMENTOS) == RESULTADO
+    cache.sincronizar("h2", frozenset({"suma"}))
+    assert cache.obtener("suma", ARGUMENTOS) is None
+
+
+def test_solo_se_cachean_las_herramientas_puras():
+    pool = PoolClientesMCP("server.py")
+    pool.herramientas = [
+        {"name": "suma", "annotations": {"readOnlyHint": True, "idempotentHint": True}},
+        {"name": "solo_lectura", "annotations": {"readOnlyHint": True}},
+        {"name": "idempotente", "annotations": {"idempotentHint": True}},
+        {"name": "sin_anotaciones"},
+    ]
+    cache = CacheResultadosTools()
+    cache.sincronizar("h1", pool.herramientas_cacheables)
+
+    for nombre in ("suma", "solo_lectura", "idempotente", "sin_anotaciones"):
+        cache.guardar(nombre, ARGUMENTOS, RESULTADO)
+    assert pool.herramientas_cacheables == frozenset({"suma"})
+    assert cache.obtener("suma", ARGUMENTOS) == RESULTADO
+    assert [cache.obtener(n, ARGUMENTOS) for n in ("solo_lectura", "idempotente", "sin_anotaciones")] == [None] * 3
+
+
+def test_la_huella_vieja_se_refresca_aunque_todo_salga_de_cache(entorno_limpio, monkeypatch):
+    cambiar_servidor = False
+
+    async def tres_llamadas() -> tuple[CacheResultadosTools, list[dict]]:
+        nonlocal cambiar_servidor
+        try:
+            pool = obtener_pool("server.py")
+            actualizar = pool._actualizar_herramientas
+
+            async def actualizar_y_simular_cambio(client) -> None:
+                await actualizar(client)
+                if cambiar_servidor:  # como si se hubiera editado y reiniciado el servidor
+                    pool.huella = "huella-nueva"
+
+            monkeypatch.setattr(pool, "_actualizar_herramientas", actualizar_y_simular_cambio)
+            resultados = [await ejecutar_tool_manual("suma", ARGUMENTOS)]
+            resultados.append(await ejecutar_tool_manual("suma", ARGUMENTOS))  # huella reciente: acierto
+            cambiar_servidor = True
+            pool._huella_actualizada -= pool.intervalo_salud  # la huella ya es vieja
+            resultados.append(await ejecutar_tool_manual("suma", ARGUMENTOS))
+            return obtener_cache_tools("server.py"), resultados
+        finally:
+            await cerrar_pools()
+
+    cache, resultados = asyncio.run(tres_llamadas())
+
+    assert [r["result"]["detalle"] for r in resultados] == ["La suma de 5 y 3 es 8."] * 3
+    assert (cache.aciertos, cache.fallos) == (1, 2)  # la tercera llamada volvió al servidor
+    assert cache.huella == "huella-nueva"
+
+
+def test_las_herramientas_sin_anotaciones_siempre_van_al_servidor(entorno_limpio):
+    async def dos_llamadas() -> tuple[CacheResultadosTools, list[dict]]:
+        try:
+            resultados = [await ejecutar_tool_manual("hola_mundo_mcp", {"mensaje": "hola"}) for _ in range(2)]
+            return obtener_cache_tools("server.py"), resultados
+        finally:
+            await cerrar_pools()
+
+    cache, resultados = asyncio.run(dos_llamadas())
+
+    assert "hola_mundo_mcp" not in cache.cacheables
+    assert cache.aciertos == 0
+    assert all(r["tool_name"] == "hola_mundo_mcp" for r in resultados)
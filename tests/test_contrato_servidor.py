@@ -0,0 +1,31 @@
+# tests/test_contrato_servidor.py
+from contrato_servidor import archivos_servidor, huella_servidor
+
+
+def _servidor(tmp_path):
+    (tmp_path / "src" / "paquete").mkdir(parents=True)
+    (tmp_path / "server.py").write_text("from ejecutor import en_ejecutor\n", encoding="utf-8")
+    (tmp_path / "src" / "ejecutor.py").write_text("def en_ejecutor(): ...\n", encoding="utf-8")
+    (tmp_path / "src" / "paquete" / "util.py").write_text("X = 1\n", encoding="utf-8")
+    (tmp_path / "src" / "notas.txt").write_text("no es código\n", encoding="utf-8")
+    return str(tmp_path / "server.py")
+
+
+def test_la_huella_incluye_los_modulos_locales(tmp_path):
+    script = _servidor(tmp_path)
+
+    assert [p.relative_to(tmp_path).as_posix() for p in archivos_servidor(script)] == [
+        "server.py", "src/ejecutor.py", "src/paquete/util.py"]
+    antes = huella_servidor(script)
+    assert huella_servidor(script) == antes
+
+    (tmp_path / "src" / "paquete" / "util.py").write_text("X = 2\n", encoding="utf-8")
+    assert huella_servidor(script) != antes
+
+
+def test_la_huella_no_cambia_con_archivos_que_no_son_codigo(tmp_path):
+    script = _servidor(tmp_path)
+    antes = huella_servidor(script)
+
+    (tmp_path / "src" / "notas.txt").write_text("otra nota\n", encoding="utf-8")
+    assert huella_servidor(script) == antes
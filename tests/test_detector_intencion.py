@@ -0,0 +1,26 @@
+# tests/test_detector_intencion.py
+"""Pruebas del comparador de intención multi-herramienta."""
+
+from detector_intencion import obtener_comparador
+from mcp_manual import debe_usar_tool
+
+
+def test_frases_solapadas_detectan_todas_las_herramientas():
+    comparador = obtener_comparador(("suma", "suma_total"))
+
+    encontradas = comparador.buscar("Voy a usar suma_total")
+
+    assert sorted(encontradas) == ["suma", "suma_total"]
+    assert (11, 15) in encontradas["suma"]
+    assert (0, 21) in encontradas["suma_total"]
+
+
+def test_buscar_coincide_con_debe_usar_tool_por_herramienta():
+    nombres = ("suma", "suma_total", "resta", "saludo")
+    comparador = obtener_comparador(nombres)
+    textos = ["Voy a usar suma_total", "es resta", "Hola, necesito un saludo y una suma", "nada que ver",
+              "VOY A USAR LA HERRAMIENTA SALUDO"]
+
+    for texto in textos:
+        esperadas = {nombre for nombre in nombres if debe_usar_tool(texto, nombre, palabras_clave=[])}
+        assert set(comparador.buscar(texto)) == esperadas, texto
@@ -0,0 +1,119 @@
+# tests/test_ejecutor_tools.py
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+import ejecutor_tools
+from ejecutor_tools import en_ejecutor
+
+
+def _dormir(segundos: float) -> tuple[float, float]:
+    inicio = time.time()
+    time.sleep(segundos)
+    return inicio, time.time()
+
+
+dormir_en_proceso = en_ejecutor("proceso")(_dormir)
+
+_activas = 0
+_max_activas = 0
+_ejecutadas: list[str] = []
+_lock = threading.Lock()
+_liberar = threading.Event()
+
+
+def _ocupar(etiqueta: str) -> str:
+    global _activas, _max_activas
+    with _lock:
+        _activas += 1
+        _max_activas = max(_max_activas, _activas)
+        _ejecutadas.append(etiqueta)
+    _liberar.wait(5)
+    with _lock:
+        _activas -= 1
+    return etiqueta
+
+
+ocupar_de_dos_en_dos = en_ejecutor("hilo", max_concurrencia=2)(_ocupar)
+ocupar_de_una_en_una = en_ejecutor("hilo", max_concurrencia=1)(_ocupar)
+
+
+@pytest.fixture(autouse=True)
+def ejecutores_nuevos(monkeypatch):
+    global _activas, _max_activas
+    monkeypatch.setenv("MCP_EJECUTOR_PROCESOS", "4")
+    ejecutor_tools.cerrar_ejecutores()
+    _activas = _max_activas = 0
+    _ejecutadas.clear()
+    _liberar.clear()
+    yield
+    _liberar.set()
+    ejecutor_tools.cerrar_ejecutores()
+
+
+def test_llamadas_en_procesos_se_solapan():
+    async def lanzar() -> list[tuple[float, float]]:
+        await asyncio.gather(*(dormir_en_proceso(0) for _ in range(4)))  # arranque de los workers
+        return await asyncio.gather(*(dormir_en_proceso(0.5) for _ in range(4)))
+
+    intervalos = asyncio.run(lanzar())
+
+    # Todas empiezan antes de que termine la primera: se ejecutan a la vez, no en serie
+    assert max(inicio for inicio, _ in intervalos) < min(fin for _, fin in intervalos)
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="el escalado con procesos necesita varios núcleos")
+def test_contar_primos_concurrente_escala_con_los_nucleos():
+    import server
+
+    llamadas = min(4, os.cpu_count() or 1)
+    limite = 150_000
+
+    async def medir() -> tuple[float, float]:
+        await asyncio.gather(*(server.contar_primos(1000) for _ in range(llamadas)))  # arranque de los workers
+        inicio = time.perf_counter()
+        for _ in range(llamadas):
+            await server.contar_primos(limite)
+        serie = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(server.contar_primos(limite) for _ in range(llamadas)))
+        assert len({r.entero for r in resultados}) == 1
+        return serie, time.perf_counter() - inicio
+
+    serie, concurrente = asyncio.run(medir())
+
+    assert concurrente < serie * 0.75
+
+
+def test_max_concurrencia_limita_las_llamadas_simultaneas():
+    async def lanzar() -> list[str]:
+        tareas = [asyncio.ensure_future(ocupar_de_dos_en_dos(str(i))) for i in range(6)]
+        await asyncio.sleep(0.3)
+        assert _activas == 2  # las demás esperan su turno sin ocupar el pool
+        _liberar.set()
+        return await asyncio.gather(*tareas)
+
+    assert asyncio.run(lanzar()) == [str(i) for i in range(6)]
+    assert _max_activas == 2
+
+
+def test_una_llamada_cancelada_antes_de_empezar_no_se_ejecuta():
+    async def lanzar() -> None:
+        primera = asyncio.ensure_future(ocupar_de_una_en_una("primera"))
+        await asyncio.sleep(0.1)
+        segunda = asyncio.ensure_future(ocupar_de_una_en_una("segunda"))
+        await asyncio.sleep(0.1)
+        segunda.cancel()  # aún esperaba turno (max_concurrencia=1)
+        _liberar.set()
+        assert await primera == "primera"
+        with pytest.raises(asyncio.CancelledError):
+            await segunda
+        # La tercera ocupa el hueco que la cancelada nunca usó
+        assert await ocupar_de_una_en_una("tercera") == "tercera"
+
+    asyncio.run(lanzar())
+
+    assert _ejecutadas == ["primera", "tercera"]
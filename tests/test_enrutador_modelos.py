@@ -0,0 +1,96 @@
+# tests/test_enrutador_modelos.py
+import asyncio
+import time
+
+import pytest
+
+from enrutador_modelos import EnrutadorModelos
+from sesion_http import SesionOpenRouterAsync
+from stub_openrouter import respuesta_por_defecto
+
+CABECERAS = {"Authorization": "Bearer clave-de-prueba"}
+
+
+def _payload(modelo: str) -> dict:
+    return {"model": modelo, "messages": [{"role": "user", "content": "hola"}]}
+
+
+def _con_retraso(segundos: float, estado: int = 200, cabeceras: dict | None = None):
+    """Responder que tarda `segundos` y devuelve `estado` (con un cuerpo de error si no es 200)."""
+    def responder(payload: dict) -> dict | tuple:
+        time.sleep(segundos)
+        if estado != 200:
+            return estado, {"error": {"code": estado}}, cabeceras or {}
+        return respuesta_por_defecto(payload)
+    return responder
+
+
+def _enrutador(servidor, retrasos: dict, **opciones) -> EnrutadorModelos:
+    """Un endpoint del stub por modelo, con su propio responder."""
+    for alias, responder in retrasos.items():
+        servidor.por_ruta[f"/{alias}"] = responder
+    return EnrutadorModelos(modelos=list(retrasos), endpoints={alias: servidor.url_de(f"/{alias}") for alias in retrasos},
+                            **opciones)
+
+
+def _solicitar(enrutador: EnrutadorModelos, servidor, sesion: SesionOpenRouterAsync | None = None,
+               veces: int = 1) -> list[str]:
+    async def lanzar() -> list[str]:
+        alias = [(await enrutador.solicitar(servidor.url, CABECERAS, _payload, sesion=sesion))[0]
+                 for _ in range(veces)]
+        if sesion is not None:
+            await sesion.cerrar()
+        return alias
+    return asyncio.run(lanzar())
+
+
+def test_failover_tras_un_error(openrouter_falso):
+    enrutador = _enrutador(openrouter_falso, {"mistral": _con_retraso(0, 503, {"Retry-After": "0"}),
+                                              "qwen": _con_retraso(0)})
+
+    assert _solicitar(enrutador, openrouter_falso) == ["qwen"]
+    assert not enrutador.esta_sano("mistral")  # en enfriamiento tras el error
+    assert enrutador.ordenar() == ["qwen", "mistral"]
+
+
+def test_failover_tras_un_timeout(openrouter_falso):
+    enrutador = _enrutador(openrouter_falso, {"mistral": _con_retraso(1.0), "qwen": _con_retraso(0)}, timeout=0.3)
+
+    inicio = time.perf_counter()
+    assert _solicitar(enrutador, openrouter_falso) == ["qwen"]
+    assert time.perf_counter() - inicio < 1.0
+    assert enrutador.resumen()["mistral"]["tasa_errores"] == 1.0
+
+
+def test_cobertura_lanza_el_siguiente_modelo_si_el_primero_tarda(openrouter_falso):
+    enrutador = _enrutador(openrouter_falso, {"mistral": _con_retraso(1.0), "qwen": _con_retraso(0)},
+                           retraso_cobertura=0.1)
+
+    inicio = time.perf_counter()
+    assert _solicitar(enrutador, openrouter_falso) == ["qwen"]
+    assert time.perf_counter() - inicio < 0.8
+    # El intento cancelado por la cobertura no cuenta como fallo de 'mistral'
+    assert enrutador.resumen()["mistral"]["tasa_errores"] == 0.0
+    assert enrutador.esta_sano("mistral")
+
+
+def test_429_enfria_el_modelo_lo_que_indica_retry_after(openrouter_falso):
+    enrutador = _enrutador(openrouter_falso, {"mistral": _con_retraso(0, 429, {"Retry-After": "30"}),
+                                              "qwen": _con_retraso(0)}, enfriamiento=1)
+
+    # Sin reintentos en la sesión, el 429 llega al enrutador en lugar de esperar en la cola
+    assert _solicitar(enrutador, openrouter_falso, sesion=SesionOpenRouterAsync(reintentos=0)) == ["qwen"]
+    estadisticas = enrutador.estadisticas["mistral"]
+    assert estadisticas.limitados == 1
+    assert estadisticas.enfriamiento_hasta - time.monotonic() == pytest.approx(30, abs=2)
+    assert enrutador.elegir() == "qwen"
+
+
+def test_ordena_por_latencia_una_vez_medidos(openrouter_falso):
+    enrutador = _enrutador(openrouter_falso, {"mistral": _con_retraso(0.3), "qwen": _con_retraso(0.02)})
+
+    # Los modelos sin medir van primero, en el orden configurado; después, el más rápido
+    assert _solicitar(enrutador, openrouter_falso, veces=3) == ["mistral", "qwen", "qwen"]
+    assert enrutador.ordenar() == ["qwen", "mistral"]
+    resumen = enrutador.resumen()
+    assert resumen["qwen"]["latencia_ms"] < resumen["mistral"]["latencia_ms"]
@@ -0,0 +1,53 @@
+# tests/test_limitador_tasa.py
+import asyncio
+import itertools
+
+import httpx
+
+from enrutador_modelos import EnrutadorModelos
+from limitador_tasa import obtener_planificador
+from stub_openrouter import respuesta_por_defecto
+
+CABECERAS = {"Authorization": "Bearer clave-de-prueba"}
+
+
+def _payload(modelo: str) -> dict:
+    return {"model": modelo, "messages": [{"role": "user", "content": "hola"}]}
+
+
+def test_cada_reintento_pasa_por_el_planificador(openrouter_falso):
+    contador = itertools.count()
+    openrouter_falso.responder = lambda payload: (
+        (429, {"error": "rate limited"}, {"Retry-After": "0.2"}) if next(contador) == 0
+        else respuesta_por_defecto(payload))
+
+    async def solicitar():
+        enrutador = EnrutadorModelos(modelos=["mistral"], timeout=5)
+        _, respuesta = await enrutador.solicitar(openrouter_falso.url, CABECERAS, _payload)
+        return respuesta, obtener_planificador().metricas()
+
+    respuesta, metricas = asyncio.run(solicitar())
+
+    assert respuesta.status_code == 200
+    assert len(openrouter_falso.solicitudes) == 2
+    assert metricas["despachadas"] == 2  # el reintento también esperó su turno
+    assert metricas["limitadas"] == 1    # y el planificador vio el 429
+    assert metricas["espera_max_ms"] >= 150  # Retry-After pausó el cubo del modelo
+
+
+def test_la_cola_no_cuenta_como_latencia_ni_timeout(openrouter_falso, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_RPM_MODELO", "60")
+
+    async def solicitar():
+        enrutador = EnrutadorModelos(modelos=["mistral"], timeout=0.5)
+        planificador = obtener_planificador()
+        # Un 429 anterior con Retry-After de 1 s: la petición pasa 1 s en la cola
+        planificador.registrar_respuesta(CABECERAS, "mistralai/mistral-7b-instruct",
+                                         httpx.Response(429, headers={"Retry-After": "1"}))
+        await enrutador.solicitar(openrouter_falso.url, CABECERAS, _payload)
+        return enrutador.resumen()["mistral"]
+
+    resumen = asyncio.run(solicitar())
+
+    assert resumen["tasa_errores"] == 0 and resumen["sano"]
+    assert resumen["latencia_ms"] < 500
@@ -0,0 +1,68 @@
+# tests/test_plantillas_respuesta.py
+import asyncio
+import json
+
+import pytest
+
+import client
+import src.plantillas_respuesta
+from plantillas_respuesta import MODO_PLANTILLA, PlantillasRespuesta
+
+PREGUNTA_FINAL = "¿Qué resultado se obtuvo?"
+
+
+@pytest.fixture
+def plantillas(tmp_path):
+    ruta = tmp_path / "plantillas_respuesta.json"
+    ruta.write_text(json.dumps({"suma": "{detalle}", "eco": "Primero: {items[0]}"}), encoding="utf-8")
+    return PlantillasRespuesta(ruta)
+
+
+def test_renderizar_rellena_la_plantilla_con_el_resultado(plantillas):
+    assert plantillas.renderizar("suma", {"entero": "8", "detalle": "La suma de 5 y 3 es 8."}) == "La suma de 5 y 3 es 8."
+
+
+@pytest.mark.parametrize("nombre, resultado", [
+    ("suma", {"entero": "8"}),         # falta un campo
+    ("suma", [1, 2]),                  # no es un objeto
+    ("suma", 8),
+    ("eco", {"items": 3}),             # el campo no se puede indexar (TypeError)
+    ("resta", {"detalle": "sin plantilla"}),
+])
+def test_renderizar_devuelve_none_si_no_se_puede_rellenar(plantillas, nombre, resultado):
+    assert plantillas.renderizar(nombre, resultado) is None
+
+
+def _turno_con_plantillas(plantillas: PlantillasRespuesta, monkeypatch) -> dict:
+    monkeypatch.setenv("OPENROUTER_MODELOS", "mistral")
+    monkeypatch.setattr(src.plantillas_respuesta, "_plantillas_compartidas", plantillas)
+
+    async def turno() -> dict:
+        try:
+            return await client.main("suma", interactivo=False, modo_respuesta=MODO_PLANTILLA)
+        finally:
+            await client.cerrar_recursos()
+
+    return asyncio.run(turno())
+
+
+def test_con_plantilla_no_hay_segunda_llamada_al_modelo(openrouter_falso, plantillas, monkeypatch):
+    resultado = _turno_con_plantillas(plantillas, monkeypatch)
+
+    assert resultado["estado"] == "ok"
+    assert resultado["origen_respuesta"] == MODO_PLANTILLA
+    assert resultado["respuesta_final"] == "La suma de 5 y 3 es 8."
+    assert len(openrouter_falso.solicitudes) == 1
+
+
+def test_si_falta_un_campo_se_pregunta_al_modelo(openrouter_falso, tmp_path, monkeypatch):
+    ruta = tmp_path / "plantillas_respuesta.json"
+    ruta.write_text(json.dumps({"suma": "{no_existe}"}), encoding="utf-8")
+
+    resultado = _turno_con_plantillas(PlantillasRespuesta(ruta), monkeypatch)
+
+    assert resultado["estado"] == "ok"
+    assert resultado["origen_respuesta"] == "modelo"
+    assert resultado["respuesta_final"] == "El resultado es 8"
+    assert [p["messages"][-1]["content"] for p in openrouter_falso.solicitudes][-1] == PREGUNTA_FINAL
+    assert len(openrouter_falso.solicitudes) == 2
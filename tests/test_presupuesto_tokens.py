@@ -0,0 +1,38 @@
+# tests/test_presupuesto_tokens.py
+import random
+
+import pytest
+
+from presupuesto_tokens import Conversacion, ajustar_a_presupuesto
+
+
+def _mensaje(rol: str, longitud: int) -> dict:
+    return {"role": rol, "content": "x" * longitud}
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_conversacion_recorta_igual_que_la_lista(semilla):
+    aleatorio = random.Random(semilla)
+    lista = [_mensaje("system", 40)]
+    conversacion = Conversacion(lista)
+    for _ in range(60):
+        rol = aleatorio.choice(["user", "assistant", "tool"])
+        mensaje = _mensaje(rol, aleatorio.randint(1, 200))
+        lista.append(mensaje)
+        conversacion.append(mensaje)
+        if aleatorio.random() < 0.1:  # se sustituye el system, como hace client.main
+            lista[0] = conversacion[0] = _mensaje("system", aleatorio.randint(10, 80))
+        for presupuesto in (150, 400, 10_000):  # varios modelos sobre la misma conversación
+            assert ajustar_a_presupuesto(conversacion, presupuesto) == ajustar_a_presupuesto(lista, presupuesto)
+
+
+def test_total_se_actualiza_al_anexar_y_sustituir():
+    conversacion = Conversacion([_mensaje("system", 40)])
+    total = conversacion.total_tokens
+    conversacion.append(_mensaje("user", 400))
+    assert conversacion.total_tokens > total
+
+    conversacion[1] = _mensaje("user", 4)
+    assert conversacion.total_tokens == Conversacion(list(conversacion)).total_tokens
+    del conversacion[1]
+    assert conversacion.total_tokens == total
@@ -0,0 +1,43 @@
+# tests/test_resumen_historial.py
+import asyncio
+
+import client
+from resumen_historial import PREFIJO_RESUMEN, obtener_resumidor
+from stub_openrouter import respuesta_por_defecto
+
+RESUMEN = "Se sumaron 5 y 3 con la herramienta suma: el resultado fue 8."
+
+
+def _es_resumen(payload: dict) -> bool:
+    return payload["messages"][0]["content"].startswith("Resume la conversación")
+
+
+def test_lo_descartado_se_resume_y_viaja_en_el_siguiente_payload(openrouter_falso, monkeypatch):
+    # Contexto mínimo: la respuesta final solo cabe con la última pregunta, así que el
+    # intercambio con el resultado de la herramienta se descarta (y se resume)
+    monkeypatch.setenv("CONTEXTO_PRESUPUESTO_TOKENS", "40")
+    monkeypatch.setenv("OPENROUTER_MODELOS", "mistral")
+    openrouter_falso.responder = lambda payload: (
+        {"choices": [{"message": {"role": "assistant", "content": RESUMEN}}]} if _es_resumen(payload)
+        else respuesta_por_defecto(payload))
+
+    async def dos_turnos() -> list[dict]:
+        try:
+            primero = await client.main("suma", interactivo=False, id_sesion="resumen")
+            url, headers = client.openrouter_connect()
+            await obtener_resumidor(url, headers).esperar()  # el resumen se calcula en segundo plano
+            segundo = await client.main("suma", interactivo=False, id_sesion="resumen")
+            return [primero, segundo]
+        finally:
+            await client.cerrar_recursos()
+
+    resultados = asyncio.run(dos_turnos())
+
+    assert [r["estado"] for r in resultados] == ["ok", "ok"]
+    resumenes = [p for p in openrouter_falso.solicitudes if _es_resumen(p)]
+    assert len(resumenes) == 1
+    assert "La suma de 5 y 3 es 8." in resumenes[0]["messages"][1]["content"]
+    # Primer payload del segundo turno: system, resumen y la nueva petición
+    siguiente = [p for p in openrouter_falso.solicitudes if not _es_resumen(p)][2]
+    assert siguiente["messages"][1] == {"role": "system", "content": PREFIJO_RESUMEN + RESUMEN}
+    assert siguiente["messages"][-1] == {"role": "user", "content": "Herramienta 'suma'"}
@@ -0,0 +1,44 @@
+# tests/test_serializacion.py
+import asyncio
+import json
+
+import pytest
+
+import serializacion
+from serializacion import codificar, decodificar
+
+GRANDES = {"numero1": 2**70, "numero2": -(2**64) - 1, "anidado": [2**63, 2**63 - 1], "pequeno": 1}
+
+
+@pytest.mark.parametrize("ordenar_claves", [False, True])
+def test_ambos_backends_codifican_igual_los_enteros_grandes(monkeypatch, ordenar_claves):
+    con_orjson = codificar(GRANDES, ordenar_claves=ordenar_claves)
+    monkeypatch.setattr(serializacion, "HAS_ORJSON", False)
+    sin_orjson = codificar(GRANDES, ordenar_claves=ordenar_claves)
+
+    assert con_orjson == sin_orjson
+    assert json.loads(con_orjson) == GRANDES
+
+
+def test_ambos_backends_decodifican_igual_los_enteros_grandes(monkeypatch):
+    texto = json.dumps(GRANDES)
+    con_orjson = [decodificar(texto), decodificar(texto.encode("utf-8"))]
+    monkeypatch.setattr(serializacion, "HAS_ORJSON", False)
+    sin_orjson = [decodificar(texto), decodificar(texto.encode("utf-8"))]
+
+    assert con_orjson == sin_orjson == [GRANDES, GRANDES]
+
+
+def test_suma_con_enteros_fuera_de_64_bits(entorno_limpio):
+    import client
+    from mcp_manual import ejecutar_tool_manual
+
+    async def sumar() -> dict:
+        try:
+            return await ejecutar_tool_manual("suma", {"numero1": 2**70, "numero2": 1})
+        finally:
+            await client.cerrar_recursos()
+
+    resultado = asyncio.run(sumar())
+
+    assert resultado["result"]["entero"] == str(2**70 + 1)
@@ -0,0 +1,33 @@
+# tests/test_sesion_http.py
+import asyncio
+
+import client
+
+
+def test_dos_turnos_de_main_comparten_una_conexion(openrouter_falso, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_CACHE_TTL", "0")  # todas las llamadas llegan al stub
+    async def dos_turnos() -> list[dict]:
+        try:
+            return [await client.main("suma", interactivo=False, id_sesion="keep-alive") for _ in range(2)]
+        finally:
+            await client.cerrar_recursos()
+
+    resultados = asyncio.run(dos_turnos())
+
+    assert [r["estado"] for r in resultados] == ["ok", "ok"]
+    assert len(openrouter_falso.solicitudes) == 4  # detección + respuesta final, por turno
+    assert openrouter_falso.conexiones == 1
+
+
+def test_sesion_sincrona_reutiliza_la_conexion(openrouter_falso):
+    from sesion_http import SesionOpenRouter
+
+    sesion = SesionOpenRouter()
+    try:
+        for _ in range(3):
+            payload = {"model": "m", "messages": [{"role": "user", "content": "hola"}]}
+            assert sesion.post(openrouter_falso.url, json=payload).status_code == 200
+    finally:
+        sesion.cerrar()
+
+    assert openrouter_falso.conexiones == 1